@@ -2,11 +2,15 @@ import glob
 import logging
 import os
 import shutil
-import googkit.compat.urllib.request
+import googkit.lib.file
+import googkit.lib.marker
+import googkit.lib.parallel
 import googkit.lib.path
-import googkit.lib.strutil
 from googkit.commands.command import Command
+from googkit.lib.cache import StatIndex
 from googkit.lib.dirutil import working_directory
+from googkit.lib.error import GoogkitError
+from googkit.lib.marker import Rewriter
 from googkit.lib.i18n import _
 
 
@@ -28,10 +32,23 @@ class ApplyConfigCommand(Command):
     """
     CONFIG_TARGET_EXT = HTML_LIKE_EXT + ('.js', '.css')
 
+    def __init__(self, env):
+        super(ApplyConfigCommand, self).__init__(env)
+        self._rewriter = None
+        self.stat_index = None
+
     @classmethod
     def needs_project_config(cls):
         return True
 
+    @classmethod
+    def supported_options(cls):
+        opts = super(ApplyConfigCommand, cls).supported_options()
+        opts.add('--dev-bundle')
+        opts.add('--jobs')
+        opts.add('--profile')
+        return opts
+
     @classmethod
     def namespace_by_html(cls, path):
         """Returns a namespace from the path to the html.
@@ -59,40 +76,61 @@ class ApplyConfigCommand(Command):
         """Returns an updated line that marked by ``<!--@base_js@-->``.
         The line is contained in the file specified the path.
         """
-        dirpath = os.path.dirname(path)
-        base_js = self.config.base_js()
-        relpath = os.path.relpath(base_js, dirpath)
-        href = googkit.compat.urllib.request.pathname2url(relpath)
+        href = self.rewriter().relative_url(self.config.base_js(), path)
 
         return '<script src="{href}"></script>'.format(href=href)
 
     def update_deps_js(self, line, path):
         """Returns an updated line that marked by ``<!--@deps_js@-->``.
         The line is contained in the file specified the path.
+        Pages refer to the deps.js for each page if the deps_per_page config
+        is enabled.
         """
-        dirpath = os.path.dirname(path)
-        deps_js = self.config.deps_js()
-        relpath = os.path.relpath(deps_js, dirpath)
-        src = googkit.compat.urllib.request.pathname2url(relpath)
+        src = self.rewriter().relative_url(self.deps_js_for(path), path)
 
         return '<script src="{src}"></script>'.format(src=src)
 
+    def deps_js_for(self, path):
+        """Returns a path for the deps.js that the file specified the path
+        should load.
+        """
+        config = self.config
+
+        # Only pages have their own deps.js, and test files need all
+        # dependencies
+        if not config.deps_per_page() or not self.is_page(path):
+            return config.deps_js()
+
+        return config.page_deps_js(self.namespace_by_html(path))
+
+    def is_page(self, path):
+        """Whether the file specified the path is a page that has its own
+        main script.
+        """
+        config = self.config
+        return (os.path.dirname(os.path.abspath(path)) == os.path.abspath(config.development_dir()) and
+                os.path.abspath(path) != os.path.abspath(config.testrunner()))
+
     def update_multitestrunner_css(self, line, path):
         """Returns an updated line that marked by ``<!--@multitestrunner_css@-->``.
         The line is contained in the file specified the path.
         """
-        dirpath = os.path.dirname(path)
-        multitestrunner_css = self.config.multitestrunner_css()
-        relpath = os.path.relpath(multitestrunner_css, dirpath)
-        href = googkit.compat.urllib.request.pathname2url(relpath)
+        href = self.rewriter().relative_url(self.config.multitestrunner_css(), path)
 
         return '<link rel="stylesheet" href="{href}">'.format(href=href)
 
     def update_require_main(self, line, path):
         """Returns an updated line that marked by ``<!--@require_main@-->``.
         The line is contained in the file specified the path.
+        Pages load their dev bundle instead if the --dev-bundle option is
+        specified.
         """
         namespace = self.namespace_by_html(path)
+
+        if self.env.argument.option('--dev-bundle') and self.is_page(path):
+            src = self.rewriter().relative_url(self.config.dev_bundle_js(namespace), path)
+            return '<script src="{src}"></script>'.format(src=src)
+
         return '<script> goog.require(\'{namespace}\'); </script>'.format(namespace=namespace)
 
     def update_provide_main(self, line, path):
@@ -102,62 +140,78 @@ class ApplyConfigCommand(Command):
         namespace = self.namespace_by_js(path)
         return 'goog.provide(\'{namespace}\');'.format(namespace=namespace)
 
+    def rewriter(self):
+        """Returns a marker rewriter for configurations.
+        Markers registered by plugins are also replaced.
+        """
+        if self._rewriter is not None:
+            return self._rewriter
+
+        rewriter = Rewriter()
+        rewriter.add('base.js', '<!--@base_js@-->', self.update_base_js)
+        rewriter.add('deps.js', '<!--@deps_js@-->', self.update_deps_js)
+        rewriter.add('multitestrunner.css', '<!--@multitestrunner_css@-->', self.update_multitestrunner_css)
+        rewriter.add('require_main', '<!--@require_main@-->', self.update_require_main)
+        rewriter.add('provide_main', '/*@provide_main@*/', self.update_provide_main)
+
+        for (name, marker, update) in googkit.lib.marker.registered():
+            rewriter.add(name, marker, update)
+
+        self._rewriter = rewriter
+        return rewriter
+
     def apply_config(self, path):
-        """Applies configurations to a file that the path point to.
+        """Applies configurations to a file that the path point to, and
+        returns a tuple of whether the file is changed and a list of names
+        for replaced markers.
+        The file is written only if its content is changed, so the
+        modification time of the file is kept otherwise.
+        Files that had no markers are skipped without reading while they are
+        not changed, and other files are read only if prefixes of markers are
+        found in them.
         """
-        lines = []
-        updaters = {
-            'base.js': {
-                'marker': '<!--@base_js@-->',
-                'update': self.update_base_js
-            },
-            'deps.js': {
-                'marker': '<!--@deps_js@-->',
-                'update': self.update_deps_js
-            },
-            'multitestrunner.css': {
-                'marker': '<!--@multitestrunner_css@-->',
-                'update': self.update_multitestrunner_css
-            },
-            'require_main': {
-                'marker': '<!--@require_main@-->',
-                'update': self.update_require_main
-            },
-            'provide_main': {
-                'marker': '/*@provide_main@*/',
-                'update': self.update_provide_main
-            },
-        }
+        index = self.stat_index
+        if index is not None and index.contains(path):
+            return (False, [])
+
+        # Take the status before reading not to miss changes while reading
+        stat = os.stat(path) if index is not None else None
+        rewriter = self.rewriter()
+
+        if not rewriter.may_match(path):
+            if index is not None:
+                index.add(path, stat)
+            return (False, [])
 
         with open(path) as fp:
-            for line in fp:
-                for updater_name in updaters.keys():
-                    marker = updaters[updater_name]['marker']
-                    update = updaters[updater_name]['update']
-                    if line.find(marker) >= 0:
-                        msg = _('Replaced a {name} path on {path}').format(name=updater_name, path=path)
-                        logging.debug(msg)
+            old_lines = list(fp)
 
-                        line = '{indent}{content}{marker}\n'.format(
-                            indent=googkit.lib.strutil.line_indent(line),
-                            content=update(line, path),
-                            marker=marker)
+        (lines, names) = rewriter.rewrite(old_lines, path)
+        changed = (lines != old_lines)
+        if changed:
+            googkit.lib.file.write_atomically(path, ''.join(lines))
 
-                lines.append(line)
+        if index is not None:
+            if names:
+                index.remove(path)
+            else:
+                index.add(path, stat)
 
-        with open(path, 'w') as fp:
-            for line in lines:
-                fp.write(line)
+        return (changed, names)
 
-    def apply_config_all(self):
-        """Applies configurations to files that is in a googkit project directory.
+    def config_targets(self):
+        """Returns paths for files to apply configurations in the development
+        directory.
         """
         devel_dir = self.config.development_dir()
 
         # If library_root is in development_dir, we should avoid to walk into the library_root.
         ignores = (
             self.config.library_root(),
-            self.config.compiler_root())
+            self.config.compiler_root(),
+            self.config.dev_bundle_dir(),
+            self.config.page_deps_dir())
+        result = []
 
         for root, dirs, files in os.walk(devel_dir):
             for filename in files:
@@ -165,13 +219,54 @@ class ApplyConfigCommand(Command):
                 if ext not in ApplyConfigCommand.CONFIG_TARGET_EXT:
                     continue
 
-                filepath = os.path.join(root, filename)
-                self.apply_config(filepath)
+                result.append(os.path.join(root, filename))
 
             # Avoid to walk into ignores
-            for dirname in dirs:
-                if os.path.join(root, dirname) in ignores:
-                    dirs.remove(dirname)
+            dirs[:] = [dirname for dirname in dirs
+                       if os.path.join(root, dirname) not in ignores]
+
+        return result
+
+    def apply_config_all(self):
+        """Applies configurations to files that is in a googkit project directory.
+        Files are processed at the same time by the number of threads
+        specified by the --jobs option. Results are logged in the order of
+        the files, and a GoogkitError is raised after all files are
+        processed if some of them failed.
+        """
+        # The rewriter should be created before starting threads
+        self.rewriter()
+
+        def apply_config(path):
+            try:
+                with self.profile('apply_config', path):
+                    return (self.apply_config(path), None)
+            except (IOError, OSError) as e:
+                return (None, e)
+
+        paths = self.config_targets()
+        jobs = googkit.lib.parallel.jobs(self.env.argument.option('--jobs'))
+        results = googkit.lib.parallel.imap(apply_config, paths, jobs)
+        changed_count = 0
+        errors = []
+
+        for path, (result, error) in zip(paths, results):
+            if error is not None:
+                errors.append(_('{path}: {message}').format(
+                    path=path,
+                    message=str(error)))
+                continue
+
+            (changed, names) = result
+            for name in names:
+                logging.debug(_('Replaced a {name} path on {path}').format(name=name, path=path))
+            if changed:
+                changed_count += 1
+
+        logging.debug(_('Updated {count} files.').format(count=changed_count))
+
+        if errors:
+            raise GoogkitError('\n'.join(errors))
 
     def setup_main_scripts(self):
         """Set-up a main scripts as an entry point for the user application.
@@ -209,7 +304,15 @@ class ApplyConfigCommand(Command):
     def run_internal(self):
         project_root = googkit.lib.path.project_root(self.env.cwd)
         with working_directory(project_root):
-            self.setup_main_scripts()
+            with self.profile('setup_main_scripts'):
+                self.setup_main_scripts()
+
+            self.stat_index = StatIndex(
+                googkit.lib.path.config_index(project_root, self.config.cache_dir()),
+                self.rewriter().signature())
+            self.stat_index.load()
+
             self.apply_config_all()
+            self.stat_index.save()
 
         logging.info('Applied all configs.')
@@ -1,15 +1,26 @@
 import glob
+import hashlib
+import io
 import json
 import logging
 import os
 import os.path
 import re
 import shutil
-import subprocess
+import tempfile
+import threading
+import googkit.lib.cache
+import googkit.lib.compress
 import googkit.lib.file
+import googkit.lib.parallel
 import googkit.lib.path
-import googkit.lib.strutil
+import googkit.lib.process
+import googkit.lib.watch
 from googkit.commands.command import Command
+from googkit.lib.cache import CompileCache
+from googkit.lib.compiler_server import CompilerServer
+from googkit.lib.deps import DepsGraph, ParseCache
+from googkit.lib.marker import Rewriter
 from googkit.lib.option_builder import OptionBuilder
 from googkit.lib.dirutil import working_directory
 from googkit.lib.error import GoogkitError
@@ -26,6 +37,22 @@ class BuildCommand(Command):
     """
     HTML_LIKE_EXT = ('.xml', '.xhtml', '.xht', '.htm', '.html')
 
+    """Module name for scripts shared by entry points on a single-pass build.
+    """
+    SHARED_MODULE = 'googkit_common'
+
+    """File name of the manifest for compiled scripts with hashed names.
+    """
+    MANIFEST_FILE = 'asset-manifest.json'
+
+    """Length of the content hash in compiled script names.
+    """
+    HASH_LENGTH = 8
+
+    """Extension tuple to precompress for production.
+    """
+    COMPRESSIBLE_EXT = HTML_LIKE_EXT + ('.js', '.css', '.json', '.svg', '.txt')
+
     class BuilderArguments(OptionBuilder):
         """Argument builder for Closure Builder.
 
@@ -60,6 +87,34 @@ class BuildCommand(Command):
             """
             self.add('--compiler_flags', '{0}={1}'.format(key, value))
 
+        def compiler_values(self, key):
+            """Returns a list of values of the arguments for Closure Compiler
+            by the specified key.
+
+            Usage::
+                >>> args = BuildCommand.BuilderArguments()
+                >>> args.compiler_arg('--arg', 'VAL')
+                >>> args.compiler_values('--arg')
+                ['VAL']
+            """
+            prefix = key + '='
+            return [value[len(prefix):] for value in self.values('--compiler_flags')
+                    if value.startswith(prefix)]
+
+    def __init__(self, env):
+        super(BuildCommand, self).__init__(env)
+        self._lock = threading.Lock()
+        self._deps_lock = threading.Lock()
+        self._deps_graphs = {}
+        self._digests = {}
+        self._digest_locks = {}
+        self.compiler_server = None
+        self.parse_cache = None
+        self._hashed_paths = {}
+        self.compile_cache = None
+        self._staging_dir = None
+        self._resource_rewriter = None
+
     @classmethod
     def needs_project_config(cls):
         return True
@@ -68,7 +123,13 @@ class BuildCommand(Command):
     def supported_options(cls):
         opts = super(BuildCommand, cls).supported_options()
         opts.add('--clean')
+        opts.add('--compiler-server')
         opts.add('--debug')
+        opts.add('--jobs')
+        opts.add('--no-cache')
+        opts.add('--profile')
+        opts.add('--single-pass')
+        opts.add('--watch')
         return opts
 
     @classmethod
@@ -81,10 +142,84 @@ class BuildCommand(Command):
                     if (os.path.join(dirpath, filename) in ignore_dirs)]
         return ignoref
 
-    def setup_files(self, target_dir, should_clean=False):
-        """Copy project resources to the specified directory path.
-        Removes files already exist in the target directory if should_clean is
-        True.
+    def target_dir(self):
+        """Returns a path for the debug or the production directory to build.
+        """
+        if self.env.argument.option('--debug'):
+            return self.config.debug_dir()
+        else:
+            return self.config.production_dir()
+
+    def output_dir(self):
+        """Returns a path for the directory that outputs are written to.
+        It is the staging directory while a clean build is running, otherwise
+        same as target_dir.
+        """
+        if self._staging_dir is not None:
+            return self._staging_dir
+
+        return self.target_dir()
+
+    def begin_clean_build(self, target_dir):
+        """Prepares an empty staging directory for a clean build of the
+        specified target directory, and returns a path for it.
+        Outputs are written to the staging directory until
+        finish_clean_build is called, so the target directory is kept
+        available while building.
+        """
+        staging_dir = googkit.lib.path.staging_dir(target_dir)
+
+        # Remove the staging directory left by a failed build
+        if os.path.exists(staging_dir):
+            with self.profile('clean', staging_dir):
+                shutil.rmtree(staging_dir)
+
+        self._staging_dir = staging_dir
+        return staging_dir
+
+    def finish_clean_build(self, target_dir):
+        """Swaps the staging directory into the specified target directory,
+        and removes the old target directory in the background.
+        Returns the thread that removes the old directory.
+        """
+        staging_dir = self._staging_dir
+
+        with self.profile('swap', target_dir):
+            googkit.lib.file.swap_dir(staging_dir, target_dir)
+
+        self._staging_dir = None
+        self._hashed_paths = dict(
+            (googkit.lib.path.replace_base(path, staging_dir, target_dir),
+             googkit.lib.path.replace_base(hashed_path, staging_dir, target_dir))
+            for (path, hashed_path) in self._hashed_paths.items())
+
+        # The staging path has the old target directory after swapping
+        return googkit.lib.file.rmtree_in_background(staging_dir)
+
+    def abort_clean_build(self):
+        """Removes the staging directory of the failed clean build, so the
+        target directory is left untouched.
+        """
+        if self._staging_dir is None:
+            return
+
+        shutil.rmtree(self._staging_dir, ignore_errors=True)
+        self._staging_dir = None
+
+    def setup_files(self, target_dir):
+        """Copy project resources to the specified directory path, and
+        converts HTMLs in it for compiled resources.
+        This should be done once per build before compiling scripts.
+        """
+        self.stage_files(target_dir)
+        self.compile_resources(target_dir)
+
+    def stage_files(self, target_dir):
+        """Synchronizes the specified directory path with project resources.
+        Only changed files are copied, and files removed from project
+        resources are also removed except compiled scripts.
+        Clean builds stage files into an empty staging directory instead of
+        removing the target directory.
         """
         config = self.config
         devel_dir = config.development_dir()
@@ -94,49 +229,95 @@ class BuildCommand(Command):
             config.testrunner(),
             config.library_root(),
             config.compiler_root(),
-            config.js_dev_dir())
+            config.js_dev_dir(),
+            config.dev_bundle_dir(),
+            config.page_deps_dir())
+
+        with self.profile('stage_files', target_dir):
+            result = googkit.lib.file.sync(
+                devel_dir,
+                target_dir,
+                ignore=BuildCommand.ignore_dirs(*ignores),
+                keep=self.is_build_output,
+                mode=self.staging_mode(),
+                needs_copy=BuildCommand.is_html)
+
+        logging.info(_('Copied {copied} files, skipped {skipped} files and deleted {deleted} files.').format(
+            copied=result.copied,
+            skipped=result.skipped,
+            deleted=result.deleted))
+
+    def staging_mode(self):
+        """Returns a mode to stage project resources by the config.
+        Symbolic links are not used for production, so files are copied
+        instead.
+        Raise a GoogkitError if the mode is invalid.
+        """
+        mode = self.config.staging()
+        if mode not in googkit.lib.file.STAGING_MODES:
+            raise GoogkitError(_('Invalid staging mode: {mode}').format(
+                mode=mode))
 
-        if should_clean:
-            shutil.rmtree(target_dir)
+        if mode == 'symlink' and not self.env.argument.option('--debug'):
+            return 'copy'
 
-        googkit.lib.file.copytree(
-            devel_dir,
-            target_dir,
-            ignore=BuildCommand.ignore_dirs(*ignores))
+        return mode
 
+    @classmethod
+    def is_html(cls, path):
+        """Whether the specified path is a HTML-like document.
+        """
+        (base, ext) = os.path.splitext(path)
+        return ext in BuildCommand.HTML_LIKE_EXT
+
+    def compile_resources(self, target_dir):
+        """Converts all HTMLs in the specified directory for compiled
+        resources.
+        """
         for root, dirs, files in os.walk(target_dir):
             for filename in files:
                 html_path = os.path.join(root, filename)
-                (base, ext) = os.path.splitext(html_path)
-                if ext not in BuildCommand.HTML_LIKE_EXT:
+                if not BuildCommand.is_html(html_path):
                     continue
 
-                self.compile_resource(html_path)
+                with self.profile('rewrite_html', html_path):
+                    self.compile_resource(html_path)
+
+    def resource_rewriter(self):
+        """Returns a marker rewriter that converts development resources for
+        production resources.
+        """
+        if self._resource_rewriter is not None:
+            return self._resource_rewriter
+
+        rewriter = Rewriter(keep_markers=False)
+
+        # Remove lines that requires unneeded scripts
+        rewriter.add('base.js', '<!--@base_js@-->', lambda line, path: None)
+        rewriter.add('deps.js', '<!--@deps_js@-->', lambda line, path: None)
+
+        # Replace deps.js by compiled scripts
+        rewriter.add('require_main', '<!--@require_main@-->', self.update_require_main)
+
+        self._resource_rewriter = rewriter
+        return rewriter
+
+    def update_require_main(self, line, path):
+        """Returns script tags for compiled scripts that replace a line
+        marked by ``<!--@require_main@-->``.
+        """
+        rewriter = self.resource_rewriter()
+        scripts = ['<script src="{src}"></script>'.format(src=rewriter.relative_url(script_path, path))
+                   for script_path in self.compiled_js_paths(path)]
+        return '\n'.join(scripts)
 
     def compile_resource(self, html_path):
         """Converts development resources for production resources.
         For example, paths for development resources will be replaced by paths
         for compiled resources.
         """
-        lines = []
-
         with open(html_path) as f:
-            for line in f:
-                # Remove lines that requires unneeded scripts
-                if line.find('<!--@base_js@-->') >= 0:
-                    continue
-                if line.find('<!--@deps_js@-->') >= 0:
-                    continue
-
-                # Replace deps.js by a compiled script
-                if line.find('<!--@require_main@-->') >= 0:
-                    indent = googkit.lib.strutil.line_indent(line)
-                    compiled_js_path = os.path.relpath(
-                        self.compiled_js_path(html_path), os.path.dirname(html_path))
-                    script = '<script src="{src}"></script>\n'.format(src=compiled_js_path)
-                    line = indent + script
-
-                lines.append(line)
+            lines = self.resource_rewriter().rewrite_lines(f, html_path)
 
         with open(html_path, 'w') as f:
             for line in lines:
@@ -156,24 +337,384 @@ class BuildCommand(Command):
         ext_pattern = self.config.compiled_js_ext()
         return ext_pattern.replace('%s', os.path.splitext(html_path)[0])
 
-    def _build(self, builder_args, project_root):
-        builder = self.config.closurebuilder()
+    def compiled_js_paths(self, html_path):
+        """Returns a list of compiled js paths that the HTML should load.
+        On a single-pass build, the script shared by all entry points is
+        loaded before the script for the HTML.
+        """
+        paths = [self.compiled_js_path(html_path)]
 
-        cmd = ['python', builder] + [str(arg) for arg in builder_args]
+        if self.env.argument.option('--single-pass'):
+            shared_path = os.path.join(
+                os.path.dirname(html_path), BuildCommand.SHARED_MODULE)
+            paths.insert(0, self.compiled_js_path(shared_path))
 
-        popen_args = {
-            'stdout': subprocess.PIPE,
-            'stderr': subprocess.PIPE
-        }
+        return [self._hashed_paths.get(path, path) for path in paths]
 
-        builder_proc = subprocess.Popen(cmd, **popen_args)
-        result = builder_proc.communicate()
+    def hashed_js_path(self, compiled_js_path, digest):
+        """Returns a compiled js path that has the content hash.
+        For example, returns `foo/bar.3f9a1c20.min.js` if the path is
+        `foo/bar.min.js`.
 
-        if builder_proc.returncode != 0:
-            raise GoogkitError(_('Compilation failed:\n{message}').format(
-                message=result[1].decode()))
+        Usage::
+            >>> from googkit.lib.config import Config
+            >>> cmd = BuildCommand(None)
+            >>> cmd.config = Config()
+            >>> cmd.config.compiled_js_ext = lambda: '%s.min.js'
+            >>> cmd.hashed_js_path('foo/bar.min.js', '3f9a1c20')
+            'foo/bar.3f9a1c20.min.js'
+        """
+        suffix = self.config.compiled_js_ext().split('%s')[-1]
+        base = compiled_js_path[:len(compiled_js_path) - len(suffix)]
+        return '{base}.{digest}{suffix}'.format(
+            base=base,
+            digest=digest,
+            suffix=suffix)
+
+    def hash_compiled_file(self, compiled_js_path):
+        """Renames the compiled script and its source map to have the content
+        hash, and returns the new path of the script.
+        The reference to the source map in the script is also updated.
+        """
+        with io.open(compiled_js_path, encoding='utf-8') as fp:
+            content = fp.read()
+
+        digest = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        hashed_path = self.hashed_js_path(
+            compiled_js_path, digest[:BuildCommand.HASH_LENGTH])
+
+        source_map_path = compiled_js_path + '.map'
+        if os.path.exists(source_map_path):
+            content = content.replace(
+                'sourceMappingURL=' + os.path.basename(source_map_path),
+                'sourceMappingURL=' + os.path.basename(hashed_path) + '.map')
+
+            with open(source_map_path) as source_map_file:
+                source_map_content = json.load(source_map_file)
+            source_map_content['file'] = os.path.basename(hashed_path)
+
+            with open(hashed_path + '.map', 'w') as source_map_file:
+                json.dump(source_map_content, source_map_file)
+            os.remove(source_map_path)
+
+        with io.open(hashed_path, 'w', encoding='utf-8') as fp:
+            fp.write(content)
+        os.remove(compiled_js_path)
+
+        with self._lock:
+            self._hashed_paths[compiled_js_path] = hashed_path
+
+        return hashed_path
+
+    def write_manifest(self, target_dir):
+        """Writes the manifest that maps compiled script names to hashed
+        names into the specified directory.
+        Hashed scripts in the previous manifest that are no longer used are
+        removed.
+        """
+        manifest_path = os.path.join(target_dir, BuildCommand.MANIFEST_FILE)
+
+        def url(path):
+            return os.path.relpath(path, target_dir).replace(os.sep, '/')
+
+        manifest = {}
+        for (compiled_js_path, hashed_path) in self._hashed_paths.items():
+            manifest[url(compiled_js_path)] = url(hashed_path)
+
+        self._remove_hashed_files(target_dir, set(manifest.values()))
+
+        with open(manifest_path, 'w') as fp:
+            json.dump(manifest, fp, indent=2, sort_keys=True)
+
+    def remove_manifest(self, target_dir):
+        """Removes the manifest and hashed scripts listed in it from the
+        specified directory. They are left by builds that hashed compiled
+        scripts.
+        """
+        manifest_path = os.path.join(target_dir, BuildCommand.MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return
+
+        self._remove_hashed_files(target_dir)
+        os.remove(manifest_path)
+
+    def _remove_hashed_files(self, target_dir, used_urls=()):
+        # Removes hashed scripts and their source maps in the manifest of the
+        # target directory except the used ones
+        manifest_path = os.path.join(target_dir, BuildCommand.MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return
+
+        with open(manifest_path) as fp:
+            old_manifest = json.load(fp)
+
+        for old_url in old_manifest.values():
+            if old_url in used_urls:
+                continue
+
+            for path in (old_url, old_url + '.map'):
+                old_path = os.path.join(target_dir, path)
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+
+    def is_compiled_file(self, path):
+        """Whether the file specified the path is a compiled script or its
+        source map.
+
+        Usage::
+            >>> from googkit.lib.config import Config
+            >>> cmd = BuildCommand(None)
+            >>> cmd.config = Config()
+            >>> cmd.config.compiled_js_ext = lambda: '%s.min.js'
+            >>> cmd.is_compiled_file('foo/bar.min.js')
+            True
+            >>> cmd.is_compiled_file('foo/bar.min.js.map')
+            True
+            >>> cmd.is_compiled_file('foo/bar.js')
+            False
+        """
+        suffix = self.config.compiled_js_ext().split('%s')[-1]
+        basename = os.path.basename(path)
+
+        if basename.endswith('.map'):
+            basename = basename[:-len('.map')]
+
+        return basename.endswith(suffix) and len(basename) > len(suffix)
+
+    def is_build_output(self, path):
+        """Whether the file specified the path is generated by the build,
+        such as compiled scripts, the manifest and precompressed files.
+        """
+        if os.path.basename(path) == BuildCommand.MANIFEST_FILE:
+            return True
+
+        gzip_ext = googkit.lib.compress.GZIP_EXT
+        if path.endswith(gzip_ext):
+            (base, ext) = os.path.splitext(path[:-len(gzip_ext)])
+            return ext in BuildCommand.COMPRESSIBLE_EXT
+
+        return self.is_compiled_file(path)
+
+    def should_compress(self):
+        """Whether resources should be precompressed by gzip.
+        Debug resources are never compressed.
+        """
+        return not self.env.argument.option('--debug') and self.config.gzip()
+
+    def remove_compressed_files(self, target_dir):
+        """Removes precompressed files left in the specified directory by
+        builds that compressed resources.
+        """
+        with self.profile('remove_gzip', target_dir):
+            removed = googkit.lib.compress.remove_all(target_dir, BuildCommand.COMPRESSIBLE_EXT)
+
+        if removed:
+            logging.info(_('Removed {count} compressed files.').format(count=len(removed)))
+
+    def compress_files(self, target_dir):
+        """Precompresses resources in the specified directory by gzip.
+        Files are compressed by as many threads as --jobs option, and files
+        whose compressed copy is up to date are skipped.
+        Raise a GoogkitError if the compression level is invalid.
+        """
+        level = self.config.gzip_level()
+        if level < 1 or level > 9:
+            raise GoogkitError(_('Invalid compression level: {level}').format(
+                level=level))
+
+        jobs = googkit.lib.parallel.jobs(self.env.argument.option('--jobs'))
+        with self.profile('gzip', target_dir):
+            results = googkit.lib.compress.gzip_all(
+                target_dir, BuildCommand.COMPRESSIBLE_EXT, level, jobs)
+
+        compressed = [result for result in results if not result.skipped]
+        for result in compressed:
+            logging.debug(_('Compressed {path}: {size} -> {compressed_size} bytes ({ratio:.1%})').format(
+                path=result.path,
+                size=result.size,
+                compressed_size=result.compressed_size,
+                ratio=result.ratio()))
+
+        size = sum([result.size for result in compressed])
+        compressed_size = sum([result.compressed_size for result in compressed])
+        logging.info(_('Compressed {count} files ({ratio:.1%}), skipped {skipped} files.').format(
+            count=len(compressed),
+            ratio=(float(compressed_size) / size if size > 0 else 1.0),
+            skipped=len(results) - len(compressed)))
+
+    def _compile_cache(self, project_root):
+        with self._lock:
+            if self.compile_cache is None:
+                cache_dir = googkit.lib.path.compile_cache(
+                    project_root, self.config.cache_dir())
+                self.compile_cache = CompileCache(cache_dir)
+
+        return self.compile_cache
+
+    def evict_cache(self):
+        """Removes least recently used compiled scripts from the compile cache
+        if it is larger than the max size, and logs statistics of the cache.
+        Nothing is done with the --no-cache option.
+        """
+        cache = self.compile_cache
+        if cache is None or self.env.argument.option('--no-cache'):
+            return
+
+        max_size = self.config.cache_max_size()
+        evicted = 0
+        if max_size > 0:
+            with self.profile('evict_cache'):
+                evicted = cache.evict(max_size * 1024 * 1024)
+
+        logging.info(_('Compile cache: {hits} hits, {misses} misses, {evicted} evicted.').format(
+            hits=cache.hits,
+            misses=cache.misses,
+            evicted=evicted))
+
+    def _file_digest(self, path):
+        # The compiler and the library are shared by all pages, so digests
+        # are computed only once per build. Pages built in parallel wait for
+        # the digest being computed instead of reading the file again, and
+        # only for the same file.
+        with self._lock:
+            digest = self._digests.get(path)
+            if digest is not None:
+                return digest
+            path_lock = self._digest_locks.setdefault(path, threading.Lock())
+
+        with path_lock:
+            with self._lock:
+                digest = self._digests.get(path)
+
+            if digest is None:
+                digest = googkit.lib.file.digest(path)
+                with self._lock:
+                    self._digests[path] = digest
+
+        return digest
+
+    def _deps_graph(self, roots):
+        # Scanning does not block digests of other threads
+        with self._deps_lock:
+            graph = self._deps_graphs.get(roots)
+            if graph is None:
+                graph = DepsGraph(self.parse_cache)
+                with self.profile('scan_deps', ', '.join(roots)):
+                    graph.scan(*roots)
+                self._deps_graphs[roots] = graph
+
+                if self.parse_cache is not None:
+                    self.parse_cache.save()
+
+        return graph
+
+    def cache_key(self, builder_args):
+        """Returns a key of the compile cache for the specified arguments.
+        The key is computed from all scripts that the entry point depends on,
+        Closure Compiler, flagfiles and the arguments.
+        Returns None if the key cannot be computed.
+        """
+        roots = tuple(builder_args.values('--root'))
+        namespaces = builder_args.values('--namespace')
+        arguments = str(builder_args)
+
+        # Outputs of clean builds should share entries with other builds
+        if self._staging_dir is not None:
+            arguments = arguments.replace(self._staging_dir, self.target_dir())
+        components = [arguments]
+
+        try:
+            graph = self._deps_graph(roots)
+            for path in graph.sources_for(*namespaces):
+                components += [path, self._file_digest(path)]
+
+            for jar in builder_args.values('--compiler_jar'):
+                components.append(self._file_digest(jar))
+
+            for flagfile in builder_args.compiler_values('--flagfile'):
+                components.append(googkit.lib.file.digest(flagfile))
+        except (GoogkitError, IOError, OSError) as e:
+            logging.debug(_('Compile cache disabled: {message}').format(
+                message=str(e)))
+            return None
+
+        return googkit.lib.cache.digest(*components)
+
+    def compiler_arguments(self, builder_args):
+        """Returns a list of arguments for Closure Compiler that is
+        equivalent to the specified arguments for Closure Builder.
+        Scripts passed to the compiler are sorted by their dependencies.
+        """
+        roots = tuple(builder_args.values('--root'))
+        namespaces = builder_args.values('--namespace')
+        graph = self._deps_graph(roots)
+
+        args = ['--js={path}'.format(path=path)
+                for path in graph.sources_for(*namespaces)]
+        args += ['--js_output_file={path}'.format(path=path)
+                 for path in builder_args.values('--output_file')]
+        args += builder_args.values('--compiler_flags')
+        return args
+
+    def _compile(self, args, prefix=None):
+        """Runs Closure Compiler with the specified arguments, and returns
+        messages from it.
+        The compiler server is used if it is available. Messages are logged
+        line by line with the prefix while the compiler is running.
+        """
+        if self.compiler_server is not None:
+            (exit_code, output) = self.compiler_server.compile(args, prefix)
         else:
-            logging.debug(result[1].decode())
+            if googkit.lib.file.which('java') is None:
+                raise GoogkitError(_('Required command not found: java'))
+
+            cmd = ['java', '-jar', self.config.compiler()] + args
+            (exit_code, output) = googkit.lib.process.run(cmd, prefix)
+
+        if exit_code != 0:
+            raise GoogkitError(_('Compilation failed:\n{message}').format(
+                message=output))
+
+        return output
+
+    def _build(self, builder_args, project_root):
+        """Compiles a script by the specified arguments for Closure Builder,
+        and returns messages from Closure Compiler.
+        Compiled files are restored from the compile cache if the entry point
+        and its dependencies have not been changed.
+        Scripts are passed to Closure Compiler directly in the order of their
+        dependencies, so Closure Builder is not needed to scan the roots.
+        """
+        output_paths = (builder_args.values('--output_file') +
+                        builder_args.compiler_values('--create_source_map'))
+        entry_point = ', '.join(builder_args.values('--namespace'))
+        cache = None
+        key = None
+
+        if not self.env.argument.option('--no-cache'):
+            cache = self._compile_cache(project_root)
+            with self.profile('cache_key', entry_point):
+                key = self.cache_key(builder_args)
+
+        if key is not None:
+            with self.profile('cache_restore', entry_point):
+                log = cache.restore(key, output_paths)
+
+            if log is not None:
+                logging.debug(_('Restored from the compile cache: {paths}').format(
+                    paths=', '.join(output_paths)))
+                googkit.lib.process.log_lines(log, entry_point)
+                return log
+
+        args = self.compiler_arguments(builder_args)
+        with self.profile('compile', entry_point):
+            log = self._compile(args, entry_point)
+
+        if key is not None:
+            with self.profile('cache_store', entry_point):
+                cache.store(key, output_paths, log)
+
+        return log
 
     def html_requiring_js(self):
         """Returns path list of HTMLs requiring built JavaScript.
@@ -188,41 +729,361 @@ class BuildCommand(Command):
 
         return filter(lambda path: path != testrunner, html_list)
 
-    def build_debug(self, html_path, project_root, should_clean=False):
-        """Builds resources is in the specified project root for debugging.
-        Removes old resources if should_clean is True.
+    def build_debug(self, html_path, project_root):
+        """Builds a script for the specified HTML for debugging, and returns
+        messages from Closure Compiler.
+        Resources should be copied to the debug directory before building.
         """
         config = self.config
-        self.setup_files(config.debug_dir(), should_clean)
-
-        logging.info(_('Building for debug: ') + html_path)
         args = self.debug_arguments(html_path, project_root)
-        self._build(args, project_root)
+        log = self._build(args, project_root)
 
         # The root path should be set by 'sourceRoot', but Closure Compiler
         # doesn't support this attribute.
         # So set 'sourceRoot' to 'project_root' directory manually until
         # Closure Compiler supports this feature.
         html_relpath = os.path.relpath(html_path, config.development_dir())
-        debug_html_path = os.path.join(config.debug_dir(), html_relpath)
+        debug_html_path = os.path.join(self.output_dir(), html_relpath)
         compiled_js_path = self.compiled_js_path(debug_html_path)
         source_map_path = compiled_js_path + '.map'
 
         self.modify_source_map(source_map_path, project_root)
+        return log
 
-        logging.info(_('Done.'))
+    def build_production(self, html_path, project_root):
+        """Builds a script for the specified HTML for production, and returns
+        messages from Closure Compiler.
+        Resources should be copied to the production directory before building.
+        """
+        args = self.production_arguments(html_path, project_root)
+        return self._build(args, project_root)
 
-    def build_production(self, html_path, project_root, should_clean=False):
-        """Builds resources is in the specified project root for production.
-        Removes old resources if should_clean is True.
+    def build_all(self, html_list, project_root):
+        """Builds scripts for the specified HTMLs at the same time.
+        The number of parallel builds is specified by the --jobs option.
+        Progress is logged whenever a build finished, and a GoogkitError is
+        raised after all builds finished if some of them failed.
+        """
+        if self.env.argument.option('--debug'):
+            build = self.build_debug
+            message = _('Built for debug: {path}')
+        else:
+            build = self.build_production
+            message = _('Built for production: {path}')
+
+        should_hash = self.config.hash_compiled_js()
+        progress = googkit.lib.process.Progress(len(html_list))
+
+        def build_page(html_path):
+            try:
+                log = build(html_path, project_root)
+                if should_hash:
+                    self.hash_compiled_file(self.target_js_path(html_path))
+                progress.step(message.format(path=html_path))
+                return (log, None)
+            except GoogkitError as e:
+                progress.step(_('Failed: {path}').format(path=html_path))
+                return (None, e)
+
+        jobs = googkit.lib.parallel.jobs(self.env.argument.option('--jobs'))
+        results = googkit.lib.parallel.imap(build_page, html_list, jobs)
+        errors = []
+
+        for html_path, (log, error) in zip(html_list, results):
+            if error is not None:
+                errors.append(_('{path}: {message}').format(
+                    path=html_path,
+                    message=str(error)))
+
+        if errors:
+            raise GoogkitError('\n'.join(errors))
+
+    def modules(self, graph, html_list):
+        """Returns a list of tuples (name, scripts, dependencies) for
+        Closure Compiler modules to build the specified HTMLs at once.
+        Scripts required by multiple HTMLs and the base script of Closure
+        Library are put into the shared module, and other scripts are put
+        into the module for each HTML that depends on the shared module.
+        """
+        namespaces = [self.namespace_by_html(html_path) for html_path in html_list]
+        sources = dict((namespace, graph.sources_for(namespace))
+                       for namespace in namespaces)
+
+        counts = {}
+        for namespace in namespaces:
+            for path in sources[namespace]:
+                counts[path] = counts.get(path, 0) + 1
+
+        # The base script always comes first
+        all_sources = graph.sources_for(*namespaces)
+        shared = [path for path in all_sources
+                  if counts[path] > 1 or path == all_sources[0]]
+        shared_set = set(shared)
+
+        result = [(BuildCommand.SHARED_MODULE, shared, [])]
+        for namespace in namespaces:
+            paths = [path for path in sources[namespace] if path not in shared_set]
+            result.append((namespace, paths, [BuildCommand.SHARED_MODULE]))
+
+        return result
+
+    def single_pass_arguments(self, modules, output_dir, compiled_js_paths):
+        """Returns a list of arguments for Closure Compiler to build all
+        modules by one compilation.
+        Each module is written to ``{output_dir}/{module name}.js``, and it
+        should be moved to the specified compiled js path for the module.
         """
         config = self.config
-        self.setup_files(config.production_dir(), should_clean)
+        is_debug = self.env.argument.option('--debug')
+        args = []
 
-        logging.info(_('Building for production: ' + html_path))
-        args = self.production_arguments(html_path, project_root)
-        self._build(args, project_root)
-        logging.info(_('Done.'))
+        for (name, paths, deps) in modules:
+            args += ['--js={path}'.format(path=path) for path in paths]
+
+        for (name, paths, deps) in modules:
+            spec = '{name}:{count}'.format(name=name, count=len(paths))
+            if deps:
+                spec += ':' + ','.join(deps)
+            args.append('--module={spec}'.format(spec=spec))
+
+        args.append('--module_output_path_prefix={prefix}'.format(
+            prefix=os.path.join(output_dir, '')))
+        args.append('--compilation_level={level}'.format(
+            level=config.compilation_level()))
+
+        if is_debug:
+            args.append('--source_map_format=V3')
+            args.append('--create_source_map=%outname%.map')
+            for (name, paths, deps) in modules:
+                source_map = os.path.basename(compiled_js_paths[name]) + '.map'
+                args.append('--module_wrapper={name}:%s%n%//# sourceMappingURL={path}'.format(
+                    name=name,
+                    path=source_map))
+            flagfile = config.compiler_flagfile_for_debug()
+        else:
+            args.append('--define=goog.DEBUG=false')
+            flagfile = config.compiler_flagfile()
+
+        if os.path.exists(flagfile):
+            args.append('--flagfile={path}'.format(path=flagfile))
+
+        return args
+
+    def module_js_paths(self, html_list):
+        """Returns a dictionary of compiled js paths for each module on
+        a single-pass build.
+        """
+        shared_path = os.path.join(self.output_dir(), BuildCommand.SHARED_MODULE)
+        result = {BuildCommand.SHARED_MODULE: self.compiled_js_path(shared_path)}
+
+        for html_path in html_list:
+            namespace = self.namespace_by_html(html_path)
+            result[namespace] = self.target_js_path(html_path)
+
+        return result
+
+    def target_js_path(self, html_path):
+        """Returns a compiled js path in the target directory by a path of
+        the HTML in the development directory.
+        """
+        html_relpath = os.path.relpath(html_path, self.config.development_dir())
+        return self.compiled_js_path(os.path.join(self.output_dir(), html_relpath))
+
+    def build_single_pass(self, html_list, project_root):
+        """Builds scripts for the specified HTMLs by one compilation.
+        Scripts shared by the HTMLs are compiled into one shared script, so
+        they are parsed and checked only once.
+        """
+        config = self.config
+        lib_path = os.path.relpath(config.library_root(), project_root)
+        graph = self._deps_graph((lib_path, config.js_dev_dir()))
+        modules = self.modules(graph, html_list)
+        compiled_js_paths = self.module_js_paths(html_list)
+
+        output_dir = tempfile.mkdtemp()
+        try:
+            args = self.single_pass_arguments(modules, output_dir, compiled_js_paths)
+            with self.profile('compile', BuildCommand.SHARED_MODULE):
+                self._compile(args, BuildCommand.SHARED_MODULE)
+
+            for (name, paths, deps) in modules:
+                output_path = os.path.join(output_dir, name + '.js')
+                compiled_js_path = compiled_js_paths[name]
+                shutil.move(output_path, compiled_js_path)
+
+                if os.path.exists(output_path + '.map'):
+                    shutil.move(output_path + '.map', compiled_js_path + '.map')
+                    self.modify_source_map(compiled_js_path + '.map', project_root)
+
+                if config.hash_compiled_js():
+                    self.hash_compiled_file(compiled_js_path)
+        finally:
+            shutil.rmtree(output_dir)
+
+        for html_path in html_list:
+            logging.info(_('Built: {path}').format(path=html_path))
+
+    def affected_pages(self, graph, html_list, script_paths):
+        """Returns a set of HTMLs whose scripts depend on any of the specified
+        scripts.
+        HTMLs whose dependencies cannot be resolved are also returned, so that
+        the errors are reported by building them.
+        """
+        result = set()
+
+        for html_path in html_list:
+            try:
+                sources = graph.sources_for(self.namespace_by_html(html_path))
+            except GoogkitError:
+                result.add(html_path)
+                continue
+
+            if not script_paths.isdisjoint(sources):
+                result.add(html_path)
+
+        return result
+
+    def update_file(self, path, target_dir):
+        """Applies the specified changed file in the development directory to
+        the target directory without compiling.
+        The file is removed from the target directory if it was deleted, and
+        so are directories left empty by deleting the file.
+        """
+        config = self.config
+        target_path = os.path.join(
+            target_dir, os.path.relpath(path, config.development_dir()))
+
+        gzip_ext = googkit.lib.compress.GZIP_EXT
+
+        if not os.path.exists(path):
+            removed_paths = [target_path]
+            if BuildCommand.is_html(path):
+                compiled_js_path = self.compiled_js_path(target_path)
+                compiled_js_path = self._hashed_paths.pop(compiled_js_path, compiled_js_path)
+                removed_paths += [compiled_js_path, compiled_js_path + '.map']
+
+            # Precompressed copies are also removed not to be served
+            for removed_path in removed_paths + [removed_path + gzip_ext for removed_path in removed_paths]:
+                if os.path.lexists(removed_path):
+                    os.remove(removed_path)
+
+            # Directories deleted in the development directory are removed
+            # after all files in them are removed
+            if not os.path.isdir(os.path.dirname(path)):
+                googkit.lib.file.remove_empty_dirs(os.path.dirname(target_path), target_dir)
+
+            logging.info(_('Deleted: {path}').format(path=target_path))
+            return
+
+        target_subdir = os.path.dirname(target_path)
+        if not os.path.exists(target_subdir):
+            os.makedirs(target_subdir)
+
+        # The precompressed copy is stale, and compressed again by rebuild if
+        # compression is enabled
+        if os.path.lexists(target_path + gzip_ext):
+            os.remove(target_path + gzip_ext)
+
+        if BuildCommand.is_html(path):
+            # HTMLs are always copied because they are converted
+            googkit.lib.file.stage(path, target_path)
+            self.compile_resource(target_path)
+        else:
+            googkit.lib.file.stage(path, target_path, mode=self.staging_mode())
+
+        logging.info(_('Copied: {path}').format(path=target_path))
+
+    def rebuild(self, changed_paths, target_dir, project_root):
+        """Rebuilds only pages affected by the specified changed files in
+        the development directory.
+        Changed scripts are applied to the dependency graph incrementally,
+        and other files are copied to the target directory without compiling.
+        """
+        config = self.config
+        js_dev_dir = config.js_dev_dir()
+        lib_path = os.path.relpath(config.library_root(), project_root)
+        graph = self._deps_graph((lib_path, js_dev_dir))
+        html_list = list(self.html_requiring_js())
+
+        script_paths = set()
+        pages = set()
+
+        for path in sorted(changed_paths):
+            with self._lock:
+                self._digests.pop(path, None)
+
+            if path.startswith(os.path.join(js_dev_dir, '')):
+                # Scripts in js_dev are compiled instead of copying
+                if path.endswith('.js'):
+                    script_paths.add(path)
+                continue
+
+            self.update_file(path, target_dir)
+            if path in html_list:
+                pages.add(path)
+
+        if script_paths:
+            # Pages that depended on the scripts before the change should also
+            # be rebuilt
+            pages |= self.affected_pages(graph, html_list, script_paths)
+            try:
+                for path in script_paths:
+                    graph.update(path)
+            finally:
+                pages |= self.affected_pages(graph, html_list, script_paths)
+
+                if self.parse_cache is not None:
+                    self.parse_cache.save()
+
+        if not pages:
+            if self.should_compress():
+                self.compress_files(target_dir)
+            return
+
+        if self.env.argument.option('--single-pass'):
+            # All modules are compiled at once
+            pages = set(html_list)
+            self.build_single_pass(html_list, project_root)
+        else:
+            self.build_all(sorted(pages), project_root)
+
+        if config.hash_compiled_js():
+            # HTMLs should refer to new hashed names
+            self.write_manifest(target_dir)
+            for html_path in sorted(pages):
+                self.update_file(html_path, target_dir)
+
+        if self.should_compress():
+            self.compress_files(target_dir)
+
+    def watch(self, target_dir, project_root):
+        """Watches the development directory, and rebuilds pages affected by
+        changed files until interrupted.
+        """
+        config = self.config
+        ignores = (
+            config.testrunner(),
+            config.library_root(),
+            config.compiler_root(),
+            config.dev_bundle_dir(),
+            config.page_deps_dir())
+
+        watcher = googkit.lib.watch.watcher(
+            config.development_dir(),
+            ignore=lambda path: path in ignores)
+        logging.info(_('Watching for changes... (Press Ctrl+C to stop)'))
+
+        try:
+            while True:
+                changed_paths = watcher.wait()
+                try:
+                    self.rebuild(changed_paths, target_dir, project_root)
+                except GoogkitError as e:
+                    logging.error(str(e))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
 
     def debug_arguments(self, html_path, project_root):
         """Returns an arguments for Closure Compiler to build debugging.
@@ -230,7 +1091,7 @@ class BuildCommand(Command):
         """
         config = self.config
         html_relpath = os.path.relpath(html_path, config.development_dir())
-        debug_html_path = os.path.join(config.debug_dir(), html_relpath)
+        debug_html_path = os.path.join(self.output_dir(), html_relpath)
         compiled_js_path = self.compiled_js_path(debug_html_path)
         source_map_path = compiled_js_path + '.map'
         source_map = os.path.basename(source_map_path)
@@ -266,7 +1127,7 @@ class BuildCommand(Command):
         """
         config = self.config
         html_relpath = os.path.relpath(html_path, config.development_dir())
-        production_html_path = os.path.join(config.production_dir(), html_relpath)
+        production_html_path = os.path.join(self.output_dir(), html_relpath)
         compiled_js_path = self.compiled_js_path(production_html_path)
         lib_path = os.path.relpath(config.library_root(), project_root)
 
@@ -293,20 +1154,77 @@ class BuildCommand(Command):
         """
         source_root = os.path.relpath(project_root, self.config.debug_dir())
 
-        with open(source_map) as source_map_file:
-            source_map_content = json.load(source_map_file)
-            source_map_content['sourceRoot'] = source_root
+        with self.profile('modify_source_map', source_map):
+            with open(source_map) as source_map_file:
+                source_map_content = json.load(source_map_file)
+                source_map_content['sourceRoot'] = source_root
 
-        with open(source_map, 'w') as source_map_file:
-            json.dump(source_map_content, source_map_file)
+            with open(source_map, 'w') as source_map_file:
+                json.dump(source_map_content, source_map_file)
 
     def run_internal(self):
         project_root = googkit.lib.path.project_root(self.env.cwd)
         with working_directory(project_root):
             should_clean = self.env.argument.option('--clean')
+            target_dir = self.target_dir()
 
-            for html_path in self.html_requiring_js():
-                if self.env.argument.option('--debug'):
-                    self.build_debug(html_path, project_root, should_clean)
+            if self.env.argument.option('--compiler-server'):
+                # Each page built in parallel has its own worker
+                jobs = googkit.lib.parallel.jobs(self.env.argument.option('--jobs'))
+                self.compiler_server = CompilerServer(self.config.compiler(), jobs)
+
+            if not self.env.argument.option('--no-cache'):
+                cache_dir = self.config.cache_dir()
+                self.parse_cache = ParseCache(
+                    googkit.lib.path.deps_cache(project_root, cache_dir),
+                    googkit.lib.path.deps_index(project_root, cache_dir))
+                self.parse_cache.load()
+
+            try:
+                # Clean builds are written to the staging directory, so the
+                # target directory is available until they are finished
+                output_dir = target_dir
+                if should_clean:
+                    output_dir = self.begin_clean_build(target_dir)
+
+                should_hash = self.config.hash_compiled_js()
+                if should_hash:
+                    # HTMLs are converted after compiling because they refer
+                    # to hashed names of compiled scripts
+                    self.stage_files(output_dir)
+                else:
+                    self.setup_files(output_dir)
+
+                html_list = list(self.html_requiring_js())
+                if self.env.argument.option('--single-pass'):
+                    self.build_single_pass(html_list, project_root)
+                else:
+                    self.build_all(html_list, project_root)
+
+                if should_hash:
+                    self.write_manifest(output_dir)
+                    self.compile_resources(output_dir)
                 else:
-                    self.build_production(html_path, project_root, should_clean)
+                    # Hashed scripts left by previous builds are not used
+                    self.remove_manifest(output_dir)
+
+                if self.should_compress():
+                    self.compress_files(output_dir)
+                else:
+                    # Compressed copies left by previous builds are stale
+                    self.remove_compressed_files(output_dir)
+
+                if should_clean:
+                    self.finish_clean_build(target_dir)
+
+                self.evict_cache()
+
+                if self.env.argument.option('--watch'):
+                    self.watch(target_dir, project_root)
+            finally:
+                self.abort_clean_build()
+
+                if self.compiler_server is not None:
+                    self.compiler_server.stop()
+
+        logging.info(_('Done.'))
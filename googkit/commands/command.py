@@ -1,11 +1,13 @@
 import logging
 import os
 import googkit.lib.path
+import googkit.lib.profile
 from googkit.lib.config import Config
 from googkit.lib.error import GoogkitError
 from googkit.lib.error import InvalidOptionError
 from googkit.lib.i18n import _
 from googkit.lib.logutil import log_level
+from googkit.lib.profile import Profiler
 
 
 class Command(object):
@@ -17,6 +19,7 @@ class Command(object):
         """
         self.env = env
         self.config = None
+        self.profiler = None
 
     @classmethod
     def needs_project_config(cls):
@@ -69,7 +72,42 @@ class Command(object):
         with log_level(level):
             self._validate_options()
             self._setup()
-            self.run_internal()
+
+            # The profiler may be shared by a sequence command
+            if self.profiler is None and self.env.argument.option('--profile'):
+                self.profiler = Profiler()
+                self.run_internal()
+                self.write_profile_report()
+            else:
+                self.run_internal()
+
+    def profile(self, phase, target=None):
+        """Returns a context manager that measures elapsed time of the phase
+        if the --profile option is specified.
+
+        Usage::
+            with self.profile('compile', html_path):
+                self.compile(html_path)
+        """
+        return googkit.lib.profile.measure(self.profiler, phase, target)
+
+    def write_profile_report(self):
+        """Writes a report of the profiler to the path specified by the
+        --profile option, and logs the summary.
+        The report is written into the cache directory of the project if the
+        path is not specified.
+        """
+        path = self.env.argument.option('--profile')
+        if path is True:
+            project_root = googkit.lib.path.project_root(self.env.cwd)
+            if self.config is not None:
+                cache_dir = self.config.cache_dir()
+            else:
+                cache_dir = googkit.lib.path.CACHE_DIR
+            path = googkit.lib.path.profile_report(project_root or self.env.cwd, cache_dir)
+
+        command = ' '.join(self.env.argument.commands)
+        googkit.lib.profile.write_report(self.profiler, path, command)
 
     def run_internal(self):
         """Internal method for running command.
@@ -17,6 +17,12 @@ class DownloadCommand(Command):
     def needs_project_config(cls):
         return True
 
+    @classmethod
+    def supported_options(cls):
+        opts = super(DownloadCommand, cls).supported_options()
+        opts.add('--profile')
+        return opts
+
     def download_closure_library(self):
         """Downloads Closure Library resources to the library root that defined in a config file.
         """
@@ -64,5 +70,7 @@ class DownloadCommand(Command):
     def run_internal(self):
         project_root = googkit.lib.path.project_root(self.env.cwd)
         with working_directory(project_root):
-            self.download_closure_library()
-            self.download_closure_compiler()
+            with self.profile('download_library'):
+                self.download_closure_library()
+            with self.profile('download_compiler'):
+                self.download_closure_compiler()
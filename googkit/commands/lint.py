@@ -1,8 +1,8 @@
 import glob
 import logging
 import os.path
-import subprocess
 import googkit.lib.path
+import googkit.lib.process
 from googkit.commands.command import Command
 from googkit.lib.option_builder import OptionBuilder
 from googkit.lib.dirutil import working_directory
@@ -15,6 +15,12 @@ class LintCommand(Command):
     def needs_project_config(cls):
         return True
 
+    @classmethod
+    def supported_options(cls):
+        opts = super(LintCommand, cls).supported_options()
+        opts.add('--profile')
+        return opts
+
     def _sources(self):
         js_dev = self.config.js_dev_dir()
         deps_js = self.config.deps_js()
@@ -22,9 +28,8 @@ class LintCommand(Command):
         pattern = os.path.join(js_dev, '*.js')
         paths = glob.glob(pattern)
 
-        if deps_js in paths:
-            paths.remove(deps_js)
-        return paths
+        # The generated deps.js is not linted
+        return [path for path in paths if path != deps_js]
 
     def lint(self):
         """Lints project resouces by using Closure Linter.
@@ -41,15 +46,8 @@ class LintCommand(Command):
 
         cmd = ['gjslint'] + [str(arg) for arg in args] + paths
 
-        popen_args = {
-            'stdout': subprocess.PIPE,
-            'stderr': subprocess.PIPE
-        }
-
-        proc = subprocess.Popen(cmd, **popen_args)
-        result = proc.communicate()
-
-        logging.info(result[0].decode())
+        with self.profile('gjslint'):
+            googkit.lib.process.run(cmd, level=logging.INFO)
 
     def run_internal(self):
         project_root = googkit.lib.path.project_root(self.env.cwd)
@@ -1,4 +1,7 @@
 from googkit.commands.command import Command
+from googkit.lib.argument import Argument
+from googkit.lib.environment import Environment
+from googkit.lib.profile import Profiler
 
 
 class SequenceCommand(Command):
@@ -9,7 +12,39 @@ class SequenceCommand(Command):
         # Override to set internal commands
         return []
 
+    @classmethod
+    def supported_options(cls):
+        """Returns a set of options supported by any of internal commands.
+        """
+        opts = super(SequenceCommand, cls).supported_options()
+        for CommandClass in cls._internal_commands():
+            opts |= CommandClass.supported_options()
+        return opts
+
+    def _internal_environment(self, CommandClass):
+        """Returns an environment for the internal command that has only
+        options supported by the command.
+        """
+        supported_opts = CommandClass.supported_options()
+        options = dict((name, value) for (name, value) in self.env.argument.options.items()
+                       if name in supported_opts)
+        argument = Argument(self.env.argument.commands, options)
+        return Environment(self.env.cwd, argument, self.env.tree)
+
     def run(self):
+        # Options are validated against all internal commands before running
+        # any of them
+        self._validate_options()
+
+        # Internal commands share one profiler to report them at once
+        if self.env.argument.option('--profile'):
+            self.profiler = Profiler()
+
         for CommandClass in self.__class__._internal_commands():
-            command = CommandClass(self.env)
-            command.run()
+            command = CommandClass(self._internal_environment(CommandClass))
+            command.profiler = self.profiler
+            with self.profile(type(command).__name__):
+                command.run()
+
+        if self.profiler is not None:
+            self.write_profile_report()
@@ -0,0 +1,356 @@
+import fnmatch
+import io
+import json
+import logging
+import os
+import threading
+import time
+import googkit.lib.compress
+import googkit.lib.path
+import googkit.lib.server
+import googkit.lib.watch
+from googkit.commands.apply_config import ApplyConfigCommand
+from googkit.commands.build import BuildCommand
+from googkit.commands.command import Command
+from googkit.commands.update_deps import UpdateDepsCommand
+from googkit.lib.cache import LRUCache
+from googkit.lib.deps import ParseCache
+from googkit.lib.dirutil import working_directory
+from googkit.lib.error import GoogkitError
+from googkit.lib.i18n import _
+from googkit.lib.server import Resource
+
+
+def is_in(path, dirpath):
+    """Whether the path is in the directory.
+    """
+    return os.path.abspath(path).startswith(os.path.join(os.path.abspath(dirpath), ''))
+
+
+class ServeCommand(Command):
+    """Command class that serves the project by a local HTTP server.
+    Configs are applied to files in the development directory in memory, and
+    deps.js is generated from the dependency index in memory, so files on
+    the disk are not rewritten.
+    Only files in the development directory and the library that pages load
+    are served, so configs and caches in the project are not exposed.
+    The production directory is served instead with the --production option.
+    """
+
+    """Default host to listen on.
+    """
+    DEFAULT_HOST = '127.0.0.1'
+
+    """Default port to listen on.
+    """
+    DEFAULT_PORT = 8000
+
+    """Maximum number of responses kept in the cache.
+    """
+    MAX_CACHE_ENTRIES = 1024
+
+    """Minimum interval in seconds to check changes of scripts for deps.js
+    if the watcher walks the js_dev directory for each check.
+    """
+    DEPS_POLL_INTERVAL = 1.0
+
+    def __init__(self, env):
+        super(ServeCommand, self).__init__(env)
+        self.apply_config_command = None
+        self.update_deps_command = None
+        self._cache = LRUCache(ServeCommand.MAX_CACHE_ENTRIES)
+        self._hashed_urls = (None, set())
+        self._deps_sources = None
+        self._deps_watcher = None
+        self._deps_polled = 0
+        self._deps_resources = (None, {})
+        self._deps_lock = threading.Lock()
+
+    @classmethod
+    def needs_project_config(cls):
+        return True
+
+    @classmethod
+    def supported_options(cls):
+        opts = super(ServeCommand, cls).supported_options()
+        opts.add('--host')
+        opts.add('--port')
+        opts.add('--production')
+        return opts
+
+    def address(self):
+        """Returns a tuple of the host and the port to listen on by the
+        --host and --port options.
+        Raise a GoogkitError if the port is invalid.
+        """
+        host = self.env.argument.option('--host')
+        if host is None or host is True:
+            host = ServeCommand.DEFAULT_HOST
+
+        port = self.env.argument.option('--port')
+        if port is None or port is True:
+            return (host, ServeCommand.DEFAULT_PORT)
+
+        try:
+            return (host, int(port))
+        except ValueError:
+            raise GoogkitError(_('Invalid port: {port}').format(port=port))
+
+    def is_config_target(self, path):
+        """Whether configs should be applied to the file specified the path.
+        """
+        config = self.config
+        (base, ext) = os.path.splitext(path)
+        if ext not in ApplyConfigCommand.CONFIG_TARGET_EXT:
+            return False
+
+        ignores = (
+            config.library_root(),
+            config.compiler_root(),
+            config.dev_bundle_dir(),
+            config.page_deps_dir())
+
+        return is_in(path, config.development_dir()) and not any([is_in(path, dirpath) for dirpath in ignores])
+
+    def is_served(self, path):
+        """Whether the file specified the path can be served.
+        Files out of the development directory and the library, or in the
+        compiler directory are not served.
+        """
+        config = self.config
+        if is_in(path, config.compiler_root()):
+            return False
+
+        return is_in(path, config.development_dir()) or is_in(path, config.library_root())
+
+    def is_deps_js(self, path):
+        """Whether the file specified the path is a deps.js generated by
+        googkit.
+        """
+        config = self.config
+        path = os.path.normpath(path)
+
+        if path == os.path.normpath(config.deps_js()):
+            return True
+
+        return config.deps_per_page() and fnmatch.fnmatch(path, os.path.normpath(config.page_deps_js('*')))
+
+    def deps_sources(self):
+        """Returns a list of Source for scripts in the js_dev directory.
+        The directory is scanned only at the first request. After that, only
+        scripts reported by the watcher are parsed again, so files are not
+        checked for each request.
+        """
+        with self._deps_lock:
+            self._update_deps_sources()
+            return self._sorted_deps_sources()
+
+    def _sorted_deps_sources(self):
+        return [self._deps_sources[path] for path in sorted(self._deps_sources.keys())]
+
+    def _update_deps_sources(self):
+        # Returns whether any script is changed since the last call
+        update_deps = self.update_deps_command
+
+        if self._deps_sources is None:
+            # Start watching before scanning not to miss changes
+            deps_js = os.path.normpath(self.config.deps_js())
+            self._deps_watcher = googkit.lib.watch.watcher(
+                self.config.js_dev_dir(),
+                ignore=lambda path: os.path.normpath(path) == deps_js)
+            self._deps_sources = dict([(source.path, source) for source in update_deps.sources()])
+            return True
+
+        # The polling watcher walks the directory for each check, so it is
+        # checked at most once per interval
+        if isinstance(self._deps_watcher, googkit.lib.watch.PollingWatcher):
+            now = time.time()
+            if now - self._deps_polled < ServeCommand.DEPS_POLL_INTERVAL:
+                return False
+            self._deps_polled = now
+
+        changed = False
+        changed_paths = self._deps_watcher.poll(0)
+        while changed_paths:
+            for path in changed_paths:
+                changed = self._update_deps_source(path) or changed
+            changed_paths = self._deps_watcher.poll(0)
+
+        return changed
+
+    def _update_deps_source(self, path):
+        # Returns whether the sources are changed by the path
+        if not path.endswith('.js'):
+            return False
+
+        try:
+            self._deps_sources[path] = self.update_deps_command.parse_cache.parse(path)
+        except (IOError, OSError):
+            # Removed
+            return self._deps_sources.pop(path, None) is not None
+
+        return True
+
+    def deps_js_resource(self, path):
+        """Returns a resource for the deps.js specified the path, or None if
+        it is not for any page.
+        Resources are generated again only if scripts or pages are changed,
+        so their ETags are kept and only changed scripts are parsed again.
+        """
+        update_deps = self.update_deps_command
+
+        with self._deps_lock:
+            changed = self._update_deps_sources()
+
+            # Pages add or remove deps.js for them
+            namespaces = update_deps.page_namespaces() if self.config.deps_per_page() else []
+            if changed or self._deps_resources[0] != namespaces:
+                contents = update_deps.deps_js_contents(self._sorted_deps_sources())
+                resources = dict([
+                    (os.path.normpath(deps_js), Resource.from_content(content.encode('utf-8'), deps_js))
+                    for (deps_js, content) in contents.items()])
+                self._deps_resources = (namespaces, resources)
+
+            return self._deps_resources[1].get(os.path.normpath(path))
+
+    def config_applied_resource(self, path):
+        """Returns a resource that has the content of the file specified the
+        path with configs applied.
+        """
+        with io.open(path, encoding='utf-8', errors='replace') as fp:
+            lines = list(fp)
+
+        rewriter = self.apply_config_command.rewriter()
+        content = ''.join(rewriter.rewrite_lines(lines, path))
+        return Resource.from_content(content.encode('utf-8'), path)
+
+    def resolve(self, url_path):
+        """Returns a resource for the URL path, or None if it is not found.
+        Resources are cached until the file is changed.
+        """
+        path = googkit.lib.server.local_path(url_path)
+        if not self.is_served(path):
+            return None
+
+        if self.is_deps_js(path):
+            return self.deps_js_resource(path)
+
+        if not os.path.isfile(path):
+            return None
+
+        # Take the status before reading not to miss changes while reading
+        stat = os.stat(path)
+        key = [stat.st_mtime, stat.st_size]
+        entry = self._cache.get(path)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+
+        if self.is_config_target(path) and self.apply_config_command.rewriter().may_match(path):
+            resource = self.config_applied_resource(path)
+        else:
+            resource = Resource.from_file(path, stat)
+
+        self._cache.put(path, (key, resource))
+        return resource
+
+    def hashed_urls(self):
+        """Returns a set of URLs for scripts that have the content hash in
+        their names and their source maps in the production directory.
+        The manifest of the build is read again only if it is changed.
+        """
+        manifest_path = os.path.join(self.config.production_dir(), BuildCommand.MANIFEST_FILE)
+        try:
+            stat = os.stat(manifest_path)
+        except OSError:
+            return set()
+
+        key = [stat.st_mtime, stat.st_size]
+        if self._hashed_urls[0] == key:
+            return self._hashed_urls[1]
+
+        with open(manifest_path) as fp:
+            manifest = json.load(fp)
+
+        urls = set()
+        for url in manifest.values():
+            urls.add(url)
+            urls.add(url + '.map')
+
+        self._hashed_urls = (key, urls)
+        return urls
+
+    def resolve_production(self, url_path):
+        """Returns a resource for the URL path in the production directory, or
+        None if it is not found.
+        Precompressed copies are sent if they are up to date, and scripts that
+        have the content hash in their names are cached by browsers forever.
+        """
+        relpath = googkit.lib.server.local_path(url_path)
+        path = os.path.join(self.config.production_dir(), relpath)
+        if not os.path.isfile(path):
+            return None
+
+        resource = Resource.from_file(path)
+        if relpath.replace(os.sep, '/') in self.hashed_urls():
+            resource.cache_control = googkit.lib.server.IMMUTABLE
+
+        if googkit.lib.compress.is_up_to_date(path):
+            resource.gzip_path = path + googkit.lib.compress.GZIP_EXT
+
+        return resource
+
+    def serve(self, server, path):
+        """Serves requests until interrupted.
+        """
+        logging.info(_('Serving {url} (Press Ctrl+C to stop)').format(
+            url=server.url(path)))
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    def serve_production(self):
+        """Serves the production directory until interrupted.
+        Each request is logged with the latency and the number of bytes sent.
+        Raise a GoogkitError if the project is not built.
+        """
+        production_dir = self.config.production_dir()
+        if not os.path.isdir(production_dir):
+            raise GoogkitError(_('Production directory not found: {path}').format(
+                path=production_dir))
+
+        server = googkit.lib.server.Server(self.address(), self.resolve_production)
+        server.access_log_level = logging.INFO
+        self.serve(server, '')
+
+    def run_internal(self):
+        project_root = googkit.lib.path.project_root(self.env.cwd)
+        with working_directory(project_root):
+            if self.env.argument.option('--production'):
+                self.serve_production()
+                return
+
+            self.apply_config_command = ApplyConfigCommand(self.env)
+            self.apply_config_command.config = self.config
+            self.apply_config_command.setup_main_scripts()
+
+            # The parse cache is shared with the build command
+            self.update_deps_command = UpdateDepsCommand(self.env)
+            self.update_deps_command.config = self.config
+            cache_dir = self.config.cache_dir()
+            parse_cache = ParseCache(
+                googkit.lib.path.deps_cache(project_root, cache_dir),
+                googkit.lib.path.deps_index(project_root, cache_dir))
+            parse_cache.load()
+            self.update_deps_command.parse_cache = parse_cache
+
+            server = googkit.lib.server.Server(self.address(), self.resolve)
+            try:
+                self.serve(server, self.config.development_dir() + '/')
+            finally:
+                if self._deps_watcher is not None:
+                    self._deps_watcher.close()
+                parse_cache.save()
@@ -1,66 +1,196 @@
+import glob
 import logging
 import os
 import re
-import subprocess
+import googkit.lib.deps
+import googkit.lib.file
 import googkit.lib.path
 import googkit.lib.strutil
+from googkit.commands.apply_config import ApplyConfigCommand
 from googkit.commands.command import Command
+from googkit.lib.bundle import DevBundler
+from googkit.lib.deps import DepsGraph, ParseCache
 from googkit.lib.dirutil import working_directory
 from googkit.lib.error import GoogkitError
 from googkit.lib.i18n import _
 
 
 class UpdateDepsCommand(Command):
+    def __init__(self, env):
+        super(UpdateDepsCommand, self).__init__(env)
+        self.parse_cache = None
+        self.bundler = None
+
     @classmethod
     def needs_project_config(cls):
         return True
 
-    def update_deps(self):
-        """Updates module dependencies by using depswriter.py.
+    @classmethod
+    def supported_options(cls):
+        opts = super(UpdateDepsCommand, cls).supported_options()
+        opts.add('--dev-bundle')
+        opts.add('--profile')
+        return opts
+
+    def _write_deps_js(self, path, content):
+        """Writes the content to the deps.js specified the path only if it is
+        changed.
+        """
+        if os.path.exists(path):
+            with open(path) as fp:
+                if fp.read() == content:
+                    logging.debug(_('Dependencies are not changed: {path}').format(path=path))
+                    return
+
+        googkit.lib.file.write_atomically(path, content)
+        logging.debug('Updated ' + path)
+
+    def page_namespaces(self):
+        """Returns a list of namespaces for the main scripts of pages in the
+        development directory.
         """
         config = self.config
-        js_dev_dir = config.js_dev_dir()
-        deps_js = config.deps_js()
+        devel_dir = config.development_dir()
+        testrunner = os.path.abspath(config.testrunner())
+        result = []
+
+        for ext in ApplyConfigCommand.HTML_LIKE_EXT:
+            for html_path in glob.glob(os.path.join(devel_dir, '*' + ext)):
+                if os.path.abspath(html_path) != testrunner:
+                    result.append(ApplyConfigCommand.namespace_by_html(html_path))
+
+        return sorted(result)
 
+    def deps_js_prefix(self):
+        """Returns a prefix for URLs of scripts in deps.js, that is a path for
+        the js_dev directory relative to base.js.
+        """
+        config = self.config
         base_js_dir = os.path.dirname(config.base_js())
-        js_dev_dir_rel = os.path.relpath(js_dev_dir, base_js_dir)
+        return os.path.relpath(config.js_dev_dir(), base_js_dir).replace(os.sep, '/')
 
-        args_format = {
-            'deps_js': deps_js,
-            'js_dev': js_dev_dir,
-            'js_dev_rel': js_dev_dir_rel,
-        }
+    def sources(self):
+        """Returns a list of Source for scripts in the js_dev directory except
+        the generated deps.js.
+        Only scripts changed since the last parse are parsed again if the
+        parse cache is available.
+        """
+        return googkit.lib.deps.parse_all(
+            self.config.js_dev_dir(),
+            self.parse_cache,
+            excludes=[self.config.deps_js()])
 
-        args = [
-            'python',
-            config.depswriter(),
-            '--root_with_prefix="{js_dev} {js_dev_rel}"'.format(**args_format),
-            '--output_file="{deps_js}"'.format(**args_format)
-        ]
-
-        popen_args = {
-            'shell': True,
-            'stdout': subprocess.PIPE,
-            'stderr': subprocess.PIPE,
+    def deps_js_contents(self, sources):
+        """Returns a dict from paths for deps.js files to their contents by
+        the script sources.
+        deps.js files for each page are included if the deps_per_page config
+        is enabled. They have only scripts that the main script of the page
+        depends on.
+        """
+        config = self.config
+        js_dev_dir = config.js_dev_dir()
+        prefix = self.deps_js_prefix()
+        result = {
+            config.deps_js(): googkit.lib.deps.deps_js_for(sources, js_dev_dir, prefix),
         }
 
-        # depswriter.py doesn't work with arguments including white-space.
-        # For example,
-        #   it works:
-        #
-        #     $ python depswriter.py --root_with_prefix="path path"
-        #
-        #   but it doesn't work:
-        #
-        #     $ python depswriter.py "--root_with_prefix=\"path path\""
-        proc = subprocess.Popen(' '.join(args), **popen_args)
-        result = proc.communicate()
-
-        if proc.returncode != 0:
-            raise GoogkitError(_('Updating dependencies failed: {message}').format(
-                message=result[1].decode()))
+        if not config.deps_per_page():
+            return result
+
+        graph = DepsGraph()
+        for source in sources:
+            graph.add(source)
+
+        for namespace in self.page_namespaces():
+            result[config.page_deps_js(namespace)] = googkit.lib.deps.deps_js_for(
+                graph.reachable(namespace), js_dev_dir, prefix)
 
-        logging.debug('Updated ' + deps_js)
+        return result
+
+    def page_deps_files(self):
+        """Returns paths for existing deps.js files for each page.
+        Only files in the directory for them are returned, so hand-written
+        scripts are never mistaken for generated ones.
+        """
+        pattern = self.config.page_deps_js('*')
+        return glob.glob(pattern)
+
+    def update_dev_bundles(self, sources):
+        """Updates a dev bundle for each page that concatenates scripts that
+        the main script of the page depends on in the order of their
+        dependencies. base.js is not bundled because pages load it by
+        themselves.
+        Dev bundles for removed pages are also removed.
+        """
+        config = self.config
+        base_js = os.path.normpath(config.base_js())
+
+        graph = DepsGraph(self.parse_cache)
+        with self.profile('scan_deps', config.library_root()):
+            graph.scan(config.library_root())
+        for source in sources:
+            graph.add(source)
+
+        bundle_paths = set()
+        for namespace in self.page_namespaces():
+            path = config.dev_bundle_js(namespace)
+            bundle_paths.add(os.path.normpath(path))
+
+            paths = [script for script in graph.sources_for(namespace)
+                     if os.path.normpath(script) != base_js]
+            with self.profile('dev_bundle', path):
+                if self.bundler.write(path, paths):
+                    logging.debug('Updated ' + path)
+
+        for path in self.dev_bundle_files():
+            if os.path.normpath(path) not in bundle_paths:
+                self.bundler.remove(path)
+                logging.debug(_('Removed {path}').format(path=path))
+
+    def dev_bundle_files(self):
+        """Returns paths for existing dev bundles.
+        """
+        pattern = self.config.dev_bundle_js('*')
+        return glob.glob(pattern)
+
+    def update_deps(self):
+        """Updates module dependencies in deps.js.
+        Only scripts changed since the last update are parsed again if the
+        parse cache is available, and deps.js is written only if the
+        dependencies are changed.
+        deps.js files for each page are also updated if the deps_per_page
+        config is enabled, and dev bundles are updated if the --dev-bundle
+        option is specified.
+        """
+        try:
+            sources = self.sources()
+            contents = self.deps_js_contents(sources)
+            for path in sorted(contents.keys()):
+                # The directory for deps.js files for each page is created
+                # on demand
+                deps_dir = os.path.dirname(path)
+                if path != self.config.deps_js() and not os.path.exists(deps_dir):
+                    os.makedirs(deps_dir)
+
+                self._write_deps_js(path, contents[path])
+
+            # deps.js files for removed pages are also removed
+            paths = set([os.path.normpath(path) for path in contents.keys()])
+            for path in self.page_deps_files():
+                if os.path.normpath(path) not in paths:
+                    os.remove(path)
+                    logging.debug(_('Removed {path}').format(path=path))
+
+            if self.bundler is not None:
+                self.update_dev_bundles(sources)
+        except (IOError, OSError) as e:
+            raise GoogkitError(_('Updating dependencies failed: {message}').format(
+                message=str(e)))
+        finally:
+            if self.parse_cache is not None:
+                self.parse_cache.save()
+            if self.bundler is not None:
+                self.bundler.save()
 
     def update_tests(self, line, tests):
         """Replace test file lists on the line by the specified scripts to unit-test.
@@ -120,7 +250,21 @@ class UpdateDepsCommand(Command):
     def run_internal(self):
         project_root = googkit.lib.path.project_root(self.env.cwd)
         with working_directory(project_root):
-            self.update_deps()
-            self.update_testrunner()
+            # The parse cache is shared with the build command
+            cache_dir = self.config.cache_dir()
+            self.parse_cache = ParseCache(
+                googkit.lib.path.deps_cache(project_root, cache_dir),
+                googkit.lib.path.deps_index(project_root, cache_dir))
+            self.parse_cache.load()
+
+            if self.env.argument.option('--dev-bundle'):
+                self.bundler = DevBundler(googkit.lib.path.bundle_index(
+                    project_root, self.config.cache_dir()))
+                self.bundler.load()
+
+            with self.profile('update_deps'):
+                self.update_deps()
+            with self.profile('update_testrunner'):
+                self.update_testrunner()
 
         logging.info(_('Updated dependencies.'))
@@ -0,0 +1,8 @@
+from __future__ import absolute_import
+
+try:
+    # 3.4 and later
+    from abc import ABC
+except ImportError:
+    import abc
+    ABC = abc.ABCMeta('ABC', (object,), {})
@@ -0,0 +1,5 @@
+try:
+    # 3.0 and later
+    from queue import Queue, Empty
+except ImportError:
+    from Queue import Queue, Empty
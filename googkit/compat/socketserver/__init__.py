@@ -0,0 +1,5 @@
+try:
+    # 3.0 and later
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from SocketServer import ThreadingMixIn
@@ -0,0 +1,9 @@
+import urllib
+
+
+if not hasattr(urllib, 'unquote'):
+    # 3.0 and later
+    import urllib.parse
+    unquote = urllib.parse.unquote
+else:
+    unquote = urllib.unquote
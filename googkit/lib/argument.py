@@ -34,9 +34,10 @@ class ArgumentParser(object):
     """
 
     """RegExp to check whether the string is a parameter.
-    The parameter should have a prefixed-hyphen.
+    The parameter should have a prefixed-hyphen, and its name can contain
+    hyphens like ``--no-cache``.
     """
-    OPTION_PATTERN = re.compile('(--?\w+)(?:=(.+))?')
+    OPTION_PATTERN = re.compile(r'(--?\w[\w-]*)(?:=(.+))?')
 
     @classmethod
     def parse(self, argv):
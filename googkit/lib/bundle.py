@@ -0,0 +1,224 @@
+import io
+import json
+import os
+import tempfile
+import googkit.compat.urllib.request
+import googkit.lib.file
+from googkit.lib.deps import MODULE_PATTERN
+
+
+"""Line put before a goog.module script in a dev bundle.
+The script is wrapped by goog.loadModule to have its own scope as if it is
+loaded by the debug loader.
+"""
+MODULE_HEADER = 'goog.loadModule(function(exports) {\'use strict\';\n'
+
+"""Line put after a goog.module script in a dev bundle.
+"""
+MODULE_FOOTER = 'return exports;});\n'
+
+
+def identity_mappings(line_count):
+    """Returns source map mappings that map each line of generated lines to
+    the same line of a source file.
+
+    Usage::
+        >>> identity_mappings(3)
+        'AAAA;AACA;AACA'
+    """
+    if line_count == 0:
+        return ''
+
+    return ';'.join(['AAAA'] + ['AACA'] * (line_count - 1))
+
+
+def read_chunk(path):
+    """Returns a tuple of lines for the script specified the path in a dev
+    bundle and whether the script is wrapped as a goog.module.
+    """
+    with open(path) as fp:
+        content = fp.read()
+
+    lines = content.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    lines = [line + '\n' for line in lines]
+
+    if MODULE_PATTERN.search(content) is None:
+        return (lines, False)
+
+    return ([MODULE_HEADER] + lines + [MODULE_FOOTER], True)
+
+
+class DevBundler(object):
+    """A class for writers of dev bundles that concatenate scripts in the
+    order of their dependencies without compiling. Each bundle has an index
+    source map that maps each part of the bundle to the original script.
+    Chunks for scripts that are not changed since the last update are reused
+    from the existing bundle, so only changed scripts are read.
+    """
+
+    def __init__(self, index_path):
+        """Creates a bundler that keeps the index of bundles in the specified
+        file.
+        """
+        self._index_path = index_path
+        self._entries = {}
+        self._modified = False
+
+    def load(self):
+        """Loads entries from the index file.
+        Broken or missing index file is ignored.
+        """
+        try:
+            with io.open(self._index_path, encoding='utf-8') as fp:
+                entries = json.load(fp)
+        except (IOError, OSError, ValueError):
+            return
+
+        if isinstance(entries, dict):
+            self._entries = entries
+
+    def save(self):
+        """Saves entries to the index file if they are modified.
+        """
+        if not self._modified:
+            return
+
+        index_dir = os.path.dirname(self._index_path)
+        if index_dir and not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+
+        (fd, tmp_path) = tempfile.mkstemp(dir=index_dir or None)
+        with os.fdopen(fd, 'w') as fp:
+            json.dump(self._entries, fp, sort_keys=True)
+
+        googkit.lib.file.replace(tmp_path, self._index_path)
+
+        self._modified = False
+
+    @classmethod
+    def _stat(cls, path):
+        stat = os.stat(path)
+        return [stat.st_mtime, stat.st_size]
+
+    def _is_fresh(self, bundle_path, stats):
+        entry = self._entries.get(os.path.abspath(bundle_path))
+        if entry is None or not os.path.exists(bundle_path + '.map'):
+            return False
+
+        try:
+            if self._stat(bundle_path) != entry['stat']:
+                return False
+        except OSError:
+            return False
+
+        return [[chunk['path'], chunk['stat']] for chunk in entry['chunks']] == stats
+
+    def _reusable_chunks(self, bundle_path):
+        """Returns a dict from script paths to tuples of the status, lines and
+        whether the script is wrapped as a goog.module in the existing bundle.
+        Nothing is reused if the bundle is changed since the last update.
+        """
+        entry = self._entries.get(os.path.abspath(bundle_path))
+        if entry is None:
+            return {}
+
+        try:
+            if self._stat(bundle_path) != entry['stat']:
+                return {}
+
+            with open(bundle_path) as fp:
+                lines = list(fp)
+        except (IOError, OSError):
+            return {}
+
+        result = {}
+        for chunk in entry['chunks']:
+            start = chunk['start']
+            result[chunk['path']] = (
+                chunk['stat'],
+                lines[start:start + chunk['count']],
+                chunk['is_module'])
+
+        return result
+
+    def write(self, bundle_path, paths):
+        """Writes a dev bundle that concatenates the scripts specified the
+        paths in order, and its source map as ``{bundle_path}.map``.
+        Returns whether the bundle is written. Nothing is written if the
+        scripts are not changed since the last update.
+        """
+        # Take the status before reading not to miss changes while reading
+        stats = [[os.path.abspath(path), self._stat(path)] for path in paths]
+        if self._is_fresh(bundle_path, stats):
+            return False
+
+        reusable_chunks = self._reusable_chunks(bundle_path)
+        bundle_dir = os.path.dirname(bundle_path)
+        lines = []
+        chunks = []
+        sections = []
+
+        for (path, (abspath, stat)) in zip(paths, stats):
+            reusable = reusable_chunks.get(abspath)
+            if reusable is not None and reusable[0] == stat:
+                (chunk_lines, is_module) = reusable[1:]
+            else:
+                (chunk_lines, is_module) = read_chunk(path)
+
+            # Lines of the script follow the header of goog.module
+            offset = 1 if is_module else 0
+            line_count = len(chunk_lines) - offset * 2
+
+            if line_count > 0:
+                relpath = os.path.relpath(path, bundle_dir)
+                sections.append({
+                    'offset': {'line': len(lines) + offset, 'column': 0},
+                    'map': {
+                        'version': 3,
+                        'sources': [googkit.compat.urllib.request.pathname2url(relpath)],
+                        'names': [],
+                        'mappings': identity_mappings(line_count),
+                    },
+                })
+
+            chunks.append({
+                'path': abspath,
+                'stat': stat,
+                'start': len(lines),
+                'count': len(chunk_lines),
+                'is_module': is_module,
+            })
+            lines.extend(chunk_lines)
+
+        basename = os.path.basename(bundle_path)
+        lines.append('//# sourceMappingURL={name}.map\n'.format(name=basename))
+        source_map = {
+            'version': 3,
+            'file': basename,
+            'sections': sections,
+        }
+
+        if bundle_dir and not os.path.exists(bundle_dir):
+            os.makedirs(bundle_dir)
+
+        googkit.lib.file.write_atomically(bundle_path + '.map', json.dumps(source_map))
+        googkit.lib.file.write_atomically(bundle_path, ''.join(lines))
+
+        self._entries[os.path.abspath(bundle_path)] = {
+            'stat': self._stat(bundle_path),
+            'chunks': chunks,
+        }
+        self._modified = True
+        return True
+
+    def remove(self, bundle_path):
+        """Removes the dev bundle specified the path and its source map.
+        """
+        for path in (bundle_path, bundle_path + '.map'):
+            if os.path.exists(path):
+                os.remove(path)
+
+        if self._entries.pop(os.path.abspath(bundle_path), None) is not None:
+            self._modified = True
@@ -0,0 +1,336 @@
+import collections
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import googkit.lib.file
+
+
+"""File name for messages from the compiler in a cache entry.
+"""
+LOG_FILE = 'compiler.log'
+
+"""Directory name for entries being written or removed in a cache.
+"""
+TMP_DIR = 'tmp'
+
+
+def digest(*components):
+    """Returns a cache key by the specified string components.
+
+    Usage::
+        >>> digest('foo', 'bar') == digest('foo', 'bar')
+        True
+        >>> digest('foo', 'bar') == digest('foobar')
+        False
+    """
+    sha1 = hashlib.sha1()
+    for component in components:
+        data = component.encode('utf-8')
+        sha1.update(str(len(data)).encode('utf-8'))
+        sha1.update(b':')
+        sha1.update(data)
+
+    return sha1.hexdigest()
+
+
+class CompileCache(object):
+    """A class for content-addressed caches of compiled scripts.
+
+    Each entry has output files of the compiler and messages from it::
+
+        CACHE_DIR
+        |-- 3f
+        |   +-- 3f9a1c...
+        |       |-- index.min.js
+        |       |-- index.min.js.map
+        |       +-- compiler.log
+        +-- tmp
+
+    Entries are written into the tmp directory and renamed at once, so the
+    cache can be shared by multiple processes (e.g. on a network file
+    system). The modification time of the log file records when the entry
+    was used last.
+    """
+
+    def __init__(self, cache_dir):
+        """Creates a compile cache stored in the specified directory.
+        """
+        self._cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_dir(self, key):
+        return os.path.join(self._cache_dir, key[:2], key)
+
+    def _tmp_dir(self):
+        tmp_root = os.path.join(self._cache_dir, TMP_DIR)
+        if not os.path.exists(tmp_root):
+            try:
+                os.makedirs(tmp_root)
+            except OSError:
+                # Created by another process
+                pass
+
+        return tempfile.mkdtemp(dir=tmp_root)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def restore(self, key, output_paths):
+        """Restores output files of the entry specified by the key, and
+        returns messages from the compiler.
+        Returns None if the entry is not found.
+        """
+        entry_dir = self._entry_dir(key)
+        log_path = os.path.join(entry_dir, LOG_FILE)
+
+        try:
+            with io.open(log_path, encoding='utf-8') as fp:
+                log = fp.read()
+
+            for output_path in output_paths:
+                cached_path = os.path.join(entry_dir, os.path.basename(output_path))
+                if os.path.exists(cached_path):
+                    shutil.copyfile(cached_path, output_path)
+
+            # Mark the entry used for the eviction
+            os.utime(log_path, None)
+        except (IOError, OSError):
+            # Not found, or evicted by another process
+            self._count(False)
+            return None
+
+        self._count(True)
+        return log
+
+    def store(self, key, output_paths, log):
+        """Stores output files and messages from the compiler as an entry
+        specified by the key.
+        Output files that do not exist are skipped.
+        """
+        entry_dir = self._entry_dir(key)
+        tmp_dir = self._tmp_dir()
+
+        try:
+            for output_path in output_paths:
+                if os.path.exists(output_path):
+                    cached_path = os.path.join(tmp_dir, os.path.basename(output_path))
+                    shutil.copyfile(output_path, cached_path)
+
+            with io.open(os.path.join(tmp_dir, LOG_FILE), 'w', encoding='utf-8') as fp:
+                fp.write(log)
+
+            parent_dir = os.path.dirname(entry_dir)
+            if not os.path.exists(parent_dir):
+                try:
+                    os.makedirs(parent_dir)
+                except OSError:
+                    # Created by another process
+                    pass
+
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # The same entry has been stored by another process
+            pass
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _entries(self):
+        """Returns a list of tuples (last used time, size, entry directory)
+        for all entries.
+        """
+        result = []
+        if not os.path.exists(self._cache_dir):
+            return result
+
+        for prefix in os.listdir(self._cache_dir):
+            prefix_dir = os.path.join(self._cache_dir, prefix)
+            if prefix == TMP_DIR or not os.path.isdir(prefix_dir):
+                continue
+
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                try:
+                    used = os.path.getmtime(os.path.join(entry_dir, LOG_FILE))
+                    size = sum([os.path.getsize(os.path.join(entry_dir, filename))
+                                for filename in os.listdir(entry_dir)])
+                except (IOError, OSError):
+                    # Incomplete or removed by another process
+                    continue
+
+                result.append((used, size, entry_dir))
+
+        return result
+
+    def evict(self, max_size):
+        """Removes least recently used entries until the total size of the
+        cache is not greater than the max size in bytes, and returns the
+        number of removed entries.
+        """
+        entries = sorted(self._entries())
+        total_size = sum([size for (used, size, entry_dir) in entries])
+        count = 0
+
+        for (used, size, entry_dir) in entries:
+            if total_size <= max_size:
+                break
+
+            # Move the entry at once not to be restored partially
+            tmp_dir = self._tmp_dir()
+            try:
+                os.rename(entry_dir, os.path.join(tmp_dir, os.path.basename(entry_dir)))
+            except OSError:
+                # Removed by another process
+                pass
+            else:
+                count += 1
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+            total_size -= size
+
+        return count
+
+
+class StatIndex(object):
+    """A class for indexes of files that are known to need no processing.
+    Each file is skipped while its modification time and size are not
+    changed. All entries are ignored if the signature is changed, e.g. when
+    markers to process are added.
+    """
+
+    def __init__(self, index_path, signature=''):
+        """Creates an index stored in the specified file.
+        """
+        self._index_path = index_path
+        self._signature = signature
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._modified = False
+
+    def load(self):
+        """Loads entries from the index file.
+        Broken or missing index file is ignored.
+        """
+        try:
+            with io.open(self._index_path, encoding='utf-8') as fp:
+                index = json.load(fp)
+        except (IOError, OSError, ValueError):
+            return
+
+        if isinstance(index, dict) and index.get('signature') == self._signature:
+            self._entries = index.get('entries', {})
+
+    def save(self):
+        """Saves entries to the index file if they are modified.
+        """
+        if not self._modified:
+            return
+
+        index_dir = os.path.dirname(self._index_path)
+        if index_dir and not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+
+        index = {
+            'signature': self._signature,
+            'entries': self._entries,
+        }
+        (fd, tmp_path) = tempfile.mkstemp(dir=index_dir or None)
+        with os.fdopen(fd, 'w') as fp:
+            json.dump(index, fp, sort_keys=True)
+
+        googkit.lib.file.replace(tmp_path, self._index_path)
+
+        self._modified = False
+
+    def contains(self, path):
+        """Whether the file specified the path is in this index and is not
+        changed since it was added.
+        """
+        entry = self._entries.get(os.path.abspath(path))
+        if entry is None:
+            return False
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+
+        return entry == [stat.st_mtime, stat.st_size]
+
+    def add(self, path, stat=None):
+        """Adds the file specified the path with the status.
+        The current status of the file is used if stat is None.
+        """
+        if stat is None:
+            stat = os.stat(path)
+
+        with self._lock:
+            self._entries[os.path.abspath(path)] = [stat.st_mtime, stat.st_size]
+            self._modified = True
+
+    def remove(self, path):
+        """Removes the file specified the path from this index.
+        """
+        with self._lock:
+            if self._entries.pop(os.path.abspath(path), None) is not None:
+                self._modified = True
+
+
+class LRUCache(object):
+    """A class for caches in memory that discard the least recently used
+    entries if the number of entries exceeds the limit.
+    Entries can be read and written by multiple threads at the same time.
+
+    Usage::
+        >>> cache = LRUCache(2)
+        >>> cache.put('a', 1)
+        >>> cache.put('b', 2)
+        >>> cache.get('a')
+        1
+        >>> cache.put('c', 3)
+        >>> cache.get('b') is None
+        True
+    """
+
+    def __init__(self, max_entries):
+        """Creates an empty cache that keeps up to the specified number of
+        entries.
+        """
+        self._max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns a value for the key, or None if it is not cached.
+        """
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                # Mark the entry as most recently used
+                self._entries[key] = value
+
+        return value
+
+    def put(self, key, value):
+        """Caches the value for the key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
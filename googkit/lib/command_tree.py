@@ -3,6 +3,7 @@ from googkit.commands.candidates import CandidatesCommand
 from googkit.commands.init import InitCommand
 from googkit.commands.lint import LintCommand
 from googkit.commands.ready import ReadyCommand
+from googkit.commands.serve import ServeCommand
 from googkit.commands.setup import SetupCommand
 from googkit.commands.update_deps import UpdateDepsCommand
 
@@ -25,6 +26,7 @@ class CommandTree(object):
         'init': InitCommand,
         'lint': LintCommand,
         'ready': ReadyCommand,
+        'serve': ServeCommand,
         'setup': SetupCommand,
     }
 
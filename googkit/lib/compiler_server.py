@@ -0,0 +1,321 @@
+import json
+import logging
+import subprocess
+import tempfile
+import threading
+import time
+import googkit.lib.file
+import googkit.lib.process
+from googkit.compat.queue import Queue, Empty
+from googkit.lib.error import GoogkitError
+from googkit.lib.i18n import _
+
+
+"""Seconds to wait for a response to a compile request. A worker that does
+not respond in time is stopped, and the request is compiled without it.
+"""
+RESPONSE_TIMEOUT = 600
+
+
+class CompilerTimeoutError(GoogkitError):
+    """Raised when a compiler worker does not respond in time."""
+    pass
+
+
+class CompilerWorker(object):
+    """A class for a Closure Compiler process started as a persistent worker.
+
+    Compile requests are sent through its stdin by the JSON worker protocol,
+    and each request and response is a JSON object followed by a newline::
+
+        request:  {"arguments": ["--js=foo.js", ...], "requestId": 1}
+        response: {"exitCode": 0, "output": "...", "requestId": 1}
+
+    Messages written to stderr while processing a request are appended to
+    the output of the response. A worker processes one request at a time.
+    """
+
+    def __init__(self, compiler_jar):
+        """Creates a worker that runs the specified compiler.jar.
+        """
+        self._compiler_jar = compiler_jar
+        self._proc = None
+        self._stderr = None
+        self._lines = None
+        self._request_id = 0
+
+    def is_running(self):
+        """Whether the compiler process is running.
+        """
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self):
+        """Starts a compiler process if it is not running.
+        """
+        if self.is_running():
+            return
+
+        # A pipe for stderr could fill up while waiting for the response
+        self._stderr = tempfile.TemporaryFile()
+
+        cmd = ['java', '-jar', self._compiler_jar, '--persistent_worker']
+        popen_args = {
+            'stdin': subprocess.PIPE,
+            'stdout': subprocess.PIPE,
+            'stderr': self._stderr,
+        }
+
+        self._proc = subprocess.Popen(cmd, **popen_args)
+
+        # Lines on stdout are read by another thread, so reading a response
+        # can time out even if the worker hangs
+        self._lines = Queue()
+        reader = threading.Thread(
+            target=CompilerWorker._read_lines,
+            args=(self._proc.stdout, self._lines))
+        reader.daemon = True
+        reader.start()
+
+        logging.debug(_('Started a compiler server: {cmd}').format(
+            cmd=' '.join(cmd)))
+
+    def stop(self, kill=False):
+        """Stops the compiler process, or kills it if kill is True.
+        """
+        if self._proc is not None:
+            if self.is_running():
+                try:
+                    if kill:
+                        self._proc.kill()
+                    self._proc.stdin.close()
+                except (IOError, OSError):
+                    pass
+                self._proc.wait()
+
+            self._proc = None
+
+        if self._stderr is not None:
+            self._stderr.close()
+            self._stderr = None
+
+    @staticmethod
+    def _read_lines(stdout, lines):
+        for line in iter(stdout.readline, b''):
+            lines.put(line)
+
+        # An empty line means the end of stdout
+        lines.put(b'')
+
+    def _read_response(self, timeout):
+        content = ''
+        deadline = time.time() + timeout
+        while True:
+            try:
+                line = self._lines.get(timeout=max(deadline - time.time(), 0))
+            except Empty:
+                raise CompilerTimeoutError(_('Compiler server did not respond in {timeout} seconds.').format(
+                    timeout=timeout))
+
+            if not line:
+                raise GoogkitError(_('Compiler server stopped unexpectedly.'))
+
+            content += line.decode('utf-8', 'replace')
+            if not content.lstrip().startswith('{'):
+                raise GoogkitError(_('Invalid response from compiler server: {response}').format(
+                    response=content.strip()))
+
+            try:
+                return json.loads(content)
+            except ValueError:
+                # Response is not completed yet
+                continue
+
+    def _read_stderr(self, offset):
+        self._stderr.seek(offset)
+        return self._stderr.read().decode('utf-8', 'replace')
+
+    def request(self, args, timeout=RESPONSE_TIMEOUT):
+        """Sends a request by the specified compiler arguments, and returns a
+        tuple of the exit code and messages from the compiler.
+        Raise a GoogkitError if the response is not valid, and the process
+        is stopped because following responses cannot be trusted.
+        Raise a CompilerTimeoutError if no response is received in the
+        timeout in seconds, and the process is killed.
+        """
+        self.start()
+
+        self._request_id += 1
+        request = {
+            'arguments': list(args),
+            'requestId': self._request_id,
+        }
+
+        self._stderr.seek(0, 2)
+        stderr_offset = self._stderr.tell()
+
+        try:
+            self._proc.stdin.write((json.dumps(request, sort_keys=True) + '\n').encode('utf-8'))
+            self._proc.stdin.flush()
+            response = self._read_response(timeout)
+
+            if not isinstance(response, dict) or response.get('requestId') != self._request_id:
+                raise GoogkitError(_('Invalid response from compiler server: {response}').format(
+                    response=json.dumps(response)))
+
+            exit_code = response.get('exitCode')
+            if not isinstance(exit_code, int):
+                raise GoogkitError(_('Compiler server responded without an exit code.'))
+        except CompilerTimeoutError:
+            self.stop(kill=True)
+            raise
+        except (IOError, OSError) as e:
+            self.stop()
+            raise GoogkitError(_('Compiler server stopped unexpectedly: {message}').format(
+                message=str(e)))
+        except GoogkitError:
+            self.stop()
+            raise
+
+        output = response.get('output') or ''
+        return (exit_code, output + self._read_stderr(stderr_offset))
+
+
+class CompilerServer(object):
+    """A class for long-lived Closure Compiler processes.
+
+    Compile requests are processed by as many persistent workers as the
+    number of jobs, so the server can be shared by multiple threads.
+    Workers are started on demand and reused until the server is stopped.
+    Scripts are compiled by starting the compiler for each request instead
+    if it does not support the worker protocol, or if a worker does not
+    respond in time.
+
+    Usage::
+        with CompilerServer('closure/compiler/compiler.jar', jobs=4) as server:
+            (exit_code, output) = server.compile(['--js=foo.js'])
+    """
+
+    """Arguments of the request to check whether the compiler supports the
+    worker protocol.
+    """
+    PROBE_ARGUMENTS = ['--version']
+
+    """Seconds to wait for the response to the probe request, which includes
+    the startup time of Java.
+    """
+    PROBE_TIMEOUT = 60
+
+    def __init__(self, compiler_jar, jobs=1, timeout=RESPONSE_TIMEOUT):
+        """Creates a compiler server that runs the specified compiler.jar by
+        the specified number of workers at most, and waits for each response
+        until the timeout in seconds.
+        """
+        self._compiler_jar = compiler_jar
+        self._jobs = max(jobs, 1)
+        self._timeout = timeout
+        self._workers = []
+        self._idle_workers = []
+        self._supported = None
+        self._start_lock = threading.Lock()
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def is_supported(self):
+        """Whether the compiler supports the worker protocol.
+        This is checked once when the server is started.
+        """
+        return self._supported
+
+    def start(self):
+        """Starts a worker and checks whether the compiler supports the worker
+        protocol if it has not been checked.
+        Raise a GoogkitError if Java is not found.
+        """
+        with self._start_lock:
+            if self._supported is not None:
+                return
+
+            if googkit.lib.file.which('java') is None:
+                raise GoogkitError(_('Required command not found: java'))
+
+            worker = CompilerWorker(self._compiler_jar)
+            try:
+                worker.request(CompilerServer.PROBE_ARGUMENTS, CompilerServer.PROBE_TIMEOUT)
+            except GoogkitError as e:
+                worker.stop(kill=True)
+                logging.warning(_('Compiler server is not supported, so scripts are compiled one by one: {message}').format(
+                    message=str(e)))
+                self._supported = False
+                return
+
+            with self._cond:
+                self._workers.append(worker)
+                self._idle_workers.append(worker)
+            self._supported = True
+
+    def stop(self):
+        """Stops all workers.
+        """
+        with self._cond:
+            workers = self._workers
+            self._workers = []
+            self._idle_workers = []
+            self._cond.notify_all()
+
+        for worker in workers:
+            worker.stop()
+
+    def _acquire(self):
+        # Returns an idle worker, or a new worker if all workers are busy and
+        # the number of workers does not reach the number of jobs
+        with self._cond:
+            while not self._idle_workers and len(self._workers) >= self._jobs:
+                self._cond.wait()
+
+            if self._idle_workers:
+                return self._idle_workers.pop()
+
+            worker = CompilerWorker(self._compiler_jar)
+            self._workers.append(worker)
+            return worker
+
+    def _release(self, worker):
+        with self._cond:
+            if worker in self._workers:
+                self._idle_workers.append(worker)
+            self._cond.notify()
+
+    def _compile_once(self, args, prefix=None):
+        cmd = ['java', '-jar', self._compiler_jar] + list(args)
+        return googkit.lib.process.run(cmd, prefix)
+
+    def compile(self, args, prefix=None):
+        """Compiles scripts by the specified compiler arguments, and returns
+        a tuple of the exit code and messages from the compiler.
+        Messages are logged with the prefix.
+        Workers are (re)started if they are not running.
+        Raise a GoogkitError if the worker responds an invalid response.
+        """
+        self.start()
+
+        if not self._supported:
+            return self._compile_once(args, prefix)
+
+        worker = self._acquire()
+        try:
+            (exit_code, output) = worker.request(args, self._timeout)
+        except CompilerTimeoutError as e:
+            logging.warning(_('Compiler server is stopped, so the script is compiled without it: {message}').format(
+                message=str(e)))
+            return self._compile_once(args, prefix)
+        finally:
+            self._release(worker)
+
+        googkit.lib.process.log_lines(output, prefix)
+        return (exit_code, output)
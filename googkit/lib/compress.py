@@ -0,0 +1,131 @@
+import gzip
+import os
+import googkit.lib.file
+import googkit.lib.parallel
+
+
+"""Extension for precompressed files.
+"""
+GZIP_EXT = '.gz'
+
+
+class CompressResult(object):
+    """A class for results of compressing a file.
+    """
+
+    def __init__(self, path, size, compressed_size, skipped=False):
+        self.path = path
+        self.size = size
+        self.compressed_size = compressed_size
+        self.skipped = skipped
+
+    def ratio(self):
+        """Returns the ratio of the compressed size to the original size.
+
+        Usage::
+            >>> CompressResult('foo.js', 200, 50).ratio()
+            0.25
+        """
+        if self.size == 0:
+            return 1.0
+
+        return float(self.compressed_size) / self.size
+
+
+def is_up_to_date(path):
+    """Whether the compressed file for the specified path is newer than it.
+    """
+    gz_path = path + GZIP_EXT
+    if not os.path.exists(gz_path):
+        return False
+
+    return os.path.getmtime(gz_path) >= os.path.getmtime(path)
+
+
+def gzip_file(path, level=9):
+    """Writes a gzip-compressed copy of the file specified the path to
+    ``{path}.gz``, and returns a CompressResult.
+    The file is skipped if the compressed copy is already up to date.
+    """
+    gz_path = path + GZIP_EXT
+    size = os.path.getsize(path)
+
+    if is_up_to_date(path):
+        return CompressResult(path, size, os.path.getsize(gz_path), skipped=True)
+
+    # Write to a temporary file to avoid serving an incomplete file
+    tmp_path = gz_path + '.tmp'
+    with open(path, 'rb') as src:
+        data = src.read()
+
+    with open(tmp_path, 'wb') as dst:
+        # The modification time is fixed to make outputs reproducible
+        gz = gzip.GzipFile(
+            filename='',
+            mode='wb',
+            compresslevel=level,
+            fileobj=dst,
+            mtime=0)
+        try:
+            gz.write(data)
+        finally:
+            gz.close()
+
+    googkit.lib.file.replace(tmp_path, gz_path)
+
+    return CompressResult(path, size, os.path.getsize(gz_path))
+
+
+def compressible_files(root, extensions):
+    """Returns paths for files that have the specified extensions in the root
+    directory.
+    Compressed files whose original file no longer exists are removed.
+    """
+    result = []
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+
+            if filename.endswith(GZIP_EXT):
+                original_path = path[:-len(GZIP_EXT)]
+                if (os.path.splitext(original_path)[1] in extensions and
+                        not os.path.exists(original_path)):
+                    os.remove(path)
+                continue
+
+            if os.path.splitext(filename)[1] in extensions:
+                result.append(path)
+
+    return result
+
+
+def remove_all(root, extensions):
+    """Removes compressed files of files that have the specified extensions
+    in the root directory, and returns a list of paths for removed files.
+    """
+    result = []
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if not filename.endswith(GZIP_EXT):
+                continue
+
+            if os.path.splitext(filename[:-len(GZIP_EXT)])[1] in extensions:
+                path = os.path.join(dirpath, filename)
+                os.remove(path)
+                result.append(path)
+
+    return result
+
+
+def gzip_all(root, extensions, level=9, jobs=1):
+    """Compresses files that have the specified extensions in the root
+    directory by the specified number of threads, and returns a list of
+    CompressResult.
+    Threads run at the same time because zlib releases the GIL while
+    compressing.
+    """
+    paths = compressible_files(root, extensions)
+    return list(googkit.lib.parallel.imap(
+        lambda path: gzip_file(path, level), paths, jobs))
@@ -1,4 +1,5 @@
 import os
+import warnings
 import googkit.compat.configparser as configparser
 
 
@@ -57,6 +58,26 @@ class Config(object):
         """
         return self.parser.get('project', 'compiled_js_ext')
 
+    def hash_compiled_js(self):
+        """Returns whether names of compiled scripts should have the content
+        hash.
+        This config is a "hash_compiled_js" option is in the "project" section.
+        """
+        return self.parser.getboolean('project', 'hash_compiled_js')
+
+    def deps_per_page(self):
+        """Returns whether a deps.js should be generated for each page.
+        This config is a "deps_per_page" option is in the "project" section.
+        """
+        return self.parser.getboolean('project', 'deps_per_page')
+
+    def staging(self):
+        """Returns a mode to stage project resources for the debug and the
+        production directory (copy, hardlink, reflink or symlink).
+        This config is a "staging" option is in the "project" section.
+        """
+        return self.parser.get('project', 'staging')
+
     def test_file_pattern(self):
         """Returns a regular expression for the unit-test file pattern.
         This config is a "test_file_pattern" option is in the "project" section.
@@ -79,13 +100,19 @@ class Config(object):
 
     def closurebuilder(self):
         """Returns a path for the closurebuilder.py.
+        Deprecated: googkit no longer runs it, and builds resolve
+        dependencies by googkit.lib.deps instead.
         """
+        warnings.warn('Config.closurebuilder() is deprecated', DeprecationWarning, stacklevel=2)
         dirpath = self.library_root()
         return os.path.join(dirpath, 'closure', 'bin', 'build', 'closurebuilder.py')
 
     def depswriter(self):
         """Returns a path for the depswriter.py.
+        Deprecated: googkit no longer runs it, and deps.js is written by
+        googkit.lib.deps instead.
         """
+        warnings.warn('Config.depswriter() is deprecated', DeprecationWarning, stacklevel=2)
         dirpath = self.library_root()
         return os.path.join(dirpath, 'closure', 'bin', 'build', 'depswriter.py')
 
@@ -113,6 +140,35 @@ class Config(object):
         dirpath = self.js_dev_dir()
         return os.path.join(dirpath, 'deps.js')
 
+    def page_deps_dir(self):
+        """Returns a directory path for deps.js files generated for each page.
+        Every file in the directory is generated, so files in it can be
+        removed safely.
+        """
+        dirpath = self.development_dir()
+        return os.path.join(dirpath, 'js_deps')
+
+    def page_deps_js(self, namespace):
+        """Returns a path for the deps.js for the page that has the specified
+        namespace (e.g. ``js_deps/googkit_index.js``).
+        """
+        dirpath = self.page_deps_dir()
+        return os.path.join(dirpath, namespace + '.js')
+
+    def dev_bundle_dir(self):
+        """Returns a directory path for dev bundles that concatenate scripts
+        for each page without compiling.
+        """
+        dirpath = self.development_dir()
+        return os.path.join(dirpath, 'js_bundle')
+
+    def dev_bundle_js(self, namespace):
+        """Returns a path for the dev bundle for the page that has the
+        specified namespace (e.g. ``js_bundle/googkit_index.js``).
+        """
+        dirpath = self.dev_bundle_dir()
+        return os.path.join(dirpath, namespace + '.js')
+
     def testrunner(self):
         """Returns a path for the unit-test runner.
         """
@@ -152,6 +208,35 @@ class Config(object):
         """
         return self.parser.get('compiler', 'flagfile_debug')
 
+    def gzip(self):
+        """Returns whether production resources should be precompressed by
+        gzip.
+        This config is a "gzip" option is in the "compression" section.
+        """
+        return self.parser.getboolean('compression', 'gzip')
+
+    def gzip_level(self):
+        """Returns a compression level for gzip from 1 to 9.
+        This config is a "level" option is in the "compression" section.
+        """
+        return self.parser.getint('compression', 'level')
+
+    def cache_dir(self):
+        """Returns a path for the cache directory.
+        A relative path is resolved from the project root, and an absolute
+        path can be shared by multiple projects.
+        This config is a "dir" option is in the "cache" section.
+        """
+        path = self.parser.get('cache', 'dir')
+        return os.path.normpath(os.path.expanduser(path))
+
+    def cache_max_size(self):
+        """Returns the max size of the compile cache in megabytes.
+        The cache is not limited if the size is 0.
+        This config is a "max_size" option is in the "cache" section.
+        """
+        return self.parser.getint('cache', 'max_size')
+
     def linter_flagfile(self):
         """Returns a file name of the flagfile for Closure Linter.
         See: http://google-gflags.googlecode.com/svn/trunk/doc/gflags.html
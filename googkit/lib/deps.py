@@ -0,0 +1,458 @@
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import googkit.lib.file
+from googkit.lib.error import GoogkitError
+from googkit.lib.i18n import _
+
+
+"""RegExp for namespaces provided by a script.
+"""
+PROVIDE_PATTERN = re.compile(
+    r'^\s*goog\.provide\(\s*[\'"](.+?)[\'"]\s*\)', re.MULTILINE)
+
+"""RegExp for a namespace declared by a goog.module script.
+"""
+MODULE_PATTERN = re.compile(
+    r'^\s*goog\.module\(\s*[\'"](.+?)[\'"]\s*\)', re.MULTILINE)
+
+"""RegExp for namespaces required by a script.
+The required namespace can be assigned to a variable in a goog.module
+script.
+"""
+REQUIRE_PATTERN = re.compile(
+    r'^\s*(?:(?:var|let|const)\s+[^=;]+?\s*=\s*)?goog\.require\(\s*[\'"](.+?)[\'"]\s*\)',
+    re.MULTILINE)
+
+"""Annotation for base.js of Closure Library that provides ``goog``.
+"""
+PROVIDE_GOOG_ANNOTATION = '@provideGoog'
+
+
+class Source(object):
+    """A class for scripts that have namespace declarations.
+    """
+
+    def __init__(self, path, provides, requires, is_base=False, is_module=False):
+        """Creates a script source by the path, the provided namespaces and
+        the required namespaces.
+        """
+        self.path = path
+        self.provides = provides
+        self.requires = requires
+        self.is_base = is_base
+        self.is_module = is_module
+
+
+def parse_content(path, content):
+    """Returns a Source by the path and the content of the script.
+
+    Usage::
+        >>> source = parse_content('foo.js', "goog.provide('foo');\\ngoog.require('bar');")
+        >>> source.provides
+        ['foo']
+        >>> source.requires
+        ['bar']
+        >>> source = parse_content('foo.js', "goog.module('foo');\\nconst bar = goog.require('bar');")
+        >>> source.provides
+        ['foo']
+        >>> source.requires
+        ['bar']
+        >>> source.is_module
+        True
+    """
+    modules = MODULE_PATTERN.findall(content)
+
+    return Source(
+        path,
+        PROVIDE_PATTERN.findall(content) + modules,
+        REQUIRE_PATTERN.findall(content),
+        is_base=(content.find(PROVIDE_GOOG_ANNOTATION) >= 0),
+        is_module=(len(modules) > 0))
+
+
+def parse(path):
+    """Returns a Source by reading the script specified the path.
+    """
+    with io.open(path, encoding='utf-8', errors='replace') as fp:
+        return parse_content(path, fp.read())
+
+
+class ParseCache(object):
+    """A class for content-addressed caches of parsed scripts.
+
+    Each entry has namespace declarations of scripts that have the same
+    content, and it is stored in a file named by the digest of the content::
+
+        CACHE_DIR
+        |-- 3f
+        |   +-- 3f9a1c....json
+        +-- a0
+            +-- a07b2e....json
+
+    Entries are written to temporary files and renamed at once, so the cache
+    can be shared by multiple processes, checkouts and CI.
+    The index maps absolute paths for scripts to their modification time,
+    size and digest, so unchanged scripts are not read again. The index is
+    only a local lookup, and touched scripts are validated by the digest.
+    """
+
+    """Keys that every entry has.
+    """
+    ENTRY_KEYS = ('provides', 'requires', 'is_base', 'is_module')
+
+    def __init__(self, cache_dir, index_path):
+        """Creates a parse cache stored in the specified directory with the
+        index stored in the specified file.
+        """
+        self._cache_dir = cache_dir
+        self._index_path = index_path
+        self._index = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._modified = False
+
+    def load(self):
+        """Loads the index from the index file.
+        Broken or missing index file is ignored.
+        """
+        try:
+            with io.open(self._index_path, encoding='utf-8') as fp:
+                index = json.load(fp)
+        except (IOError, OSError, ValueError):
+            return
+
+        if isinstance(index, dict):
+            self._index = index
+
+    def save(self):
+        """Saves the index to the index file if it is modified.
+        Entries are already stored when scripts are parsed.
+        """
+        if not self._modified:
+            return
+
+        index_dir = os.path.dirname(self._index_path)
+        if index_dir and not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+
+        (fd, tmp_path) = tempfile.mkstemp(dir=index_dir or None)
+        with os.fdopen(fd, 'w') as fp:
+            json.dump(self._index, fp, sort_keys=True)
+
+        googkit.lib.file.replace(tmp_path, self._index_path)
+
+        self._modified = False
+
+    def _entry_path(self, digest):
+        return os.path.join(self._cache_dir, digest[:2], digest + '.json')
+
+    def _load_entry(self, digest):
+        # Returns the entry specified by the digest, or None if it is not
+        # found or broken
+        entry = self._entries.get(digest)
+        if entry is not None:
+            return entry
+
+        try:
+            with io.open(self._entry_path(digest), encoding='utf-8') as fp:
+                entry = json.load(fp)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if not isinstance(entry, dict) or not all([key in entry for key in ParseCache.ENTRY_KEYS]):
+            return None
+
+        with self._lock:
+            self._entries[digest] = entry
+        return entry
+
+    def _store_entry(self, digest, entry):
+        entry_path = self._entry_path(digest)
+        entry_dir = os.path.dirname(entry_path)
+        if not os.path.exists(entry_dir):
+            try:
+                os.makedirs(entry_dir)
+            except OSError:
+                # Created by another process
+                pass
+
+        googkit.lib.file.write_atomically(entry_path, json.dumps(entry, sort_keys=True))
+
+        with self._lock:
+            self._entries[digest] = entry
+
+    def parse(self, path):
+        """Returns a Source by the script specified the path.
+        The script is read only if it is changed since the last parse, and it
+        is parsed only if no entry has the same content.
+        """
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        stamp = self._index.get(key)
+
+        if isinstance(stamp, dict) and stamp.get('mtime') == stat.st_mtime and stamp.get('size') == stat.st_size:
+            entry = self._load_entry(stamp.get('digest', ''))
+            if entry is not None:
+                return ParseCache._source(path, entry)
+
+        with open(path, 'rb') as fp:
+            data = fp.read()
+        digest = hashlib.sha1(data).hexdigest()
+
+        entry = self._load_entry(digest)
+        if entry is None:
+            source = parse_content(path, data.decode('utf-8', 'replace'))
+            entry = {
+                'provides': source.provides,
+                'requires': source.requires,
+                'is_base': source.is_base,
+                'is_module': source.is_module,
+            }
+            self._store_entry(digest, entry)
+
+        with self._lock:
+            self._index[key] = {
+                'digest': digest,
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+            }
+            self._modified = True
+
+        return ParseCache._source(path, entry)
+
+    @classmethod
+    def _source(cls, path, entry):
+        return Source(
+            path,
+            list(entry['provides']),
+            list(entry['requires']),
+            is_base=entry['is_base'],
+            is_module=entry['is_module'])
+
+
+def scripts(root):
+    """Returns paths for all scripts in the specified root directory.
+    """
+    result = []
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith('.js'):
+                result.append(os.path.join(dirpath, filename))
+
+    return result
+
+
+"""Header of deps.js files.
+"""
+DEPS_JS_HEADER = '''\
+// This file was autogenerated by googkit.
+// Please do not edit.
+'''
+
+
+def dependency_line(url, source):
+    """Returns a line to declare dependencies of the script source in deps.js.
+    The url is a path for the script relative to base.js.
+
+    Usage::
+        >>> source = Source('foo.js', ['foo'], ['goog.dom', 'bar'])
+        >>> print(dependency_line('../../js_dev/foo.js', source))
+        goog.addDependency('../../js_dev/foo.js', ['foo'], ['bar', 'goog.dom'], false);
+    """
+    def js_array(names):
+        return '[' + ', '.join(['\'{0}\''.format(name) for name in sorted(names)]) + ']'
+
+    return 'goog.addDependency(\'{url}\', {provides}, {requires}, {is_module});'.format(
+        url=url,
+        provides=js_array(source.provides),
+        requires=js_array(source.requires),
+        is_module='true' if source.is_module else 'false')
+
+
+def parse_all(root, parse_cache=None, excludes=()):
+    """Returns a list of Source for all scripts in the root directory except
+    the excludes.
+    Scripts are parsed through the parse cache if it is specified.
+    """
+    excludes = set([os.path.normpath(path) for path in excludes])
+    result = []
+
+    for path in scripts(root):
+        if os.path.normpath(path) in excludes:
+            continue
+
+        if parse_cache is None:
+            result.append(parse(path))
+        else:
+            result.append(parse_cache.parse(path))
+
+    return result
+
+
+def deps_js_for(sources, root, prefix):
+    """Returns a content of deps.js for the script sources in the root
+    directory.
+    URLs of the scripts are the relative paths from the root with the
+    prefix.
+    """
+    lines = []
+
+    for source in sources:
+        relpath = os.path.relpath(source.path, root).replace(os.sep, '/')
+        lines.append(dependency_line(prefix + '/' + relpath, source))
+
+    return DEPS_JS_HEADER + ''.join([line + '\n' for line in sorted(lines)])
+
+
+def deps_js_content(root, prefix, parse_cache=None, excludes=()):
+    """Returns a content of deps.js for all scripts in the root directory
+    except the excludes.
+    """
+    return deps_js_for(parse_all(root, parse_cache, excludes), root, prefix)
+
+
+class DepsGraph(object):
+    """A class for dependency graphs between scripts.
+    """
+
+    def __init__(self, parse_cache=None):
+        """Creates an empty graph.
+        Scripts are parsed through the parse cache if it is specified.
+        """
+        self._parse_cache = parse_cache
+        self._sources = []
+        self._providers = {}
+        self._base = None
+
+    def _parse(self, path):
+        if self._parse_cache is None:
+            return parse(path)
+
+        return self._parse_cache.parse(path)
+
+    def add(self, source):
+        """Adds a script source to this graph.
+        Raise a GoogkitError if a namespace is provided by multiple scripts.
+        """
+        # Check all namespaces before adding to keep this graph consistent
+        for namespace in source.provides:
+            provider = self._providers.get(namespace)
+            if provider is not None:
+                raise GoogkitError(_('Namespace "{namespace}" provided more than once: {path1}, {path2}').format(
+                    namespace=namespace,
+                    path1=provider.path,
+                    path2=source.path))
+
+        for namespace in source.provides:
+            self._providers[namespace] = source
+
+        if source.is_base:
+            self._base = source
+
+        self._sources.append(source)
+
+    def remove(self, path):
+        """Removes a script specified the path from this graph.
+        """
+        for source in self._sources:
+            if source.path != path:
+                continue
+
+            for namespace in source.provides:
+                if self._providers.get(namespace) is source:
+                    del self._providers[namespace]
+
+            if self._base is source:
+                self._base = None
+
+            self._sources.remove(source)
+            return
+
+    def update(self, path):
+        """Updates a script specified the path in this graph.
+        The script is removed from this graph if it no longer exists.
+        """
+        self.remove(path)
+
+        if os.path.exists(path):
+            self.add(self._parse(path))
+
+    def scan(self, *roots):
+        """Adds all scripts in the specified root directories to this graph.
+        """
+        for root in roots:
+            for path in scripts(root):
+                self.add(self._parse(path))
+
+    def provider(self, namespace):
+        """Returns a source that provides the specified namespace.
+        Raise a GoogkitError if the namespace is not provided.
+        """
+        source = self._providers.get(namespace)
+        if source is None:
+            raise GoogkitError(_('Namespace "{namespace}" not found.').format(
+                namespace=namespace))
+
+        return source
+
+    def reachable(self, *namespaces):
+        """Returns a list of sources that the specified namespaces depend on
+        transitively, including the providers of the namespaces.
+        Namespaces that are not in this graph (e.g. provided by Closure
+        Library) are ignored.
+        """
+        result = []
+        visited = set()
+        stack = list(reversed(namespaces))
+
+        while stack:
+            source = self._providers.get(stack.pop())
+            if source is None or source.path in visited:
+                continue
+
+            visited.add(source.path)
+            result.append(source)
+            stack.extend(reversed(source.requires))
+
+        return result
+
+    def sources_for(self, *namespaces):
+        """Returns paths for scripts that the specified namespaces depend on.
+        Scripts are sorted so that each one comes after its requirements.
+        Raise a GoogkitError if the scripts depend on each other circularly.
+        """
+        result = []
+        visited = set()
+        visiting = []
+
+        def visit(source):
+            if source.path in visited:
+                return
+
+            if source in visiting:
+                cycle = visiting[visiting.index(source):] + [source]
+                raise GoogkitError(_('Circular dependency found: {paths}').format(
+                    paths=' -> '.join([s.path for s in cycle])))
+
+            visiting.append(source)
+            for namespace in source.requires:
+                visit(self.provider(namespace))
+            visiting.pop()
+
+            visited.add(source.path)
+            result.append(source.path)
+
+        if self._base is not None:
+            visit(self._base)
+
+        for namespace in namespaces:
+            visit(self.provider(namespace))
+
+        return result
@@ -1,7 +1,42 @@
+import ctypes
+import ctypes.util
+import errno
+import hashlib
 import os
 import shutil
+import sys
+import tempfile
+import threading
 import googkit.lib.path
 
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows
+    fcntl = None
+
+
+"""Modes to stage files by sync.
+copy: copies files
+hardlink: creates hard links to files
+reflink: creates copy-on-write clones of files (copies if not supported)
+symlink: creates symbolic links to files
+"""
+STAGING_MODES = ('copy', 'hardlink', 'reflink', 'symlink')
+
+"""ioctl request code to clone a file on Linux (FICLONE).
+"""
+FICLONE = 0x40049409
+
+"""Flag for renameat2 to exchange two paths atomically on Linux.
+"""
+RENAME_EXCHANGE = 2
+
+"""Special file descriptor for *at functions that means the current
+directory.
+"""
+AT_FDCWD = -100
+
 
 def _mkdir(src, dst):
     if not os.path.exists(dst):
@@ -47,6 +82,291 @@ def copytree(src, dst, ignore=None):
             shutil.copy2(src_file, dst_file)
 
 
+class SyncResult(object):
+    """A class for results of the directory synchronization.
+    """
+
+    def __init__(self):
+        self.copied = 0
+        self.skipped = 0
+        self.deleted = 0
+
+    def __str__(self):
+        return 'copied: {copied}, skipped: {skipped}, deleted: {deleted}'.format(
+            copied=self.copied,
+            skipped=self.skipped,
+            deleted=self.deleted)
+
+
+def is_up_to_date(src, dst):
+    """Whether the dst file has the same content as the src file.
+    Files are compared by the size and the modification time, and by the
+    content only if the modification time is different.
+    """
+    if not os.path.isfile(dst):
+        return False
+
+    src_stat = os.stat(src)
+    dst_stat = os.stat(dst)
+
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+
+    if int(src_stat.st_mtime) == int(dst_stat.st_mtime):
+        return True
+
+    if digest(src) != digest(dst):
+        return False
+
+    # Same content, so update the modification time to skip comparing the
+    # content next time.
+    shutil.copystat(src, dst)
+    return True
+
+
+def reflink(src, dst):
+    """Clones the src file to the dst path by a copy-on-write reflink.
+    Raise an OSError or an IOError if the file system doesn't support it.
+    """
+    if fcntl is None:
+        raise OSError('Reflink is not supported on this platform.')
+
+    with open(src, 'rb') as src_fp:
+        with open(dst, 'wb') as dst_fp:
+            fcntl.ioctl(dst_fp.fileno(), FICLONE, src_fp.fileno())
+
+    shutil.copystat(src, dst)
+
+
+def stage(src, dst, mode='copy'):
+    """Stages the src file to the dst path by the specified mode.
+    Falls back to copying if the mode is not supported.
+    """
+    # The dst file should be removed before copying because it can be
+    # a link to the src file.
+    if os.path.lexists(dst):
+        os.remove(dst)
+
+    try:
+        if mode == 'hardlink':
+            os.link(src, dst)
+            return
+        elif mode == 'symlink':
+            os.symlink(os.path.relpath(src, os.path.dirname(dst)), dst)
+            return
+        elif mode == 'reflink':
+            reflink(src, dst)
+            return
+    except (AttributeError, IOError, OSError):
+        if os.path.lexists(dst):
+            os.remove(dst)
+
+    shutil.copy2(src, dst)
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        count = sum([len(files) for (root, dirs, files) in os.walk(path)])
+        shutil.rmtree(path)
+        return count
+
+    os.remove(path)
+    return 1
+
+
+def sync(src, dst, ignore=None, keep=None, mode='copy', needs_copy=None):
+    """Synchronizes the dst directory with the src directory incrementally.
+    Files that are already up to date are not copied, and files that are not
+    in the src directory are removed unless ``keep(path)`` returns True.
+    The ignore argument is same as the one of copytree.
+    Files are staged by the specified mode (see STAGING_MODES), but files
+    that ``needs_copy(path)`` returns True are always copied.
+    Returns a SyncResult that has counts of copied, skipped and deleted
+    files.
+    """
+    result = SyncResult()
+    expected = set()
+    _mkdir(src, dst)
+
+    for src_root, src_dirs, src_files in os.walk(src):
+        dst_root = googkit.lib.path.replace_base(src_root, src, dst)
+
+        if ignore is None:
+            ignore_objs = []
+        else:
+            ignore_objs = ignore(src_root, src_dirs + src_files)
+
+        # Avoid to walk into ignored dirs
+        src_dirs[:] = [dir_name for dir_name in src_dirs
+                       if dir_name not in ignore_objs]
+
+        for dir_name in src_dirs:
+            dst_dir = os.path.normpath(os.path.join(dst_root, dir_name))
+            if os.path.exists(dst_dir) and not os.path.isdir(dst_dir):
+                result.deleted += _remove(dst_dir)
+
+            _mkdir(os.path.join(src_root, dir_name), dst_dir)
+            expected.add(dst_dir)
+
+        for file_name in src_files:
+            if file_name in ignore_objs:
+                continue
+
+            src_file = os.path.join(src_root, file_name)
+            dst_file = os.path.normpath(os.path.join(dst_root, file_name))
+            expected.add(dst_file)
+
+            if is_up_to_date(src_file, dst_file):
+                result.skipped += 1
+                continue
+
+            if os.path.isdir(dst_file) and not os.path.islink(dst_file):
+                result.deleted += _remove(dst_file)
+
+            if needs_copy is not None and needs_copy(src_file):
+                stage(src_file, dst_file)
+            else:
+                stage(src_file, dst_file, mode)
+            result.copied += 1
+
+    # Remove orphaned files
+    for dst_root, dst_dirs, dst_files in os.walk(dst):
+        for name in dst_dirs + dst_files:
+            path = os.path.normpath(os.path.join(dst_root, name))
+            if path in expected or (keep is not None and keep(path)):
+                continue
+
+            result.deleted += _remove(path)
+            if name in dst_dirs:
+                dst_dirs.remove(name)
+
+    return result
+
+
+def replace(src, dst):
+    """Renames the src file to the dst path atomically.
+    The dst file is overwritten if it exists.
+    """
+    if hasattr(os, 'replace'):
+        # Python 3.3 or later
+        os.replace(src, dst)
+        return
+
+    if os.name == 'nt' and os.path.exists(dst):
+        os.remove(dst)
+    os.rename(src, dst)
+
+
+def write_atomically(path, content):
+    """Writes the content to the file specified the path.
+    The file is replaced by a temporary file at once, so readers never see
+    a partially written file.
+    """
+    (fd, tmp_path) = tempfile.mkstemp(dir=os.path.dirname(path) or None)
+    try:
+        with os.fdopen(fd, 'w') as fp:
+            fp.write(content)
+
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def exchange(path1, path2):
+    """Exchanges two existing paths atomically by renameat2 (Linux only).
+    Raise an OSError if it is not supported.
+    """
+    libc_name = ctypes.util.find_library('c')
+    if libc_name is None:
+        raise OSError(errno.ENOSYS, 'libc not found')
+
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(libc, 'renameat2'):
+        raise OSError(errno.ENOSYS, 'renameat2 not supported')
+
+    encoding = sys.getfilesystemencoding()
+    result = libc.renameat2(
+        AT_FDCWD, path1.encode(encoding),
+        AT_FDCWD, path2.encode(encoding),
+        RENAME_EXCHANGE)
+    if result != 0:
+        raise OSError(ctypes.get_errno(), 'renameat2 failed: ' + path1)
+
+
+def swap_dir(src, dst):
+    """Moves the src directory to the dst path, and moves the old dst
+    directory to the src path.
+    The dst path is replaced atomically if the platform supports it,
+    otherwise the dst path does not exist for a moment.
+    """
+    if not os.path.exists(dst):
+        os.rename(src, dst)
+        return
+
+    try:
+        exchange(src, dst)
+        return
+    except (AttributeError, OSError):
+        pass
+
+    tmp_path = src + '.swap'
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+
+    os.rename(dst, tmp_path)
+    os.rename(src, dst)
+    os.rename(tmp_path, src)
+
+
+def rmtree_in_background(path):
+    """Removes the directory tree in a new thread, and returns the thread.
+    The thread is not a daemon, so the tree is removed completely before
+    the process exits.
+    """
+    thread = threading.Thread(
+        target=shutil.rmtree,
+        args=(path,),
+        kwargs={'ignore_errors': True})
+    thread.start()
+    return thread
+
+
+def remove_empty_dirs(path, root):
+    """Removes the directory specified the path and its parents while they are
+    empty, and returns a list of paths for removed directories.
+    The root directory and directories out of it are never removed.
+    """
+    result = []
+    root = os.path.abspath(root)
+    path = os.path.abspath(path)
+
+    while path.startswith(os.path.join(root, '')):
+        try:
+            os.rmdir(path)
+        except OSError:
+            # Not empty
+            break
+
+        result.append(path)
+        path = os.path.dirname(path)
+
+    return result
+
+
+def digest(path):
+    """Returns a SHA-1 hex digest of the content of the specified file.
+    """
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(64 * 1024), b''):
+            sha1.update(chunk)
+
+    return sha1.hexdigest()
+
+
 def executable(path):
     """Whether a file is specified the path is executable.
     """
@@ -0,0 +1,188 @@
+import mmap
+import os
+import re
+import threading
+import googkit.compat.urllib.request
+import googkit.lib.strutil
+
+
+"""Markers registered by plugins as a list of tuples (name, marker, update).
+"""
+_registry = []
+
+
+def register(name, marker, update):
+    """Registers a marker that is replaced by ``config apply``.
+    ``update(line, path)`` should return a new content for the line marked
+    by the marker in the file specified the path.
+    Plugins can call this in their ``register`` method.
+    """
+    _registry.append((name, marker, update))
+
+
+def registered():
+    """Returns a list of tuples (name, marker, update) for registered markers.
+    """
+    return list(_registry)
+
+
+class Rewriter(object):
+    """A class for engines that rewrite lines marked by markers like
+    ``<!--@base_js@-->`` or ``/*@provide_main@*/``.
+    All markers are found by one compiled pattern, so each line is scanned
+    only once.
+
+    Usage::
+        >>> rewriter = Rewriter()
+        >>> rewriter.add('greeting', '<!--@greeting@-->', lambda line, path: 'Hello')
+        >>> rewriter.rewrite_lines(['  <!--@greeting@-->\\n', 'foo\\n'], 'index.html')
+        ['  Hello<!--@greeting@-->\\n', 'foo\\n']
+    """
+
+    def __init__(self, keep_markers=True):
+        """Creates a rewriter without markers.
+        Marked lines are replaced by ``{indent}{content}{marker}`` if
+        keep_markers is True, so the file can be rewritten again. Otherwise
+        they are replaced by the content that can have multiple lines, and
+        removed if the content is None.
+        """
+        self.keep_markers = keep_markers
+        self._updaters = {}
+        self._pattern = None
+        self._urls = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, marker, update):
+        """Adds a marker and a function to update lines marked by it.
+        ``update(line, path)`` should return a new content for the line.
+        """
+        self._updaters[marker] = (name, update)
+        self._pattern = None
+
+    def pattern(self):
+        """Returns a compiled pattern that matches all markers.
+        """
+        if self._pattern is None:
+            # Longer markers come first to match a marker that contains
+            # another one
+            markers = sorted(self._updaters.keys(), key=len, reverse=True)
+            self._pattern = re.compile('|'.join([re.escape(marker) for marker in markers]))
+
+        return self._pattern
+
+    def prefixes(self):
+        """Returns a list of byte strings that every marker starts with, like
+        ``<!--@`` or ``/*@``.
+        """
+        result = set()
+        for marker in self._updaters.keys():
+            index = marker.find('@')
+            prefix = marker[:index + 1] if index >= 0 else marker
+            result.add(prefix.encode('utf-8'))
+
+        return sorted(result)
+
+    def may_match(self, path):
+        """Whether the file specified the path may have markers.
+        The file is memory-mapped and searched for prefixes of markers as
+        bytes, so files without markers are not decoded nor split into lines.
+        """
+        prefixes = self.prefixes()
+        if not prefixes:
+            return False
+
+        with open(path, 'rb') as fp:
+            if os.fstat(fp.fileno()).st_size == 0:
+                return False
+
+            try:
+                data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except (mmap.error, ValueError):
+                # Cannot be mapped (e.g. on a special file system)
+                return True
+
+            try:
+                for prefix in prefixes:
+                    if data.find(prefix) >= 0:
+                        return True
+            finally:
+                data.close()
+
+        return False
+
+    def relative_url(self, target, path):
+        """Returns a relative URL for the target from the directory of the file
+        specified the path.
+        URLs are memoized for each directory, because files in the same
+        directory refer to the same targets.
+        """
+        key = (target, os.path.dirname(path))
+        url = self._urls.get(key)
+        if url is None:
+            relpath = os.path.relpath(target, key[1])
+            url = googkit.compat.urllib.request.pathname2url(relpath)
+            with self._lock:
+                self._urls[key] = url
+
+        return url
+
+    def rewrite_line(self, line, path):
+        """Returns a rewritten line that can be empty or have multiple lines.
+        The line is returned as it is if it has no markers.
+        """
+        markers = self.pattern().findall(line)
+        if not markers:
+            return line
+
+        return self._rewrite_markers(line, path, markers)
+
+    def _rewrite_markers(self, line, path, markers):
+        # Every marker on the line is replaced in the order of appearance,
+        # and contents are joined on the line
+        indent = googkit.lib.strutil.line_indent(line)
+        contents = [self._updaters[marker][1](line, path) for marker in markers]
+
+        if self.keep_markers:
+            return '{indent}{contents}\n'.format(
+                indent=indent,
+                contents=''.join(['{content}{marker}'.format(content=content, marker=marker)
+                                  for (content, marker) in zip(contents, markers)]))
+
+        contents = [content for content in contents if content is not None]
+        if not contents:
+            return ''
+
+        return ''.join(['{indent}{line}\n'.format(indent=indent, line=content_line)
+                        for content_line in ''.join(contents).split('\n')])
+
+    def rewrite(self, lines, path):
+        """Returns a tuple of a list of rewritten lines in the file specified
+        the path and a list of names for replaced markers.
+        """
+        if not self._updaters:
+            return (list(lines), [])
+
+        result = []
+        names = []
+        findall = self.pattern().findall
+
+        for line in lines:
+            markers = findall(line)
+            if not markers:
+                result.append(line)
+                continue
+
+            result.append(self._rewrite_markers(line, path, markers))
+            names.extend([self._updaters[marker][0] for marker in markers])
+
+        return (result, names)
+
+    def rewrite_lines(self, lines, path):
+        """Returns a list of rewritten lines in the file specified the path.
+        """
+        return self.rewrite(lines, path)[0]
+
+    def signature(self):
+        """Returns a string that identifies the markers of this rewriter.
+        """
+        return '\n'.join(sorted(self._updaters.keys()))
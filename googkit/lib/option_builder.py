@@ -57,3 +57,16 @@ class OptionBuilder(object):
         """
         entry = OptionBuilder.OptionEntry(key, value)
         self._args.append(entry)
+
+    def values(self, key):
+        """Returns a list of values for the specified key.
+
+        Usage::
+            >>> args = OptionBuilder()
+            >>> args.add('--key1', 'value1')
+            >>> args.add('--key2', 'value2')
+            >>> args.add('--key1', 'value3')
+            >>> args.values('--key1')
+            ['value1', 'value3']
+        """
+        return [entry.value for entry in self._args if entry.key == key]
@@ -0,0 +1,62 @@
+import multiprocessing
+import multiprocessing.pool
+from googkit.lib.error import GoogkitError
+from googkit.lib.i18n import _
+
+
+def cpu_count():
+    """Returns the number of CPUs, or 1 if it cannot be determined.
+    """
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def jobs(value):
+    """Returns the number of jobs by the value of a ``--jobs`` option.
+    Returns the number of CPUs if the value is not specified.
+    Raise a GoogkitError if the value is not a positive integer.
+
+    Usage::
+        >>> jobs('4')
+        4
+    """
+    if value is None or value is True:
+        return cpu_count()
+
+    try:
+        count = int(value)
+    except ValueError:
+        count = 0
+
+    if count < 1:
+        raise GoogkitError(_('Invalid number of jobs: {jobs}').format(
+            jobs=value))
+
+    return count
+
+
+def imap(func, iterable, jobs):
+    """Applies the function to each item by the specified number of threads,
+    and yields the results in the order of the items.
+    Items are processed in the current thread if jobs is 1.
+
+    Usage::
+        >>> list(imap(lambda x: x * 2, [1, 2, 3], 2))
+        [2, 4, 6]
+    """
+    items = list(iterable)
+
+    if jobs <= 1 or len(items) <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    pool = multiprocessing.pool.ThreadPool(min(jobs, len(items)))
+    try:
+        for result in pool.imap(func, items):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
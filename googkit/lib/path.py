@@ -10,6 +10,7 @@ PLUGIN_DIR = 'plugins'
 LOCALE_DIR = os.path.join(DATA_DIR, 'locale')
 DEFAULT_CONFIG = os.path.join(DATA_DIR, 'default.cfg')
 TEMPLATE_DIR = os.path.join(DATA_DIR, 'template')
+CACHE_DIR = '.googkit-cache'
 
 
 def googkit_root():
@@ -124,6 +125,59 @@ def locale():
     return locale_dir
 
 
+def compile_cache(project_root, cache_dir=CACHE_DIR):
+    """Returns a path for the compile cache directory in the specified
+    project root.
+    The cache directory can be an absolute path to share it by projects.
+    """
+    return os.path.join(project_root, cache_dir, 'compile')
+
+
+def deps_cache(project_root, cache_dir=CACHE_DIR):
+    """Returns a path for the cache directory of parsed scripts in the
+    specified project root.
+    The cache directory can be an absolute path to share it by projects.
+    """
+    return os.path.join(project_root, cache_dir, 'deps')
+
+
+def deps_index(project_root, cache_dir=CACHE_DIR):
+    """Returns a path for the index file of parsed scripts in the specified
+    project root.
+    """
+    return os.path.join(project_root, cache_dir, 'deps.json')
+
+
+def config_index(project_root, cache_dir=CACHE_DIR):
+    """Returns a path for the index file of files that have no markers to
+    apply config in the specified project root.
+    """
+    return os.path.join(project_root, cache_dir, 'config.json')
+
+
+def bundle_index(project_root, cache_dir=CACHE_DIR):
+    """Returns a path for the index file of dev bundles in the specified
+    project root.
+    """
+    return os.path.join(project_root, cache_dir, 'bundle.json')
+
+
+def profile_report(project_root, cache_dir=CACHE_DIR):
+    """Returns a default path for the profile report in the specified project
+    root.
+    """
+    return os.path.join(project_root, cache_dir, 'profile.json')
+
+
+def staging_dir(target_dir):
+    """Returns a path for the staging directory of the specified target
+    directory. It is a hidden sibling of the target directory, so they can
+    be swapped by renaming.
+    """
+    (parent, name) = os.path.split(os.path.normpath(target_dir))
+    return os.path.join(parent, '.{name}.staging'.format(name=name))
+
+
 def replace_base(target, old_base, new_base):
     """Replace a base directory in the target path with the new one.
     """
@@ -0,0 +1,86 @@
+import collections
+import logging
+import subprocess
+import threading
+import time
+from googkit.lib.i18n import _
+
+
+"""Maximum number of lines kept in messages from a child process.
+Older lines are only logged, so memory use is bounded even if the process
+prints a lot of warnings.
+"""
+MAX_LINES = 1000
+
+
+def log_line(line, prefix=None, level=logging.DEBUG):
+    """Logs a line of messages from a child process with the prefix.
+    """
+    if prefix is not None:
+        line = u'[{prefix}] {line}'.format(prefix=prefix, line=line)
+
+    logging.log(level, line)
+
+
+def log_lines(output, prefix=None, level=logging.DEBUG):
+    """Logs each line of the messages with the prefix.
+    """
+    for line in output.splitlines():
+        log_line(line, prefix, level)
+
+
+def run(cmd, prefix=None, level=logging.DEBUG, max_lines=MAX_LINES):
+    """Runs the command, and returns a tuple of the exit code and the last
+    lines of messages from it.
+    Messages on stdout and stderr are logged line by line with the prefix
+    while the command is running.
+    """
+    popen_args = {
+        'stdout': subprocess.PIPE,
+        'stderr': subprocess.STDOUT,
+    }
+
+    proc = subprocess.Popen(cmd, **popen_args)
+    lines = collections.deque(maxlen=max_lines)
+
+    try:
+        for data in iter(proc.stdout.readline, b''):
+            line = data.decode('utf-8', 'replace').rstrip('\r\n')
+            lines.append(line)
+            log_line(line, prefix, level)
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+    return (proc.returncode, '\n'.join(lines))
+
+
+class Progress(object):
+    """A class for progress of tasks that logs how many tasks are done and
+    the elapsed time whenever a task is done.
+    Tasks can be done by multiple threads at the same time.
+    """
+
+    def __init__(self, total):
+        """Creates a progress for the specified number of tasks.
+        """
+        self.total = total
+        self.done = 0
+        self._started = time.time()
+        self._lock = threading.Lock()
+
+    def elapsed(self):
+        """Returns elapsed time in seconds since this progress was created.
+        """
+        return time.time() - self._started
+
+    def step(self, message):
+        """Marks a task as done, and logs the message with the progress.
+        """
+        with self._lock:
+            self.done += 1
+            logging.info(_('[{done}/{total}] {message} ({elapsed:.1f}s)').format(
+                done=self.done,
+                total=self.total,
+                message=message,
+                elapsed=self.elapsed()))
@@ -0,0 +1,138 @@
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from googkit.lib.i18n import _
+
+
+class Profiler(object):
+    """A class for profilers that measure elapsed time of each phase.
+    Phases can be measured by multiple threads at the same time.
+
+    Usage::
+        >>> profiler = Profiler()
+        >>> with profiler.phase('compile', 'index.html'):
+        ...     pass
+        >>> [record['phase'] for record in profiler.records()]
+        ['compile']
+    """
+
+    def __init__(self):
+        self._started = time.time()
+        self._records = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name, target=None):
+        """Measures elapsed time of the with-block as the phase.
+        The target is an entry point or a file that the phase processes.
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            record = {
+                'phase': name,
+                'target': target,
+                'start': start - self._started,
+                'elapsed': time.time() - start,
+                'thread': threading.current_thread().name,
+            }
+            with self._lock:
+                self._records.append(record)
+
+    def records(self):
+        """Returns a list of measured phases in the order of their ends.
+        """
+        with self._lock:
+            return list(self._records)
+
+    def summary(self):
+        """Returns a list of tuples (phase, count, total, max, slowest
+        target) for each phase in the order of their first ends.
+        """
+        phases = []
+        stats = {}
+
+        for record in self.records():
+            name = record['phase']
+            stat = stats.get(name)
+            if stat is None:
+                phases.append(name)
+                stat = stats[name] = [0, 0.0, 0.0, None]
+
+            stat[0] += 1
+            stat[1] += record['elapsed']
+            if stat[3] is None or record['elapsed'] > stat[2]:
+                stat[2] = record['elapsed']
+                stat[3] = record['target']
+
+        return [tuple([name] + stats[name]) for name in phases]
+
+    def report(self, command=None):
+        """Returns a dictionary of measured phases that can be dumped as JSON.
+        """
+        return {
+            'command': command,
+            'started': self._started,
+            'elapsed': time.time() - self._started,
+            'phases': self.records(),
+            'summary': [{
+                'phase': phase,
+                'count': count,
+                'total': total,
+                'max': maximum,
+                'slowest': slowest,
+            } for (phase, count, total, maximum, slowest) in self.summary()],
+        }
+
+
+@contextlib.contextmanager
+def measure(profiler, name, target=None):
+    """Measures the phase by the profiler if it is not None.
+    """
+    if profiler is None:
+        yield
+        return
+
+    with profiler.phase(name, target):
+        yield
+
+
+def summary_table(profiler):
+    """Returns a table of the summary for the profiler as a string.
+
+    Usage::
+        >>> profiler = Profiler()
+        >>> print(summary_table(profiler))
+        Phase                     Count      Total        Max  Slowest
+    """
+    row_format = '{0:<24} {1:>6} {2:>10} {3:>10}  {4}'
+    lines = [row_format.format('Phase', 'Count', 'Total', 'Max', 'Slowest')]
+
+    for (phase, count, total, maximum, slowest) in profiler.summary():
+        lines.append(row_format.format(
+            phase,
+            count,
+            '{0:.3f}s'.format(total),
+            '{0:.3f}s'.format(maximum),
+            slowest or ''))
+
+    return '\n'.join(lines)
+
+
+def write_report(profiler, path, command=None):
+    """Writes a JSON report for the profiler to the specified path, and logs
+    the summary table.
+    """
+    report_dir = os.path.dirname(path)
+    if report_dir and not os.path.exists(report_dir):
+        os.makedirs(report_dir)
+
+    with open(path, 'w') as fp:
+        json.dump(profiler.report(command), fp, indent=2, sort_keys=True)
+
+    logging.info(summary_table(profiler))
+    logging.info(_('Wrote a profile report: {path}').format(path=path))
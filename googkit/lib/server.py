@@ -0,0 +1,291 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import posixpath
+import shutil
+import time
+from googkit.compat.http.server import BaseHTTPRequestHandler
+from googkit.compat.http.server import HTTPServer
+from googkit.compat.socketserver import ThreadingMixIn
+from googkit.compat.urllib.parse import unquote
+from googkit.lib.error import GoogkitError
+from googkit.lib.i18n import _
+
+
+"""Minimum size in bytes of files that are sent by sendfile.
+Smaller files are copied through the user space, which is fast enough.
+"""
+SENDFILE_MIN_SIZE = 64 * 1024
+
+"""Cache-Control for resources whose content never changes for the URL, like
+scripts that have the content hash in their names.
+"""
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def local_path(url_path):
+    """Returns a relative path on the local file system for the URL path.
+    Paths never point outside the current directory, and paths ending with
+    a slash point to ``index.html`` in the directory.
+
+    Usage::
+        >>> local_path('/development/../index.html?q=1')
+        'index.html'
+    """
+    path = unquote(url_path.split('?', 1)[0].split('#', 1)[0])
+    if path.endswith('/'):
+        path += 'index.html'
+
+    # The root of an absolute path absorbs '..'
+    path = posixpath.normpath('/' + path).lstrip('/')
+    return os.path.join(*path.split('/'))
+
+
+def accepts_gzip(accept_encoding):
+    """Whether the value of an Accept-Encoding header accepts gzip.
+
+    Usage::
+        >>> accepts_gzip('gzip, deflate, br')
+        True
+        >>> accepts_gzip('gzip;q=0, deflate')
+        False
+    """
+    if accept_encoding is None:
+        return False
+
+    for coding in accept_encoding.split(','):
+        params = [param.strip() for param in coding.split(';')]
+        if params[0] == 'gzip':
+            return 'q=0' not in params[1:]
+
+    return False
+
+
+def content_type(path):
+    """Returns a content type for the file specified the path.
+    """
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+class Resource(object):
+    """A class for resources that the server responds.
+    A resource has either a content in memory or a path for the file to send.
+    A resource for a file can have a precompressed copy of the file that is
+    sent instead if the client accepts gzip.
+    """
+
+    def __init__(self, content=None, path=None, content_type=None, etag=None, cache_control='no-cache', length=None):
+        self.content = content
+        self.path = path
+        self.content_type = content_type
+        self.etag = etag
+        self.cache_control = cache_control
+        self.length = length
+        self.content_encoding = None
+        self.gzip_path = None
+
+    @classmethod
+    def from_content(cls, content, path):
+        """Returns a resource that has the content for the file specified the
+        path. The ETag is the digest of the content.
+        """
+        return Resource(
+            content=content,
+            content_type=content_type(path),
+            etag='"{digest}"'.format(digest=hashlib.sha1(content).hexdigest()))
+
+    @classmethod
+    def from_file(cls, path, stat=None):
+        """Returns a resource that sends the file specified the path.
+        The ETag is made from the modification time and the size of the file.
+        """
+        if stat is None:
+            stat = os.stat(path)
+
+        return Resource(
+            path=path,
+            content_type=content_type(path),
+            etag='"{mtime:x}-{size:x}"'.format(
+                mtime=int(stat.st_mtime * 1000000),
+                size=stat.st_size),
+            length=stat.st_size)
+
+    def gzip_variant(self):
+        """Returns a resource that sends the precompressed copy of this
+        resource.
+        """
+        resource = Resource.from_file(self.gzip_path)
+        resource.content_type = self.content_type
+        resource.content_encoding = 'gzip'
+        resource.cache_control = self.cache_control
+        return resource
+
+    def size(self):
+        """Returns the size of the body in bytes.
+        """
+        if self.content is not None:
+            return len(self.content)
+
+        return self.length
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """A class for handlers that respond resources resolved by the server.
+    """
+
+    # Keep connections alive for pages that load many scripts
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.respond(with_body=True)
+
+    def do_HEAD(self):
+        self.respond(with_body=False)
+
+    def respond(self, with_body):
+        """Responds a resource for the requested path, and logs the result.
+        """
+        started = time.time()
+        (status, size) = self._respond(with_body)
+        self.log_access(status, size, time.time() - started)
+
+    def _respond(self, with_body):
+        # Returns a tuple of the status and the number of bytes sent
+        try:
+            resource = self.server.resolve(self.path)
+        except (GoogkitError, IOError, OSError) as e:
+            logging.error(_('{path}: {message}').format(path=self.path, message=str(e)))
+            self.send_error(500)
+            return (500, 0)
+
+        if resource is None:
+            self.send_error(404)
+            return (404, 0)
+
+        if resource.gzip_path is not None and accepts_gzip(self.headers.get('Accept-Encoding')):
+            resource = resource.gzip_variant()
+
+        # Only headers are sent if the resource matches the ETag in the request
+        if resource.etag is not None and self.headers.get('If-None-Match') == resource.etag:
+            self.send_response(304)
+            self.send_resource_headers(resource)
+            self.end_headers()
+            return (304, 0)
+
+        self.send_response(200)
+        self.send_resource_headers(resource)
+        self.send_header('Content-Type', resource.content_type)
+        if resource.content_encoding is not None:
+            self.send_header('Content-Encoding', resource.content_encoding)
+        self.send_header('Content-Length', str(resource.size()))
+        self.end_headers()
+
+        if not with_body:
+            return (200, 0)
+
+        return (200, self.send_body(resource))
+
+    def send_resource_headers(self, resource):
+        """Sends headers for caching the resource.
+        """
+        if resource.etag is not None:
+            self.send_header('ETag', resource.etag)
+        self.send_header('Cache-Control', resource.cache_control)
+
+        if resource.gzip_path is not None or resource.content_encoding is not None:
+            self.send_header('Vary', 'Accept-Encoding')
+
+    def send_body(self, resource):
+        """Sends the content or the file of the resource, and returns the
+        number of bytes sent.
+        Large files are sent by sendfile if it is available, so they are not
+        copied through the user space.
+        """
+        if resource.content is not None:
+            self.wfile.write(resource.content)
+            return len(resource.content)
+
+        with open(resource.path, 'rb') as fp:
+            size = resource.size()
+            if size >= SENDFILE_MIN_SIZE and hasattr(os, 'sendfile'):
+                self.wfile.flush()
+                try:
+                    return self._sendfile(fp, size)
+                except OSError:
+                    # Not supported by the file system, nothing has been sent
+                    fp.seek(0)
+
+            shutil.copyfileobj(fp, self.wfile)
+            return size
+
+    def _sendfile(self, fp, size):
+        offset = 0
+        while offset < size:
+            try:
+                sent = os.sendfile(self.connection.fileno(), fp.fileno(), offset, size - offset)
+            except OSError:
+                if offset > 0:
+                    # The response is broken, so the connection is closed
+                    self.close_connection = True
+                    return offset
+                raise
+
+            if sent == 0:
+                # The file is truncated while sending
+                self.close_connection = True
+                break
+            offset += sent
+
+        return offset
+
+    def log_access(self, status, size, elapsed):
+        """Logs the request with the status, the number of bytes sent and the
+        latency.
+        """
+        logging.log(self.server.access_log_level, _('{method} {path} {status} {size} bytes {elapsed:.1f}ms').format(
+            method=self.command,
+            path=self.path,
+            status=status,
+            size=size,
+            elapsed=elapsed * 1000))
+
+    def log_request(self, code='-', size='-'):
+        # Requests are logged with the latency by log_access instead
+        pass
+
+    def log_message(self, format, *args):
+        logging.debug(u'{address} - {message}'.format(
+            address=self.address_string(),
+            message=format % args))
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    """A class for HTTP servers that handle each request by a thread.
+    ``resolve(url_path)`` should return a Resource for the requested path, or
+    None if it is not found.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    """Level to log each request.
+    """
+    access_log_level = logging.DEBUG
+
+    def __init__(self, address, resolve):
+        """Creates a server that listens on the address, a tuple of the host
+        and the port.
+        """
+        # HTTPServer is an old-style class on Python 2
+        HTTPServer.__init__(self, address, RequestHandler)
+        self.resolve = resolve
+
+    def url(self, path=''):
+        """Returns a URL for the local path on this server.
+        """
+        (host, port) = self.server_address[:2]
+        return 'http://{host}:{port}/{path}'.format(
+            host=host,
+            port=port,
+            path=path.replace(os.sep, '/'))
@@ -0,0 +1,264 @@
+import abc
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from googkit.compat.abc import ABC
+
+
+class Watcher(ABC):
+    """An abstract class for watchers that detect changed files in a
+    directory.
+    Override poll to implement a new watcher.
+    """
+
+    """Interval in seconds to wait for the first change.
+    """
+    WAIT_INTERVAL = 1.0
+
+    def __init__(self, root, ignore=None):
+        """Creates a watcher for the specified root directory.
+        Files and directories that ``ignore(path)`` returns True are not
+        watched.
+        """
+        self.root = root
+        self.ignore = ignore
+
+    def _is_ignored(self, path):
+        return self.ignore is not None and self.ignore(path)
+
+    @abc.abstractmethod
+    def poll(self, timeout):
+        """Waits changes until the timeout in seconds, and returns a set of
+        changed paths. The set is empty if nothing changed.
+        Files in removed directories are also returned.
+        """
+        pass
+
+    def wait(self, debounce=0.2):
+        """Blocks until some files are changed, and returns a set of the
+        changed paths.
+        Changes are merged until no changes are detected for the debounce
+        time in seconds, so a burst of changes is returned at once.
+        """
+        changed = set()
+        while not changed:
+            changed |= self.poll(Watcher.WAIT_INTERVAL)
+
+        while True:
+            more = self.poll(debounce)
+            if not more:
+                return changed
+
+            changed |= more
+
+    def close(self):
+        """Stops watching.
+        """
+        pass
+
+
+class PollingWatcher(Watcher):
+    """A watcher that detects changes by comparing modification times of
+    files periodically.
+    Files in removed directories are detected because they disappear from
+    the snapshot.
+    """
+
+    def __init__(self, root, ignore=None):
+        super(PollingWatcher, self).__init__(root, ignore)
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self):
+        snapshot = {}
+
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [dirname for dirname in dirnames
+                           if not self._is_ignored(os.path.join(dirpath, dirname))]
+
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if self._is_ignored(path):
+                    continue
+
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                snapshot[path] = (stat.st_mtime, stat.st_size)
+
+        return snapshot
+
+    def poll(self, timeout):
+        time.sleep(timeout)
+
+        snapshot = self._take_snapshot()
+        old_snapshot = self._snapshot
+        self._snapshot = snapshot
+
+        paths = set(snapshot.keys()) | set(old_snapshot.keys())
+        return set([path for path in paths
+                    if snapshot.get(path) != old_snapshot.get(path)])
+
+
+class InotifyWatcher(Watcher):
+    """A watcher that detects changes by inotify (Linux only).
+    Files in each watched directory are tracked, so files in directories
+    that are removed or moved out are reported as changed.
+    Raise an OSError if inotify is not available.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+
+    EVENT_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+                  IN_MOVED_TO | IN_CREATE | IN_DELETE)
+
+    """Struct format of inotify_event without the name field.
+    """
+    EVENT_FORMAT = 'iIII'
+
+    def __init__(self, root, ignore=None):
+        super(InotifyWatcher, self).__init__(root, ignore)
+
+        libc_name = ctypes.util.find_library('c')
+        if libc_name is None:
+            raise OSError(errno.ENOSYS, 'libc not found')
+
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init'):
+            raise OSError(errno.ENOSYS, 'inotify not supported')
+
+        self._fd = self._libc.inotify_init()
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init failed')
+
+        self._dirs = {}
+        self._files = {}
+        self._add_watches(root)
+
+    def _add_watch(self, path):
+        encoded = path.encode(sys.getfilesystemencoding())
+        wd = self._libc.inotify_add_watch(self._fd, encoded, InotifyWatcher.EVENT_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch failed: ' + path)
+
+        self._dirs[wd] = path
+
+    def _add_watches(self, root):
+        """Watches the root directory and its subdirectories, and returns
+        paths of files in them.
+        """
+        paths = set()
+
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [dirname for dirname in dirnames
+                           if not self._is_ignored(os.path.join(dirpath, dirname))]
+            self._add_watch(dirpath)
+
+            files = set([os.path.join(dirpath, filename) for filename in filenames
+                         if not self._is_ignored(os.path.join(dirpath, filename))])
+            self._files[dirpath] = files
+            paths |= files
+
+        return paths
+
+    def _remove_watches(self, root):
+        """Stops watching the root directory and its subdirectories, and
+        returns paths of files known in them.
+        """
+        def is_in_root(dirpath):
+            return dirpath == root or dirpath.startswith(os.path.join(root, ''))
+
+        paths = set()
+        for dirpath in [dirpath for dirpath in self._files.keys() if is_in_root(dirpath)]:
+            paths |= self._files.pop(dirpath)
+
+        for wd in [wd for (wd, dirpath) in self._dirs.items() if is_in_root(dirpath)]:
+            del self._dirs[wd]
+            # Moved directories are still watched, and removed ones are
+            # already unwatched by the kernel
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+        return paths
+
+    def _read_events(self):
+        data = os.read(self._fd, 64 * 1024)
+        header_size = struct.calcsize(InotifyWatcher.EVENT_FORMAT)
+        offset = 0
+
+        while offset + header_size <= len(data):
+            (wd, mask, cookie, length) = struct.unpack_from(
+                InotifyWatcher.EVENT_FORMAT, data, offset)
+            offset += header_size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            yield (wd, mask, name.decode(sys.getfilesystemencoding()))
+
+    def poll(self, timeout):
+        (readable, writable, exceptional) = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        for (wd, mask, name) in self._read_events():
+            if mask & InotifyWatcher.IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+
+            dirpath = self._dirs.get(wd)
+            if dirpath is None or not name:
+                continue
+
+            path = os.path.join(dirpath, name)
+            if self._is_ignored(path):
+                continue
+
+            if mask & InotifyWatcher.IN_ISDIR:
+                if mask & (InotifyWatcher.IN_CREATE | InotifyWatcher.IN_MOVED_TO):
+                    # Files may be added before the directory is watched
+                    try:
+                        changed |= self._add_watches(path)
+                    except OSError:
+                        pass
+                elif mask & (InotifyWatcher.IN_DELETE | InotifyWatcher.IN_MOVED_FROM):
+                    changed |= self._remove_watches(path)
+                continue
+
+            files = self._files.setdefault(dirpath, set())
+            if mask & (InotifyWatcher.IN_DELETE | InotifyWatcher.IN_MOVED_FROM):
+                files.discard(path)
+            else:
+                files.add(path)
+
+            changed.add(path)
+
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def watcher(root, ignore=None):
+    """Returns a watcher for the specified root directory.
+    Uses inotify if it is available, otherwise polls modification times.
+    """
+    try:
+        return InotifyWatcher(root, ignore)
+    except (AttributeError, OSError):
+        return PollingWatcher(root, ignore)
@@ -1,5 +1,7 @@
 import unittest
 import os
+import shutil
+import tempfile
 
 from test.stub_config import StubConfig, StubConfigOnStubProject
 from test.stub_environment import StubEnvironment
@@ -7,6 +9,8 @@ from test.stub_stdout import StubStdout
 
 from googkit.commands.apply_config import ApplyConfigCommand
 from googkit.compat.unittest import mock
+from googkit.lib.cache import StatIndex
+from googkit.lib.error import GoogkitError
 import googkit.lib.strutil
 
 
@@ -37,6 +41,24 @@ class TestApplyConfigCommand(unittest.TestCase):
 
         self.assertEqual(self.cmd.update_deps_js(line, 'dummy.html'), expected)
 
+    def test_update_require_main(self):
+        self.env.argument = mock.MagicMock()
+        self.env.argument.option.return_value = None
+        page_path = os.path.join(StubConfig.DEVELOPMENT_DIR, 'index.html')
+
+        self.assertEqual(
+            self.cmd.update_require_main('', page_path),
+            '<script> goog.require(\'googkit_index\'); </script>')
+
+    def test_update_require_main_with_dev_bundle(self):
+        self.env.argument = mock.MagicMock()
+        self.env.argument.option.side_effect = lambda opt: opt == '--dev-bundle'
+        page_path = os.path.join(StubConfig.DEVELOPMENT_DIR, 'index.html')
+
+        self.assertEqual(
+            self.cmd.update_require_main('', page_path),
+            '<script src="JS_BUNDLE/googkit_index.js"></script>')
+
     def test_multitestrunner_css(self):
         self.cmd.config = mock.MagicMock()
         self.cmd.config.multitestrunner_css.return_value = 'dummy.css'
@@ -46,22 +68,26 @@ class TestApplyConfigCommand(unittest.TestCase):
 
         self.assertEqual(self.cmd.update_multitestrunner_css(line, 'dummy.html'), expected)
 
+    def test_update_deps_js_per_page(self):
+        self.cmd.config.deps_per_page = mock.MagicMock(return_value=True)
+        page_path = os.path.join(StubConfig.DEVELOPMENT_DIR, 'index.html')
+        test_path = os.path.join(StubConfig.JS_DEV_DIR, 'foo_test.html')
+
+        self.assertEqual(
+            self.cmd.update_deps_js('', page_path),
+            '<script src="JS_DEPS/googkit_index.js"></script>')
+
+        # Tests should load all dependencies
+        self.assertEqual(
+            self.cmd.update_deps_js('', test_path),
+            '<script src="DEPS.JS"></script>')
+        self.assertEqual(
+            self.cmd.update_deps_js('', StubConfig.TESTRUNNER),
+            '<script src="JS_DEV/DEPS.JS"></script>')
+
     def test_apply_config(self):
-        # Expected following directory structure:
-        #
-        # dir1
-        # |-- dir2
-        # |   +-- development
-        # |       |-- target.html
-        # |       +-- js_dev
-        # |           +-- deps.js
-        # +-- closure
-        #     +-- library
-        #         +-- closure
-        #             |-- goog
-        #                 +-- base.js
-        #
-        tgt_path = os.path.join(StubConfig.DEVELOPMENT_DIR, 'target.html')
+        tmp_dir = tempfile.mkdtemp()
+        tgt_path = os.path.join(tmp_dir, 'target.html')
 
         self.cmd.update_deps_js = mock.MagicMock()
         self.cmd.update_deps_js.return_value = 'DEPS_JS'
@@ -70,52 +96,103 @@ class TestApplyConfigCommand(unittest.TestCase):
         self.cmd.update_multitestrunner_css = mock.MagicMock()
         self.cmd.update_multitestrunner_css.return_value = 'MULTI_TEST_RUNNER_CSS'
 
-        # Data will be given by for-in statement with open()
-        read_data = '''\
+        data = '''\
 DUMMY
 <!--@multitestrunner_css@-->
  <!--@base_js@-->
   <!--@deps_js@-->
-   <!--@dummy_marker@-->'''
+   <!--@dummy_marker@-->
+'''
 
-        # Expected data will be given by open.write()
         expected = '''\
 DUMMY
 MULTI_TEST_RUNNER_CSS<!--@multitestrunner_css@-->
  BASE_JS<!--@base_js@-->
   DEPS_JS<!--@deps_js@-->
-   <!--@dummy_marker@-->'''
-
-        # Use mock_open
-        mock_open = mock.mock_open(read_data=read_data)
-
-        # Context Manager is a return value of the mock_open.__enter__
-        mock_fp = mock_open.return_value.__enter__.return_value
-
-        # Read lines has "\n" at each last
-        mock_fp.__iter__.return_value = iter([(line + '\n') for line in read_data.split('\n')])
+   <!--@dummy_marker@-->
+'''
 
-        # Switch to the mock_open from the original open
-        with mock.patch('googkit.commands.apply_config.open', mock_open, create=True):
-            self.cmd.apply_config(tgt_path)
+        with open(tgt_path, 'w') as f:
+            f.write(data)
 
-        # Expected the target file was opened twice for reading and writing
-        mock_open.assert_any_call(tgt_path)
-        mock_open.assert_any_call(tgt_path, 'w')
-
-        # Expected correct data was wrote
         self.assertEqual(
-            mock_fp.write.call_args_list,
-            [mock.call(line + '\n',) for line in expected.split('\n')])
+            self.cmd.apply_config(tgt_path),
+            (True, ['multitestrunner.css', 'base.js', 'deps.js']))
+
+        with open(tgt_path) as f:
+            self.assertEqual(f.read(), expected)
 
         # Expect updaters was called when for each marker was found
         self.cmd.update_multitestrunner_css.assert_called_once_with('<!--@multitestrunner_css@-->\n', tgt_path)
         self.cmd.update_base_js.assert_called_once_with(' <!--@base_js@-->\n', tgt_path)
         self.cmd.update_deps_js.assert_called_once_with('  <!--@deps_js@-->\n', tgt_path)
 
+        # Expect the file is not written again if nothing is changed
+        with mock.patch('googkit.lib.file.write_atomically') as mock_write:
+            (changed, names) = self.cmd.apply_config(tgt_path)
+        self.assertFalse(changed)
+        self.assertFalse(mock_write.called)
+
+        shutil.rmtree(tmp_dir)
+
+    def test_apply_config_with_stat_index(self):
+        tmp_dir = tempfile.mkdtemp()
+        index_path = os.path.join(tmp_dir, 'config.json')
+        no_marker_path = os.path.join(tmp_dir, 'no_marker.js')
+        marker_path = os.path.join(tmp_dir, 'marker.js')
+
+        with open(no_marker_path, 'w') as f:
+            f.write('DUMMY\n')
+        with open(marker_path, 'w') as f:
+            f.write('/*@provide_main@*/\n')
+
+        self.cmd.stat_index = StatIndex(index_path)
+        self.cmd.apply_config(no_marker_path)
+        self.cmd.apply_config(marker_path)
+        self.cmd.stat_index.save()
+
+        # Files that had no markers should not be read again
+        self.cmd.stat_index = StatIndex(index_path)
+        self.cmd.stat_index.load()
+
+        with mock.patch('googkit.commands.apply_config.open', create=True) as mock_open:
+            self.assertEqual(self.cmd.apply_config(no_marker_path), (False, []))
+        self.assertFalse(mock_open.called)
+
+        self.assertFalse(self.cmd.stat_index.contains(marker_path))
+
+        shutil.rmtree(tmp_dir)
+
+    def test_apply_config_without_markers(self):
+        tmp_dir = tempfile.mkdtemp()
+        tgt_path = os.path.join(tmp_dir, 'vendor.js')
+
+        with open(tgt_path, 'w') as f:
+            f.write('var a = 1;\n' * 1000)
+
+        # Files without prefixes of markers should not be read as lines
+        with mock.patch('googkit.commands.apply_config.open', create=True) as mock_open:
+            self.assertEqual(self.cmd.apply_config(tgt_path), (False, []))
+        self.assertFalse(mock_open.called)
+
+        shutil.rmtree(tmp_dir)
+
+    def test_rewriter_with_registered_marker(self):
+        update = mock.MagicMock(return_value='FOO')
+
+        with mock.patch('googkit.lib.marker._registry', [('foo', '<!--@foo@-->', update)]):
+            rewriter = self.cmd.rewriter()
+
+        lines = rewriter.rewrite_lines(['<!--@foo@-->\n'], 'dummy.html')
+
+        self.assertEqual(lines, ['FOO<!--@foo@-->\n'])
+        self.assertIs(self.cmd.rewriter(), rewriter)
+
     def test_apply_config_all(self):
-        self.cmd.apply_config = mock.MagicMock()
+        self.cmd.apply_config = mock.MagicMock(return_value=(False, []))
         self.cmd.config = StubConfigOnStubProject()
+        self.env.argument = mock.MagicMock()
+        self.env.argument.option.return_value = None
 
         self.cmd.apply_config_all()
 
@@ -131,6 +208,32 @@ MULTI_TEST_RUNNER_CSS<!--@multitestrunner_css@-->
             path = os.path.join(StubConfigOnStubProject.DEVELOPMENT_DIR, expected_path)
             self.cmd.apply_config.assert_any_call(path)
 
+    def test_apply_config_all_with_jobs_opt(self):
+        self.cmd.config = StubConfigOnStubProject()
+        self.env.argument = mock.MagicMock()
+        self.env.argument.option.side_effect = lambda opt: '4' if opt == '--jobs' else None
+
+        def apply_config(path):
+            if path.endswith('main.js'):
+                raise IOError('Permission denied')
+            return (False, ['deps.js'])
+        self.cmd.apply_config = mock.MagicMock(side_effect=apply_config)
+
+        with mock.patch('logging.debug') as mock_debug:
+            with self.assertRaises(GoogkitError) as cm:
+                self.cmd.apply_config_all()
+
+        # Errors should be reported once after all files are processed
+        self.assertEqual(len(self.cmd.apply_config.call_args_list), 6)
+        self.assertIn('main.js: Permission denied', str(cm.exception))
+
+        # Results should be logged in the order of the files
+        paths = self.cmd.config_targets()
+        paths.remove(os.path.join(StubConfigOnStubProject.JS_DEV_DIR, 'main.js'))
+        self.assertEqual(
+            [c[0][0] for c in mock_debug.call_args_list][:-1],
+            ['Replaced a deps.js path on {path}'.format(path=path) for path in paths])
+
     def test_run_internal(self):
         dummy_project_root = os.path.normcase('/dir1/dir2')
         self.cmd.apply_config_all = mock.MagicMock()
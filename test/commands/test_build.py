@@ -1,14 +1,22 @@
 import unittest
 import doctest
+import json
 import os
-import subprocess
+import re
+import shutil
+import tempfile
+import threading
 
 from googkit.compat.unittest import mock
 from test.stub_config import StubConfig, StubConfigOnStubProject
 from test.stub_environment import StubEnvironment
 
+import googkit.lib.compress
+import googkit.lib.path
 import googkit.lib.strutil
 import googkit.commands.build
+from googkit.lib.deps import DepsGraph, Source
+from googkit.lib.error import GoogkitError
 BuildCommand = googkit.commands.build.BuildCommand
 
 
@@ -17,6 +25,14 @@ class TestBuildCommand(unittest.TestCase):
         self.env = StubEnvironment()
         self.cmd = BuildCommand(self.env)
         self.cmd.config = StubConfig()
+        self.env.argument = mock.MagicMock()
+        self.env.argument.option.return_value = None
+
+    def stub_arguments(self):
+        args = BuildCommand.BuilderArguments()
+        args.builder_arg('--output_file', 'dummy.JS')
+        args.builder_arg('--namespace', 'dummy')
+        return args
 
     def test_needs_project_config(self):
         self.assertTrue(BuildCommand.needs_project_config())
@@ -61,24 +77,56 @@ DUMMY
             mock_fp.write.call_args_list,
             [mock.call(line + '\n',) for line in expected.split('\n')])
 
+    def test_compiled_js_paths(self):
+        self.assertEqual(
+            self.cmd.compiled_js_paths(os.path.join('foo', 'bar.html')),
+            [os.path.join('foo', 'bar.JS')])
+
+    def test_compiled_js_paths_with_single_pass_opt(self):
+        self.env.argument.option.side_effect = lambda opt: opt == '--single-pass'
+
+        self.assertEqual(
+            self.cmd.compiled_js_paths(os.path.join('foo', 'bar.html')),
+            [os.path.join('foo', 'googkit_common.JS'), os.path.join('foo', 'bar.JS')])
+
     def test_setup_files(self):
         self.cmd.config = StubConfigOnStubProject()
         self.cmd.compile_resource = mock.MagicMock()
 
         with mock.patch.object(BuildCommand, 'ignore_dirs') as mock_ignore_dirs, \
-                mock.patch('googkit.lib.file.copytree') as mock_copytree:
+                mock.patch('googkit.lib.file.sync') as mock_sync:
             mock_ignore_dirs.return_value = 'IGNORE'
 
-            self.cmd.setup_files(StubConfigOnStubProject.PRODUCTION_DIR, False)
+            self.cmd.setup_files(StubConfigOnStubProject.PRODUCTION_DIR)
 
-        mock_copytree.assert_called_once_with(
+        mock_sync.assert_called_once_with(
             StubConfigOnStubProject.DEVELOPMENT_DIR,
             StubConfigOnStubProject.PRODUCTION_DIR,
-            ignore='IGNORE')
+            ignore='IGNORE',
+            keep=self.cmd.is_build_output,
+            mode='copy',
+            needs_copy=BuildCommand.is_html)
 
         self.cmd.compile_resource.assert_any_call(
             os.path.join(StubConfigOnStubProject.PRODUCTION_DIR, 'index.html'))
 
+    def test_staging_mode(self):
+        self.cmd.config = mock.MagicMock()
+
+        self.cmd.config.staging.return_value = 'hardlink'
+        self.assertEqual(self.cmd.staging_mode(), 'hardlink')
+
+        # Symbolic links should not be used for production
+        self.cmd.config.staging.return_value = 'symlink'
+        self.assertEqual(self.cmd.staging_mode(), 'copy')
+
+        self.env.argument.option.side_effect = lambda opt: opt == '--debug'
+        self.assertEqual(self.cmd.staging_mode(), 'symlink')
+
+        self.cmd.config.staging.return_value = 'invalid'
+        with self.assertRaises(GoogkitError):
+            self.cmd.staging_mode()
+
     def test_debug_arguments(self):
         expected = BuildCommand.BuilderArguments()
         expected.builder_arg('--root',
@@ -164,50 +212,528 @@ DUMMY
 
 
     def test_build_production(self):
-        self.cmd.setup_files = mock.MagicMock()
         self.cmd.production_arguments = mock.MagicMock()
-        self.cmd.production_arguments.return_value = ['ARG']
+        self.cmd.production_arguments.return_value = self.stub_arguments()
+        self.cmd.cache_key = mock.MagicMock(return_value=None)
 
-        MockPopen = mock.MagicMock()
-        mock_popen = MockPopen.return_value
-        # It simulates the command was succeeded
-        mock_popen.returncode = 0
+        self.cmd.compiler_arguments = mock.MagicMock(return_value=['--js=dummy.js'])
 
-        with mock.patch('subprocess.Popen', new=MockPopen):
-            self.cmd.build_production(StubConfig.PROJECT_DIR, False)
+        with mock.patch('googkit.lib.process.run', return_value=(0, 'WARNING')) as mock_run, \
+                mock.patch('googkit.lib.file.which', return_value='java'):
+            log = self.cmd.build_production('dummy.html', StubConfig.PROJECT_DIR)
 
-        self.cmd.setup_files.assert_called_once_with(StubConfig.PRODUCTION_DIR, False)
-        MockPopen.assert_called_once_with(
-            ['python', StubConfig.CLOSUREBUILDER, 'ARG'],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE)
+        self.assertEqual(log, 'WARNING')
+        mock_run.assert_called_once_with(
+            ['java', '-jar', StubConfig.COMPILER, '--js=dummy.js'], 'dummy')
 
     def test_build_debug(self):
-        self.cmd.setup_files = mock.MagicMock()
         self.cmd.debug_arguments = mock.MagicMock()
-        self.cmd.debug_arguments.return_value = ['ARG']
+        self.cmd.debug_arguments.return_value = self.stub_arguments()
+        self.cmd.cache_key = mock.MagicMock(return_value=None)
         self.cmd.compiled_js_path = mock.MagicMock()
         self.cmd.compiled_js_path.return_value = 'dummy.JS'
         self.cmd.modify_source_map = mock.MagicMock()
 
-        MockPopen = mock.MagicMock()
-        mock_popen = MockPopen.return_value
-        # It simulates the command was succeeded
-        mock_popen.returncode = 0
+        self.cmd.compiler_arguments = mock.MagicMock(return_value=['--js=dummy.js'])
 
-        with mock.patch('subprocess.Popen', new=MockPopen):
-            self.cmd.build_debug('dummy.html', StubConfig.PROJECT_DIR, False)
+        with mock.patch('googkit.lib.process.run', return_value=(0, 'WARNING')) as mock_run, \
+                mock.patch('googkit.lib.file.which', return_value='java'):
+            log = self.cmd.build_debug('dummy.html', StubConfig.PROJECT_DIR)
 
-        self.cmd.setup_files.assert_called_once_with(StubConfig.DEBUG_DIR, False)
-        MockPopen.assert_called_once_with(
-            ['python', StubConfig.CLOSUREBUILDER, 'ARG'],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE)
+        self.assertEqual(log, 'WARNING')
+        mock_run.assert_called_once_with(
+            ['java', '-jar', StubConfig.COMPILER, '--js=dummy.js'], 'dummy')
 
         self.cmd.modify_source_map.assert_called_once_with(
             'dummy.JS.map',
             StubConfig.PROJECT_DIR)
 
+    def test_build_failed(self):
+        self.cmd.production_arguments = mock.MagicMock()
+        self.cmd.production_arguments.return_value = self.stub_arguments()
+        self.cmd.cache_key = mock.MagicMock(return_value=None)
+
+        self.cmd.compiler_arguments = mock.MagicMock(return_value=[])
+
+        with mock.patch('googkit.lib.process.run', return_value=(1, 'ERROR')), \
+                mock.patch('googkit.lib.file.which', return_value='java'):
+            with self.assertRaises(GoogkitError):
+                self.cmd.build_production('dummy.html', StubConfig.PROJECT_DIR)
+
+    def test_build_with_cache_hit(self):
+        self.cmd.cache_key = mock.MagicMock(return_value='KEY')
+
+        with mock.patch('googkit.commands.build.CompileCache') as MockCache, \
+                mock.patch('subprocess.Popen') as MockPopen:
+            MockCache.return_value.restore.return_value = 'CACHED WARNING'
+            log = self.cmd._build(self.stub_arguments(), StubConfig.PROJECT_DIR)
+
+        self.assertEqual(log, 'CACHED WARNING')
+        MockCache.return_value.restore.assert_called_once_with('KEY', ['dummy.JS'])
+        self.assertFalse(MockPopen.called)
+
+    def test_build_with_cache_miss(self):
+        self.cmd.cache_key = mock.MagicMock(return_value='KEY')
+        self.cmd.compiler_arguments = mock.MagicMock(return_value=[])
+
+        with mock.patch('googkit.commands.build.CompileCache') as MockCache, \
+                mock.patch('googkit.lib.process.run', return_value=(0, 'WARNING')), \
+                mock.patch('googkit.lib.file.which', return_value='java'):
+            MockCache.return_value.restore.return_value = None
+            log = self.cmd._build(self.stub_arguments(), StubConfig.PROJECT_DIR)
+
+        self.assertEqual(log, 'WARNING')
+        MockCache.return_value.store.assert_called_once_with('KEY', ['dummy.JS'], 'WARNING')
+
+    def test_build_with_no_cache_opt(self):
+        self.cmd.cache_key = mock.MagicMock(return_value='KEY')
+        self.env.argument.option.side_effect = lambda opt: opt == '--no-cache'
+        self.cmd.compiler_arguments = mock.MagicMock(return_value=[])
+
+        with mock.patch('googkit.commands.build.CompileCache') as MockCache, \
+                mock.patch('googkit.lib.process.run', return_value=(0, '')), \
+                mock.patch('googkit.lib.file.which', return_value='java'):
+            self.cmd._build(self.stub_arguments(), StubConfig.PROJECT_DIR)
+
+        self.assertFalse(self.cmd.cache_key.called)
+        self.assertFalse(MockCache.called)
+
+    def test_build_on_compiler_server(self):
+        args = self.stub_arguments()
+        self.cmd.cache_key = mock.MagicMock(return_value=None)
+        self.cmd.compiler_server = mock.MagicMock()
+        self.cmd.compiler_server.compile.return_value = (0, 'WARNING')
+        self.cmd.compiler_arguments = mock.MagicMock(return_value=['--js=a.js'])
+
+        with mock.patch('subprocess.Popen') as MockPopen:
+            log = self.cmd._build(args, StubConfig.PROJECT_DIR)
+
+        self.assertEqual(log, 'WARNING')
+        self.cmd.compiler_arguments.assert_called_once_with(args)
+        self.cmd.compiler_server.compile.assert_called_once_with(['--js=a.js'], mock.ANY)
+        self.assertFalse(MockPopen.called)
+
+    def test_build_on_compiler_server_failed(self):
+        self.cmd.cache_key = mock.MagicMock(return_value=None)
+        self.cmd.compiler_server = mock.MagicMock()
+        self.cmd.compiler_server.compile.return_value = (1, 'ERROR')
+        self.cmd.compiler_arguments = mock.MagicMock(return_value=[])
+
+        with self.assertRaises(GoogkitError):
+            self.cmd._build(self.stub_arguments(), StubConfig.PROJECT_DIR)
+
+    def test_compiler_arguments(self):
+        args = BuildCommand.BuilderArguments()
+        args.builder_arg('--root', 'lib')
+        args.builder_arg('--root', 'js_dev')
+        args.builder_arg('--namespace', 'googkit_index')
+        args.builder_arg('--output_file', 'index.min.js')
+        args.compiler_arg('--compilation_level', 'ADVANCED')
+
+        self.cmd._deps_graph = mock.MagicMock()
+        self.cmd._deps_graph.return_value.sources_for.return_value = ['base.js', 'index.js']
+
+        self.assertEqual(self.cmd.compiler_arguments(args), [
+            '--js=base.js',
+            '--js=index.js',
+            '--js_output_file=index.min.js',
+            '--compilation_level=ADVANCED'])
+        self.cmd._deps_graph.assert_called_once_with(('lib', 'js_dev'))
+        self.cmd._deps_graph.return_value.sources_for.assert_called_once_with('googkit_index')
+
+    def test_cache_key(self):
+        args = self.stub_arguments()
+        self.cmd._deps_graph = mock.MagicMock()
+        self.cmd._deps_graph.return_value.sources_for.return_value = ['a.js', 'b.js']
+        self.cmd._file_digest = mock.MagicMock(side_effect=lambda path: 'DIGEST ' + path)
+
+        key1 = self.cmd.cache_key(args)
+        self.cmd._file_digest.side_effect = lambda path: 'CHANGED ' + path
+        key2 = self.cmd.cache_key(args)
+
+        self.assertIsNotNone(key1)
+        self.assertNotEqual(key1, key2)
+
+    def test_file_digest(self):
+        hashing = threading.Event()
+        hashed = threading.Event()
+
+        def digest(path):
+            if path == 'a.js':
+                hashing.set()
+                hashed.wait(5)
+            return 'DIGEST ' + path
+
+        with mock.patch('googkit.lib.file.digest', side_effect=digest) as mock_digest:
+            thread = threading.Thread(target=self.cmd._file_digest, args=('a.js',))
+            thread.start()
+            hashing.wait(5)
+
+            # Other files should be hashed while a.js is being hashed
+            self.assertEqual(self.cmd._file_digest('b.js'), 'DIGEST b.js')
+            self.assertTrue(thread.is_alive())
+
+            hashed.set()
+            thread.join()
+
+            # Digests should be computed only once per file
+            self.assertEqual(self.cmd._file_digest('a.js'), 'DIGEST a.js')
+            self.assertEqual(mock_digest.call_count, 2)
+
+    def test_cache_key_with_unresolved_namespace(self):
+        self.cmd._deps_graph = mock.MagicMock()
+        self.cmd._deps_graph.return_value.sources_for.side_effect = GoogkitError('NOT FOUND')
+
+        self.assertIsNone(self.cmd.cache_key(self.stub_arguments()))
+
+    def test_build_all(self):
+        self.cmd.build_production = mock.MagicMock()
+        self.env.argument = mock.MagicMock()
+        self.env.argument.option.side_effect = lambda opt: '2' if opt == '--jobs' else None
+
+        self.cmd.build_all(['foo.html', 'bar.html'], StubConfig.PROJECT_DIR)
+
+        self.cmd.build_production.assert_any_call('foo.html', StubConfig.PROJECT_DIR)
+        self.cmd.build_production.assert_any_call('bar.html', StubConfig.PROJECT_DIR)
+        self.assertEqual(self.cmd.build_production.call_count, 2)
+
+    def test_build_all_with_errors(self):
+        def build_production(html_path, project_root):
+            if html_path != 'ok.html':
+                raise GoogkitError('ERROR ' + html_path)
+            return ''
+
+        self.cmd.build_production = mock.MagicMock(side_effect=build_production)
+        self.env.argument = mock.MagicMock()
+        self.env.argument.option.side_effect = lambda opt: '3' if opt == '--jobs' else None
+
+        with self.assertRaises(GoogkitError) as cm:
+            self.cmd.build_all(['b.html', 'ok.html', 'a.html'], StubConfig.PROJECT_DIR)
+
+        # Errors should be reported in the order of the HTMLs
+        self.assertEqual(
+            str(cm.exception),
+            'b.html: ERROR b.html\na.html: ERROR a.html')
+        self.assertEqual(self.cmd.build_production.call_count, 3)
+
+    def test_affected_pages(self):
+        graph = DepsGraph()
+        graph.add(Source('base.js', [], [], is_base=True))
+        graph.add(Source('shared.js', ['shared'], []))
+        graph.add(Source('foo.js', ['googkit_foo'], ['shared']))
+        graph.add(Source('bar.js', ['googkit_bar'], []))
+
+        html_list = ['foo.html', 'bar.html', 'unknown.html']
+
+        self.assertEqual(
+            self.cmd.affected_pages(graph, html_list, set(['shared.js'])),
+            set(['foo.html', 'unknown.html']))
+        self.assertEqual(
+            self.cmd.affected_pages(graph, html_list, set(['base.js'])),
+            set(html_list))
+
+    def test_rebuild(self):
+        foo_js = os.path.join(StubConfig.JS_DEV_DIR, 'foo.js')
+        bar_js = os.path.join(StubConfig.JS_DEV_DIR, 'bar.js')
+        foo_html = os.path.join(StubConfig.DEVELOPMENT_DIR, 'foo.html')
+        bar_html = os.path.join(StubConfig.DEVELOPMENT_DIR, 'bar.html')
+        style_css = os.path.join(StubConfig.DEVELOPMENT_DIR, 'style.css')
+
+        graph = DepsGraph()
+        graph.add(Source(foo_js, ['googkit_foo'], []))
+        graph.add(Source(bar_js, ['googkit_bar'], []))
+        graph.update = mock.MagicMock()
+
+        self.cmd._deps_graph = mock.MagicMock(return_value=graph)
+        self.cmd._digests = {foo_js: 'DIGEST'}
+        self.cmd.html_requiring_js = mock.MagicMock(return_value=[foo_html, bar_html])
+        self.cmd.update_file = mock.MagicMock()
+        self.cmd.build_all = mock.MagicMock()
+
+        self.cmd.rebuild(set([foo_js, style_css]), StubConfig.PRODUCTION_DIR, StubConfig.PROJECT_DIR)
+
+        graph.update.assert_called_once_with(foo_js)
+        self.assertEqual(self.cmd._digests, {})
+        self.cmd.update_file.assert_called_once_with(style_css, StubConfig.PRODUCTION_DIR)
+        self.cmd.build_all.assert_called_once_with([foo_html], StubConfig.PROJECT_DIR)
+
+    def test_rebuild_static_files(self):
+        style_css = os.path.join(StubConfig.DEVELOPMENT_DIR, 'style.css')
+
+        self.cmd._deps_graph = mock.MagicMock()
+        self.cmd.html_requiring_js = mock.MagicMock(return_value=[])
+        self.cmd.update_file = mock.MagicMock()
+        self.cmd.build_all = mock.MagicMock()
+
+        self.cmd.rebuild(set([style_css]), StubConfig.PRODUCTION_DIR, StubConfig.PROJECT_DIR)
+
+        self.cmd.update_file.assert_called_once_with(style_css, StubConfig.PRODUCTION_DIR)
+        self.assertFalse(self.cmd.build_all.called)
+
+    def test_rebuild_with_gzip(self):
+        style_css = os.path.join(StubConfig.DEVELOPMENT_DIR, 'style.css')
+
+        self.cmd._deps_graph = mock.MagicMock()
+        self.cmd.html_requiring_js = mock.MagicMock(return_value=[])
+        self.cmd.update_file = mock.MagicMock()
+        self.cmd.compress_files = mock.MagicMock()
+        self.cmd.config.gzip = mock.MagicMock(return_value=True)
+
+        self.cmd.rebuild(set([style_css]), StubConfig.PRODUCTION_DIR, StubConfig.PROJECT_DIR)
+
+        # Updated files should be compressed again
+        self.cmd.compress_files.assert_called_once_with(StubConfig.PRODUCTION_DIR)
+
+    def test_update_file(self):
+        style_css = os.path.join(StubConfig.DEVELOPMENT_DIR, 'css', 'style.css')
+        target_path = os.path.join(StubConfig.PRODUCTION_DIR, 'css', 'style.css')
+
+        with mock.patch('os.path.exists', return_value=True), \
+                mock.patch('googkit.lib.file.stage') as mock_stage:
+            self.cmd.update_file(style_css, StubConfig.PRODUCTION_DIR)
+
+        mock_stage.assert_called_once_with(style_css, target_path, mode='copy')
+
+    def test_update_file_compressed(self):
+        style_css = os.path.join(StubConfig.DEVELOPMENT_DIR, 'css', 'style.css')
+        target_path = os.path.join(StubConfig.PRODUCTION_DIR, 'css', 'style.css')
+
+        with mock.patch('os.path.exists', return_value=True), \
+                mock.patch('os.path.lexists', return_value=True), \
+                mock.patch('os.remove') as mock_remove, \
+                mock.patch('googkit.lib.file.stage'):
+            self.cmd.update_file(style_css, StubConfig.PRODUCTION_DIR)
+
+        # The stale compressed file should be removed
+        mock_remove.assert_called_once_with(target_path + '.gz')
+
+    def test_update_file_in_deleted_dir(self):
+        style_css = os.path.join(StubConfig.DEVELOPMENT_DIR, 'css', 'style.css')
+
+        with mock.patch('os.path.exists', return_value=False), \
+                mock.patch('os.path.lexists', return_value=False), \
+                mock.patch('os.path.isdir', return_value=False), \
+                mock.patch('googkit.lib.file.remove_empty_dirs') as mock_remove_empty_dirs:
+            self.cmd.update_file(style_css, StubConfig.PRODUCTION_DIR)
+
+        # Directories left empty should be removed up to the target directory
+        mock_remove_empty_dirs.assert_called_once_with(
+            os.path.join(StubConfig.PRODUCTION_DIR, 'css'), StubConfig.PRODUCTION_DIR)
+
+    def test_update_file_deleted(self):
+        foo_html = os.path.join(StubConfig.DEVELOPMENT_DIR, 'foo.html')
+
+        with mock.patch('os.path.exists', return_value=False), \
+                mock.patch('os.path.lexists', return_value=True), \
+                mock.patch('os.remove') as mock_remove:
+            self.cmd.update_file(foo_html, StubConfig.PRODUCTION_DIR)
+
+        mock_remove.assert_any_call(os.path.join(StubConfig.PRODUCTION_DIR, 'foo.html'))
+        mock_remove.assert_any_call(os.path.join(StubConfig.PRODUCTION_DIR, 'foo.JS'))
+        mock_remove.assert_any_call(os.path.join(StubConfig.PRODUCTION_DIR, 'foo.JS.map'))
+        mock_remove.assert_any_call(os.path.join(StubConfig.PRODUCTION_DIR, 'foo.html.gz'))
+        mock_remove.assert_any_call(os.path.join(StubConfig.PRODUCTION_DIR, 'foo.JS.gz'))
+
+    def test_watch(self):
+        watcher = mock.MagicMock()
+        watcher.wait.side_effect = [set(['a.js']), KeyboardInterrupt()]
+        self.cmd.rebuild = mock.MagicMock()
+
+        with mock.patch('googkit.lib.watch.watcher', return_value=watcher):
+            self.cmd.watch(StubConfig.DEBUG_DIR, StubConfig.PROJECT_DIR)
+
+        self.cmd.rebuild.assert_called_once_with(
+            set(['a.js']), StubConfig.DEBUG_DIR, StubConfig.PROJECT_DIR)
+        watcher.close.assert_called_once_with()
+
+    def test_is_build_output(self):
+        self.assertTrue(self.cmd.is_build_output('foo/bar.JS'))
+        self.assertTrue(self.cmd.is_build_output('foo/bar.JS.map'))
+        self.assertTrue(self.cmd.is_build_output('foo/bar.css.gz'))
+        self.assertTrue(self.cmd.is_build_output('foo/asset-manifest.json'))
+        self.assertFalse(self.cmd.is_build_output('foo/bar.tar.gz'))
+        self.assertFalse(self.cmd.is_build_output('foo/bar.css'))
+
+    def test_hash_compiled_file(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            compiled_js_path = os.path.join(tmp_dir, 'index.JS')
+            with open(compiled_js_path, 'w') as f:
+                f.write('alert(1);\n//# sourceMappingURL=index.JS.map')
+            with open(compiled_js_path + '.map', 'w') as f:
+                f.write('{"file": "index.JS"}')
+
+            hashed_path = self.cmd.hash_compiled_file(compiled_js_path)
+
+            self.assertIsNotNone(re.match(r'^index\.[0-9a-f]{8}\.JS$', os.path.basename(hashed_path)))
+            self.assertFalse(os.path.exists(compiled_js_path))
+            self.assertFalse(os.path.exists(compiled_js_path + '.map'))
+
+            with open(hashed_path) as f:
+                self.assertTrue(f.read().endswith(
+                    'sourceMappingURL=' + os.path.basename(hashed_path) + '.map'))
+            with open(hashed_path + '.map') as f:
+                self.assertEqual(json.load(f)['file'], os.path.basename(hashed_path))
+
+            self.assertEqual(self.cmd.compiled_js_paths(os.path.join(tmp_dir, 'index.html')), [hashed_path])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_write_manifest(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            manifest_path = os.path.join(tmp_dir, BuildCommand.MANIFEST_FILE)
+            old_path = os.path.join(tmp_dir, 'index.old.JS')
+            with open(old_path, 'w') as f:
+                f.write('')
+            with open(manifest_path, 'w') as f:
+                json.dump({'index.JS': 'index.old.JS'}, f)
+
+            self.cmd._hashed_paths = {
+                os.path.join(tmp_dir, 'index.JS'): os.path.join(tmp_dir, 'index.new.JS')}
+            self.cmd.write_manifest(tmp_dir)
+
+            with open(manifest_path) as f:
+                self.assertEqual(json.load(f), {'index.JS': 'index.new.JS'})
+
+            # Unused hashed scripts should be removed
+            self.assertFalse(os.path.exists(old_path))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_remove_manifest(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            manifest_path = os.path.join(tmp_dir, BuildCommand.MANIFEST_FILE)
+            hashed_path = os.path.join(tmp_dir, 'index.hash.JS')
+            for path in (hashed_path, hashed_path + '.map'):
+                with open(path, 'w') as f:
+                    f.write('')
+            with open(manifest_path, 'w') as f:
+                json.dump({'index.JS': 'index.hash.JS'}, f)
+
+            self.cmd.remove_manifest(tmp_dir)
+
+            # Hashed scripts should be removed with the manifest
+            self.assertFalse(os.path.exists(manifest_path))
+            self.assertFalse(os.path.exists(hashed_path))
+            self.assertFalse(os.path.exists(hashed_path + '.map'))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_run_internal_with_hash(self):
+        self.cmd.setup_files = mock.MagicMock()
+        self.cmd.stage_files = mock.MagicMock()
+        self.cmd.compile_resources = mock.MagicMock()
+        self.cmd.write_manifest = mock.MagicMock()
+        self.cmd.build_all = mock.MagicMock()
+        self.cmd.html_requiring_js = mock.MagicMock(return_value=[])
+        self.cmd.config.hash_compiled_js = mock.MagicMock(return_value=True)
+
+        with mock.patch('googkit.lib.path.project_root', return_value=StubConfig.PROJECT_DIR), \
+                mock.patch('googkit.commands.build.working_directory'):
+            self.cmd.run_internal()
+
+        # HTMLs should be converted after compiling
+        self.assertFalse(self.cmd.setup_files.called)
+        self.cmd.stage_files.assert_called_once_with(StubConfig.PRODUCTION_DIR)
+        self.cmd.write_manifest.assert_called_once_with(StubConfig.PRODUCTION_DIR)
+        self.cmd.compile_resources.assert_called_once_with(StubConfig.PRODUCTION_DIR)
+
+    def test_run_internal_without_hash(self):
+        self.cmd.setup_files = mock.MagicMock()
+        self.cmd.write_manifest = mock.MagicMock()
+        self.cmd.remove_manifest = mock.MagicMock()
+        self.cmd.build_all = mock.MagicMock()
+        self.cmd.html_requiring_js = mock.MagicMock(return_value=[])
+        self.cmd.config.hash_compiled_js = mock.MagicMock(return_value=False)
+
+        with mock.patch('googkit.lib.path.project_root', return_value=StubConfig.PROJECT_DIR), \
+                mock.patch('googkit.commands.build.working_directory'):
+            self.cmd.run_internal()
+
+        # Hashed scripts of previous builds should be removed
+        self.assertFalse(self.cmd.write_manifest.called)
+        self.cmd.remove_manifest.assert_called_once_with(StubConfig.PRODUCTION_DIR)
+
+    def test_evict_cache(self):
+        self.cmd.compile_cache = mock.MagicMock()
+        self.cmd.config.cache_max_size = mock.MagicMock(return_value=2)
+
+        self.cmd.evict_cache()
+
+        self.cmd.compile_cache.evict.assert_called_once_with(2 * 1024 * 1024)
+
+    def test_evict_cache_without_limit(self):
+        self.cmd.compile_cache = mock.MagicMock()
+
+        self.cmd.evict_cache()
+
+        self.assertFalse(self.cmd.compile_cache.evict.called)
+
+    def test_evict_cache_with_no_cache_opt(self):
+        self.cmd.compile_cache = mock.MagicMock()
+        self.cmd.config.cache_max_size = mock.MagicMock(return_value=2)
+        self.env.argument.option.side_effect = lambda opt: opt == '--no-cache'
+
+        with mock.patch('logging.info') as mock_info:
+            self.cmd.evict_cache()
+
+        # The unused cache should not be evicted nor reported
+        self.assertFalse(self.cmd.compile_cache.evict.called)
+        self.assertFalse(mock_info.called)
+
+    def test_compress_files(self):
+        results = [
+            googkit.lib.compress.CompressResult('a.js', 100, 20),
+            googkit.lib.compress.CompressResult('b.css', 100, 30, skipped=True)]
+
+        with mock.patch('googkit.lib.compress.gzip_all', return_value=results) as mock_gzip_all:
+            self.cmd.compress_files(StubConfig.PRODUCTION_DIR)
+
+        mock_gzip_all.assert_called_once_with(
+            StubConfig.PRODUCTION_DIR,
+            BuildCommand.COMPRESSIBLE_EXT,
+            StubConfig.GZIP_LEVEL,
+            mock.ANY)
+
+    def test_compress_files_with_invalid_level(self):
+        self.cmd.config.gzip_level = mock.MagicMock(return_value=10)
+
+        with self.assertRaises(GoogkitError):
+            self.cmd.compress_files(StubConfig.PRODUCTION_DIR)
+
+    def test_run_internal_with_gzip(self):
+        self.cmd.setup_files = mock.MagicMock()
+        self.cmd.build_all = mock.MagicMock()
+        self.cmd.compress_files = mock.MagicMock()
+        self.cmd.remove_compressed_files = mock.MagicMock()
+        self.cmd.html_requiring_js = mock.MagicMock(return_value=[])
+        self.cmd.config.gzip = mock.MagicMock(return_value=True)
+
+        with mock.patch('googkit.lib.path.project_root', return_value=StubConfig.PROJECT_DIR), \
+                mock.patch('googkit.commands.build.working_directory'):
+            self.cmd.run_internal()
+
+        self.cmd.compress_files.assert_called_once_with(StubConfig.PRODUCTION_DIR)
+
+        # Debug resources should not be compressed
+        self.cmd.compress_files.reset_mock()
+        self.env.argument.option.side_effect = lambda opt: opt == '--debug'
+
+        with mock.patch('googkit.lib.path.project_root', return_value=StubConfig.PROJECT_DIR), \
+                mock.patch('googkit.commands.build.working_directory'):
+            self.cmd.run_internal()
+
+        self.assertFalse(self.cmd.compress_files.called)
+        self.cmd.remove_compressed_files.assert_called_once_with(StubConfig.DEBUG_DIR)
+
+    def test_remove_compressed_files(self):
+        with mock.patch('googkit.lib.compress.remove_all', return_value=['a.js.gz']) as mock_remove_all:
+            self.cmd.remove_compressed_files(StubConfig.PRODUCTION_DIR)
+
+        mock_remove_all.assert_called_once_with(StubConfig.PRODUCTION_DIR, BuildCommand.COMPRESSIBLE_EXT)
+
     def test_modify_source_map(self):
         # Data will be given by open()
         stub_source_map = {
@@ -235,8 +761,8 @@ DUMMY
         self.assertEqual(mock_json.dump.call_count, 1)
 
     def test_run_internal(self):
-        self.cmd.build_debug = mock.MagicMock()
-        self.cmd.build_production = mock.MagicMock()
+        self.cmd.setup_files = mock.MagicMock()
+        self.cmd.build_all = mock.MagicMock()
         self.cmd.html_requiring_js = mock.MagicMock()
         self.cmd.html_requiring_js.side_effect = lambda: ['dummy.html']
         self.env.argument = mock.MagicMock()
@@ -248,12 +774,181 @@ DUMMY
 
             self.cmd.run_internal()
 
-        self.cmd.build_production.assert_called_once_with(
-            'dummy.html', dummy_project_root, False)
+        self.cmd.setup_files.assert_called_once_with(StubConfig.PRODUCTION_DIR)
+        self.cmd.build_all.assert_called_once_with(
+            ['dummy.html'], dummy_project_root)
+
+    def test_run_internal_with_compiler_server_opt(self):
+        self.cmd.setup_files = mock.MagicMock()
+        self.cmd.build_all = mock.MagicMock()
+        self.cmd.html_requiring_js = mock.MagicMock(return_value=[])
+        self.env.argument.option.side_effect = lambda opt: {'--compiler-server': True, '--jobs': '4'}.get(opt)
+
+        with mock.patch('googkit.lib.path.project_root'), \
+                mock.patch('googkit.commands.build.working_directory'), \
+                mock.patch('googkit.commands.build.CompilerServer') as MockServer:
+            self.cmd.run_internal()
+
+        # Each job should have its own worker
+        MockServer.assert_called_once_with(StubConfig.COMPILER, 4)
+        MockServer.return_value.stop.assert_called_once_with()
+
+    def test_modules(self):
+        graph = DepsGraph()
+        graph.add(Source('base.js', [], [], is_base=True))
+        graph.add(Source('shared.js', ['shared'], []))
+        graph.add(Source('foo.js', ['googkit_foo'], ['shared', 'foo_only']))
+        graph.add(Source('foo_only.js', ['foo_only'], []))
+        graph.add(Source('bar.js', ['googkit_bar'], ['shared']))
+
+        modules = self.cmd.modules(graph, ['foo.html', 'bar.html'])
+
+        self.assertEqual(modules, [
+            ('googkit_common', ['base.js', 'shared.js'], []),
+            ('googkit_foo', ['foo_only.js', 'foo.js'], ['googkit_common']),
+            ('googkit_bar', ['bar.js'], ['googkit_common'])])
+
+    def test_single_pass_arguments(self):
+        modules = [
+            ('googkit_common', ['base.js', 'shared.js'], []),
+            ('googkit_foo', ['foo.js'], ['googkit_common'])]
+        output_dir = os.path.join(os.sep, 'tmp', 'out')
+
+        with mock.patch('os.path.exists', return_value=False):
+            args = self.cmd.single_pass_arguments(modules, output_dir, {})
+
+        self.assertEqual(args, [
+            '--js=base.js',
+            '--js=shared.js',
+            '--js=foo.js',
+            '--module=googkit_common:2',
+            '--module=googkit_foo:1:googkit_common',
+            '--module_output_path_prefix=' + os.path.join(output_dir, ''),
+            '--compilation_level=COMPILATION_LEVEL',
+            '--define=goog.DEBUG=false'])
+
+    def test_module_js_paths(self):
+        html_path = os.path.join(StubConfig.DEVELOPMENT_DIR, 'index.html')
+
+        self.assertEqual(self.cmd.module_js_paths([html_path]), {
+            'googkit_common': os.path.join(StubConfig.PRODUCTION_DIR, 'googkit_common.JS'),
+            'googkit_index': os.path.join(StubConfig.PRODUCTION_DIR, 'index.JS')})
+
+    def test_build_single_pass(self):
+        modules = [('googkit_common', ['base.js'], []), ('googkit_index', ['index.js'], [])]
+        self.cmd._deps_graph = mock.MagicMock()
+        self.cmd.modules = mock.MagicMock(return_value=modules)
+        self.cmd.module_js_paths = mock.MagicMock(return_value={
+            'googkit_common': 'common.min.js',
+            'googkit_index': 'index.min.js'})
+        self.cmd._compile = mock.MagicMock(return_value='')
+
+        with mock.patch('tempfile.mkdtemp', return_value='TMP'), \
+                mock.patch('shutil.rmtree'), \
+                mock.patch('shutil.move') as mock_move, \
+                mock.patch('os.path.exists', return_value=False):
+            self.cmd.build_single_pass(['index.html'], StubConfig.PROJECT_DIR)
+
+        self.assertEqual(self.cmd._compile.call_count, 1)
+        mock_move.assert_any_call(os.path.join('TMP', 'googkit_common.js'), 'common.min.js')
+        mock_move.assert_any_call(os.path.join('TMP', 'googkit_index.js'), 'index.min.js')
+
+    def test_run_internal_with_single_pass_opt(self):
+        self.cmd.setup_files = mock.MagicMock()
+        self.cmd.build_all = mock.MagicMock()
+        self.cmd.build_single_pass = mock.MagicMock()
+        self.cmd.html_requiring_js = mock.MagicMock(return_value=['dummy.html'])
+        self.env.argument.option.side_effect = lambda opt: opt == '--single-pass'
+
+        with mock.patch('googkit.lib.path.project_root', return_value=StubConfig.PROJECT_DIR), \
+                mock.patch('googkit.commands.build.working_directory'):
+            self.cmd.run_internal()
+
+        self.cmd.build_single_pass.assert_called_once_with(['dummy.html'], StubConfig.PROJECT_DIR)
+        self.assertFalse(self.cmd.build_all.called)
+
+    def test_run_internal_with_watch_opt(self):
+        self.cmd.setup_files = mock.MagicMock()
+        self.cmd.build_all = mock.MagicMock()
+        self.cmd.watch = mock.MagicMock()
+        self.cmd.html_requiring_js = mock.MagicMock(return_value=['dummy.html'])
+        self.env.argument.option.side_effect = lambda opt: opt == '--watch'
+
+        with mock.patch('googkit.lib.path.project_root', return_value=StubConfig.PROJECT_DIR), \
+                mock.patch('googkit.commands.build.working_directory'):
+            self.cmd.run_internal()
+
+        self.cmd.build_all.assert_called_once_with(['dummy.html'], StubConfig.PROJECT_DIR)
+        self.cmd.watch.assert_called_once_with(StubConfig.PRODUCTION_DIR, StubConfig.PROJECT_DIR)
+
+    def test_run_internal_with_clean_opt(self):
+        self.cmd.setup_files = mock.MagicMock()
+        self.cmd.build_all = mock.MagicMock()
+        self.cmd.html_requiring_js = mock.MagicMock(return_value=[])
+        self.cmd.finish_clean_build = mock.MagicMock()
+        self.env.argument.option.side_effect = lambda opt: opt == '--clean'
+        staging_dir = googkit.lib.path.staging_dir(StubConfig.PRODUCTION_DIR)
+
+        with mock.patch('googkit.lib.path.project_root', return_value=StubConfig.PROJECT_DIR), \
+                mock.patch('googkit.commands.build.working_directory'), \
+                mock.patch('os.path.exists', return_value=False):
+            self.cmd.run_internal()
+
+        # Outputs should be written to the staging directory
+        self.cmd.setup_files.assert_called_once_with(staging_dir)
+        self.cmd.finish_clean_build.assert_called_once_with(StubConfig.PRODUCTION_DIR)
+
+    def test_run_internal_with_clean_opt_failed(self):
+        self.cmd.setup_files = mock.MagicMock()
+        self.cmd.build_all = mock.MagicMock(side_effect=GoogkitError('ERROR'))
+        self.cmd.html_requiring_js = mock.MagicMock(return_value=[])
+        self.cmd.finish_clean_build = mock.MagicMock()
+        self.env.argument.option.side_effect = lambda opt: opt == '--clean'
+        staging_dir = googkit.lib.path.staging_dir(StubConfig.PRODUCTION_DIR)
+
+        with mock.patch('googkit.lib.path.project_root', return_value=StubConfig.PROJECT_DIR), \
+                mock.patch('googkit.commands.build.working_directory'), \
+                mock.patch('os.path.exists', return_value=False), \
+                mock.patch('shutil.rmtree') as mock_rmtree:
+            with self.assertRaises(GoogkitError):
+                self.cmd.run_internal()
+
+        # The target directory should be left untouched
+        self.assertFalse(self.cmd.finish_clean_build.called)
+        mock_rmtree.assert_called_once_with(staging_dir, ignore_errors=True)
+        self.assertEqual(self.cmd.output_dir(), StubConfig.PRODUCTION_DIR)
+
+    def test_finish_clean_build(self):
+        root = tempfile.mkdtemp()
+        try:
+            target_dir = os.path.join(root, 'production')
+            os.mkdir(target_dir)
+            with open(os.path.join(target_dir, 'old.html'), 'w') as f:
+                f.write('OLD')
+
+            staging_dir = self.cmd.begin_clean_build(target_dir)
+            os.mkdir(staging_dir)
+            with open(os.path.join(staging_dir, 'index.html'), 'w') as f:
+                f.write('NEW')
+            self.cmd._hashed_paths = {
+                os.path.join(staging_dir, 'index_compiled.js'):
+                os.path.join(staging_dir, 'index_compiled.0123abcd.js')}
+
+            thread = self.cmd.finish_clean_build(target_dir)
+            thread.join()
+
+            self.assertEqual(os.listdir(target_dir), ['index.html'])
+            self.assertFalse(os.path.exists(staging_dir))
+            self.assertEqual(self.cmd.output_dir(), StubConfig.PRODUCTION_DIR)
+            self.assertEqual(self.cmd._hashed_paths, {
+                os.path.join(target_dir, 'index_compiled.js'):
+                os.path.join(target_dir, 'index_compiled.0123abcd.js')})
+        finally:
+            shutil.rmtree(root)
 
     def test_run_internal_with_debug_opt(self):
-        self.cmd.build_debug = mock.MagicMock()
-        self.cmd.build_production = mock.MagicMock()
+        self.cmd.setup_files = mock.MagicMock()
+        self.cmd.build_all = mock.MagicMock()
         self.cmd.html_requiring_js = mock.MagicMock()
         self.cmd.html_requiring_js.side_effect = lambda: ['dummy.html']
         self.env.argument = mock.MagicMock()
@@ -265,7 +960,9 @@ DUMMY
 
             self.cmd.run_internal()
 
-        self.cmd.build_debug.assert_called_once_with('dummy.html', dummy_project_root, False)
+        self.cmd.setup_files.assert_called_once_with(StubConfig.DEBUG_DIR)
+        self.cmd.build_all.assert_called_once_with(
+            ['dummy.html'], dummy_project_root)
 
 
 def load_tests(loader, tests, ignore):
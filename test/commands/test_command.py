@@ -1,3 +1,4 @@
+import os
 import unittest
 
 from test.stub_environment import StubEnvironment
@@ -27,6 +28,45 @@ class TestCommand(unittest.TestCase):
         self.assertTrue(cmd._setup.called)
         self.assertTrue(cmd.run_internal.called)
 
+    def test_run_with_profile_opt(self):
+        class DummyCommand(Command):
+            @classmethod
+            def supported_options(cls):
+                return set(['--profile'])
+
+            def run_internal(self):
+                with self.profile('dummy_phase', 'dummy_target'):
+                    pass
+
+        env = StubEnvironment()
+        env.argument = ArgumentParser.parse(['googkit.py', 'dummy', '--profile=report.json'])
+        cmd = DummyCommand(env)
+        cmd._setup = mock.MagicMock()
+
+        with mock.patch('googkit.lib.profile.write_report') as mock_write_report:
+            cmd.run()
+
+        mock_write_report.assert_called_once_with(cmd.profiler, 'report.json', 'dummy')
+        records = cmd.profiler.records()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['phase'], 'dummy_phase')
+        self.assertEqual(records[0]['target'], 'dummy_target')
+
+    def test_write_profile_report_in_cache_dir(self):
+        env = StubEnvironment()
+        env.argument = ArgumentParser.parse(['googkit.py', 'dummy', '--profile'])
+        cmd = Command(env)
+        cmd.config = mock.MagicMock()
+        cmd.config.cache_dir.return_value = os.path.join('shared', 'cache')
+
+        with mock.patch('googkit.lib.path.project_root', return_value='project'), \
+                mock.patch('googkit.lib.profile.write_report') as mock_write_report:
+            cmd.write_profile_report()
+
+        # The report should follow the cache directory in the config
+        mock_write_report.assert_called_once_with(
+            cmd.profiler, os.path.join('project', 'shared', 'cache', 'profile.json'), 'dummy')
+
     def test_validate_options(self):
         class DummyCommand(Command):
             @classmethod
@@ -1,5 +1,5 @@
 import unittest
-import subprocess
+import logging
 import os.path
 from test.stub_environment import StubEnvironment
 from test.stub_config import StubConfigOnStubProject
@@ -17,12 +17,8 @@ class TestLintCommand(unittest.TestCase):
         self.assertTrue(LintCommand.needs_project_config())
 
     def test_lint(self):
-        MockPopen = mock.MagicMock()
-        mock_popen = MockPopen.return_value
         # It simulates the command was succeeded
-        mock_popen.returncode = 0
-
-        with mock.patch('subprocess.Popen', new=MockPopen), \
+        with mock.patch('googkit.lib.process.run', return_value=(0, '')) as mock_run, \
                 mock.patch('googkit.lib.file.which', return_value='/usr/local/bin/gjslint'):
             self.cmd.lint()
 
@@ -30,15 +26,15 @@ class TestLintCommand(unittest.TestCase):
             'gjslint',
             os.path.join(StubConfigOnStubProject.JS_DEV_DIR, 'example.js'),
             os.path.join(StubConfigOnStubProject.JS_DEV_DIR, 'main.js'),
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        ], level=logging.INFO)
 
         call_2 = mock.call([
             'gjslint',
             os.path.join(StubConfigOnStubProject.JS_DEV_DIR, 'main.js'),
             os.path.join(StubConfigOnStubProject.JS_DEV_DIR, 'example.js'),
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        ], level=logging.INFO)
 
-        if call_1 not in MockPopen.call_args_list and call_2 not in MockPopen.call_args_list:
+        if call_1 not in mock_run.call_args_list and call_2 not in mock_run.call_args_list:
             self.fail('Assertion Error: Arguments for gjslint is invalid.')
 
     def test_run_internal(self):
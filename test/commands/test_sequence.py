@@ -4,6 +4,8 @@ from test.stub_environment import StubEnvironment
 
 from googkit.commands.command import Command
 from googkit.commands.sequence import SequenceCommand
+from googkit.lib.argument import Argument
+from googkit.lib.error import InvalidOptionError
 from googkit.compat.unittest import mock
 
 
@@ -26,6 +28,8 @@ class TestSequenceCommand(unittest.TestCase):
                 ]
 
         env = StubEnvironment()
+        env.argument = mock.MagicMock()
+        env.argument.option.return_value = None
         command = DummySequenceCommand(env)
 
         with mock.patch('test.commands.test_sequence.DummyFooCommand') as MockFoo, \
@@ -35,3 +39,82 @@ class TestSequenceCommand(unittest.TestCase):
         self.assertTrue(MockFoo.return_value.run.called)
         self.assertTrue(MockBar.return_value.run.called)
         # [REVIEW] - Is it possible to test an execution order of those commands?
+
+    def test_run_with_profile_opt(self):
+        class DummySequenceCommand(SequenceCommand):
+            @classmethod
+            def _internal_commands(cls):
+                return [
+                    DummyFooCommand,
+                    DummyBarCommand
+                ]
+
+        env = StubEnvironment()
+        env.argument = mock.MagicMock()
+        env.argument.option.side_effect = lambda opt: True if opt == '--profile' else None
+        command = DummySequenceCommand(env)
+        command.write_profile_report = mock.MagicMock()
+
+        with mock.patch('test.commands.test_sequence.DummyFooCommand') as MockFoo, \
+                mock.patch('test.commands.test_sequence.DummyBarCommand') as MockBar:
+            command.run()
+
+        # Internal commands should share the profiler
+        self.assertIsNotNone(command.profiler)
+        self.assertEqual(MockFoo.return_value.profiler, command.profiler)
+        self.assertEqual(MockBar.return_value.profiler, command.profiler)
+        command.write_profile_report.assert_called_once_with()
+
+    def test_supported_options(self):
+        class FooCommand(Command):
+            @classmethod
+            def supported_options(cls):
+                return set(['--verbose', '--profile', '--foo'])
+
+        class BarCommand(Command):
+            @classmethod
+            def supported_options(cls):
+                return set(['--verbose', '--profile'])
+
+        class DummySequenceCommand(SequenceCommand):
+            @classmethod
+            def _internal_commands(cls):
+                return [FooCommand, BarCommand]
+
+        self.assertEqual(
+            DummySequenceCommand.supported_options(),
+            set(['--verbose', '--profile', '--foo']))
+
+        # Internal commands should receive only options supported by them
+        env = StubEnvironment()
+        env.argument = Argument(['dummy'], {'--foo': True, '--verbose': True})
+        command = DummySequenceCommand(env)
+
+        foo_env = command._internal_environment(FooCommand)
+        self.assertEqual(foo_env.argument.options, {'--foo': True, '--verbose': True})
+        self.assertEqual(foo_env.argument.commands, ['dummy'])
+
+        bar_env = command._internal_environment(BarCommand)
+        self.assertEqual(bar_env.argument.options, {'--verbose': True})
+
+    def test_run_with_unsupported_opt(self):
+        class DummySequenceCommand(SequenceCommand):
+            @classmethod
+            def _internal_commands(cls):
+                return [
+                    DummyFooCommand,
+                    DummyBarCommand
+                ]
+
+        env = StubEnvironment()
+        env.argument = Argument(['dummy'], {'--bogus': True})
+        command = DummySequenceCommand(env)
+
+        # Unsupported options should be rejected before running any command
+        with mock.patch.object(DummyFooCommand, 'run') as mock_foo_run, \
+                mock.patch.object(DummyBarCommand, 'run') as mock_bar_run:
+            with self.assertRaises(InvalidOptionError):
+                command.run()
+
+        self.assertFalse(mock_foo_run.called)
+        self.assertFalse(mock_bar_run.called)
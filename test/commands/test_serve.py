@@ -0,0 +1,207 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from test.stub_environment import StubEnvironment
+
+from googkit.commands.apply_config import ApplyConfigCommand
+from googkit.commands.serve import ServeCommand
+from googkit.commands.update_deps import UpdateDepsCommand
+from googkit.compat.unittest import mock
+from googkit.lib.deps import ParseCache
+from googkit.lib.error import GoogkitError
+import googkit.lib.deps
+import googkit.lib.server
+import googkit.lib.watch
+
+
+class TestServeCommand(unittest.TestCase):
+    def setUp(self):
+        self.env = StubEnvironment()
+        self.env.argument = mock.MagicMock()
+        self.env.argument.option.return_value = None
+        self.cmd = ServeCommand(self.env)
+
+        self.old_cwd = os.getcwd()
+        self.tmp_dir = tempfile.mkdtemp()
+        os.chdir(self.tmp_dir)
+
+        os.makedirs(os.path.join('development', 'js_dev'))
+        os.makedirs(os.path.join('closure', 'library', 'closure', 'goog'))
+
+        with open(os.path.join('development', 'index.html'), 'w') as f:
+            f.write('<!--@base_js@-->\n<!--@require_main@-->\n')
+        with open(os.path.join('development', 'style.css'), 'w') as f:
+            f.write('body {}\n')
+        with open(os.path.join('development', 'js_dev', 'googkit_index.js'), 'w') as f:
+            f.write("goog.provide('googkit_index');\n")
+
+        config = mock.MagicMock()
+        config.development_dir.return_value = 'development'
+        config.js_dev_dir.return_value = os.path.join('development', 'js_dev')
+        config.deps_js.return_value = os.path.join('development', 'js_dev', 'deps.js')
+        config.page_deps_dir.return_value = os.path.join('development', 'js_deps')
+        config.page_deps_js.side_effect = lambda namespace: os.path.join(
+            'development', 'js_deps', namespace + '.js')
+        config.deps_per_page.return_value = False
+        config.testrunner.return_value = os.path.join('development', 'all_tests.html')
+        config.base_js.return_value = os.path.join('closure', 'library', 'closure', 'goog', 'base.js')
+        config.library_root.return_value = os.path.join('closure', 'library')
+        config.compiler_root.return_value = os.path.join('closure', 'compiler')
+        config.dev_bundle_dir.return_value = os.path.join('development', 'js_bundle')
+        config.production_dir.return_value = 'production'
+        self.cmd.config = config
+
+        self.cmd.apply_config_command = ApplyConfigCommand(self.env)
+        self.cmd.apply_config_command.config = config
+        self.cmd.update_deps_command = UpdateDepsCommand(self.env)
+        self.cmd.update_deps_command.config = config
+        self.cmd.update_deps_command.parse_cache = ParseCache(
+            os.path.join(self.tmp_dir, 'deps'), os.path.join(self.tmp_dir, 'deps.json'))
+
+    def tearDown(self):
+        if self.cmd._deps_watcher is not None:
+            self.cmd._deps_watcher.close()
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.tmp_dir)
+
+    def test_needs_project_config(self):
+        self.assertTrue(ServeCommand.needs_project_config())
+
+    def test_address(self):
+        self.assertEqual(self.cmd.address(), ('127.0.0.1', 8000))
+
+        self.env.argument.option.side_effect = lambda opt: {'--host': '0.0.0.0', '--port': '8080'}.get(opt)
+        self.assertEqual(self.cmd.address(), ('0.0.0.0', 8080))
+
+    def test_address_with_invalid_port(self):
+        self.env.argument.option.side_effect = lambda opt: {'--port': 'foo'}.get(opt)
+
+        with self.assertRaises(GoogkitError):
+            self.cmd.address()
+
+    def test_resolve_config_applied(self):
+        resource = self.cmd.resolve('/development/index.html')
+
+        # Configs should be applied in memory
+        self.assertEqual(resource.content, (
+            '<script src="../closure/library/closure/goog/base.js"></script><!--@base_js@-->\n'
+            '<script> goog.require(\'googkit_index\'); </script><!--@require_main@-->\n').encode('utf-8'))
+        with open(os.path.join('development', 'index.html')) as f:
+            self.assertEqual(f.read(), '<!--@base_js@-->\n<!--@require_main@-->\n')
+
+    def test_resolve_cached(self):
+        resource = self.cmd.resolve('/development/index.html')
+
+        with mock.patch.object(self.cmd, 'config_applied_resource') as mock_resource:
+            self.assertIs(self.cmd.resolve('/development/index.html'), resource)
+        self.assertFalse(mock_resource.called)
+
+        # Changed files should be read again
+        with open(os.path.join('development', 'index.html'), 'w') as f:
+            f.write('<!--@require_main@-->\n')
+        self.assertEqual(
+            self.cmd.resolve('/development/index.html').content,
+            b'<script> goog.require(\'googkit_index\'); </script><!--@require_main@-->\n')
+
+    def test_resolve_without_markers(self):
+        resource = self.cmd.resolve('/development/style.css')
+
+        self.assertIsNone(resource.content)
+        self.assertEqual(resource.path, os.path.join('development', 'style.css'))
+
+    def test_resolve_deps_js(self):
+        resource = self.cmd.resolve('/development/js_dev/deps.js')
+
+        self.assertEqual(resource.content, (googkit.lib.deps.DEPS_JS_HEADER + (
+            "goog.addDependency('../../../../development/js_dev/googkit_index.js', "
+            "['googkit_index'], [], false);\n")).encode('utf-8'))
+        self.assertFalse(os.path.exists(os.path.join('development', 'js_dev', 'deps.js')))
+
+    def test_resolve_deps_js_changed(self):
+        self.cmd.resolve('/development/js_dev/deps.js')
+
+        with open(os.path.join('development', 'js_dev', 'foo.js'), 'w') as f:
+            f.write("goog.provide('foo');\n")
+        os.remove(os.path.join('development', 'js_dev', 'googkit_index.js'))
+
+        # Only changed scripts should be parsed without scanning js_dev
+        with mock.patch.object(self.cmd.update_deps_command, 'sources') as mock_sources, \
+                mock.patch.object(ServeCommand, 'DEPS_POLL_INTERVAL', 0):
+            resource = self.cmd.resolve('/development/js_dev/deps.js')
+        self.assertFalse(mock_sources.called)
+
+        self.assertEqual(resource.content, (googkit.lib.deps.DEPS_JS_HEADER + (
+            "goog.addDependency('../../../../development/js_dev/foo.js', "
+            "['foo'], [], false);\n")).encode('utf-8'))
+
+    def test_resolve_deps_js_cached(self):
+        resource = self.cmd.resolve('/development/js_dev/deps.js')
+
+        # deps.js should be kept with its ETag until scripts are changed
+        with mock.patch.object(self.cmd.update_deps_command, 'deps_js_contents') as mock_contents:
+            self.assertIs(self.cmd.resolve('/development/js_dev/deps.js'), resource)
+        self.assertFalse(mock_contents.called)
+
+    def test_resolve_deps_js_on_polling_watcher(self):
+        js_dev_dir = os.path.join('development', 'js_dev')
+        watcher = googkit.lib.watch.PollingWatcher(js_dev_dir)
+        watcher.poll = mock.MagicMock(return_value=set())
+
+        with mock.patch('googkit.lib.watch.watcher', return_value=watcher):
+            for i in range(3):
+                self.cmd.resolve('/development/js_dev/deps.js')
+
+        # js_dev should not be walked for each request
+        self.assertEqual(watcher.poll.call_count, 1)
+
+    def test_resolve_not_found(self):
+        self.assertIsNone(self.cmd.resolve('/development/not_found.html'))
+
+    def test_resolve_outside_served_dirs(self):
+        os.makedirs(os.path.join('closure', 'compiler'))
+        for path in ('googkit.cfg', os.path.join('closure', 'library', 'closure', 'goog', 'base.js'),
+                     os.path.join('closure', 'compiler', 'compiler.jar')):
+            with open(path, 'w') as f:
+                f.write('DUMMY')
+
+        # Only the development directory and the library should be served
+        self.assertIsNone(self.cmd.resolve('/googkit.cfg'))
+        self.assertIsNone(self.cmd.resolve('/closure/compiler/compiler.jar'))
+        self.assertEqual(
+            self.cmd.resolve('/closure/library/closure/goog/base.js').path,
+            os.path.join('closure', 'library', 'closure', 'goog', 'base.js'))
+
+    def test_resolve_production(self):
+        os.makedirs('production')
+        for path in ('index.html', 'index.3f9a1c20.min.js', 'index.3f9a1c20.min.js.map'):
+            with open(os.path.join('production', path), 'w') as f:
+                f.write('DUMMY')
+        with open(os.path.join('production', 'asset-manifest.json'), 'w') as f:
+            f.write('{"index.min.js": "index.3f9a1c20.min.js"}')
+        with open(os.path.join('production', 'index.3f9a1c20.min.js.gz'), 'w') as f:
+            f.write('GZIPPED')
+
+        page = self.cmd.resolve_production('/')
+        self.assertEqual(page.path, os.path.join('production', 'index.html'))
+        self.assertEqual(page.cache_control, 'no-cache')
+        self.assertIsNone(page.gzip_path)
+
+        # Hashed scripts should be cached forever
+        script = self.cmd.resolve_production('/index.3f9a1c20.min.js')
+        self.assertEqual(script.cache_control, googkit.lib.server.IMMUTABLE)
+        self.assertEqual(script.gzip_path, os.path.join('production', 'index.3f9a1c20.min.js.gz'))
+        self.assertEqual(
+            self.cmd.resolve_production('/index.3f9a1c20.min.js.map').cache_control,
+            googkit.lib.server.IMMUTABLE)
+
+        self.assertIsNone(self.cmd.resolve_production('/not_found.html'))
+
+    def test_serve_production_without_build(self):
+        with self.assertRaises(GoogkitError):
+            self.cmd.serve_production()
+
+
+if __name__ == '__main__':
+    unittest.main()
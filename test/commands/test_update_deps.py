@@ -1,13 +1,18 @@
 import unittest
 import os
-import subprocess
+import shutil
+import tempfile
 
 from test.stub_config import StubConfig, StubConfigOnStubProject
 from test.stub_environment import StubEnvironment
 from test.stub_stdout import StubStdout
 
 from googkit.commands.update_deps import UpdateDepsCommand
+from googkit.lib.bundle import DevBundler
 from googkit.compat.unittest import mock
+from googkit.lib.deps import ParseCache
+import googkit.lib.deps
+from googkit.lib.error import GoogkitError
 
 
 class TestUpdateDepsCommand(unittest.TestCase):
@@ -19,29 +24,163 @@ class TestUpdateDepsCommand(unittest.TestCase):
     def test_needs_project_config(self):
         self.assertTrue(UpdateDepsCommand.needs_project_config())
 
+    def _setup_project(self):
+        tmp_dir = tempfile.mkdtemp()
+        js_dev_dir = os.path.join(tmp_dir, 'development', 'js_dev')
+        base_js = os.path.join(tmp_dir, 'closure', 'library', 'closure', 'goog', 'base.js')
+        os.makedirs(os.path.join(js_dev_dir, 'sub'))
+
+        with open(os.path.join(js_dev_dir, 'main.js'), 'w') as f:
+            f.write("goog.provide('googkit_index');\ngoog.require('sub.foo');\n")
+        with open(os.path.join(js_dev_dir, 'sub', 'foo.js'), 'w') as f:
+            f.write("goog.module('sub.foo');\nconst dom = goog.require('goog.dom');\n")
+
+        self.cmd.config = mock.MagicMock()
+        self.cmd.config.development_dir.return_value = os.path.dirname(js_dev_dir)
+        self.cmd.config.testrunner.return_value = os.path.join(tmp_dir, 'development', 'all_tests.html')
+        self.cmd.config.js_dev_dir.return_value = js_dev_dir
+        self.cmd.config.deps_js.return_value = os.path.join(js_dev_dir, 'deps.js')
+        self.cmd.config.page_deps_js.side_effect = lambda namespace: os.path.join(
+            tmp_dir, 'development', 'js_deps', namespace + '.js')
+        self.cmd.config.deps_per_page.return_value = False
+        self.cmd.config.base_js.return_value = base_js
+        self.cmd.config.library_root.return_value = os.path.join(tmp_dir, 'closure', 'library')
+        self.cmd.config.dev_bundle_js.side_effect = lambda namespace: os.path.join(
+            tmp_dir, 'development', 'js_bundle', namespace + '.js')
+        return tmp_dir
+
     def test_update_deps_js(self):
-        MockPopen = mock.MagicMock()
-        MockPopen.return_value.returncode = 0
+        tmp_dir = self._setup_project()
+        deps_js = self.cmd.config.deps_js()
+        self.cmd.parse_cache = ParseCache(os.path.join(tmp_dir, 'deps'), os.path.join(tmp_dir, 'deps.json'))
+
+        # deps.js itself should not be listed
+        with open(deps_js, 'w') as f:
+            f.write('OLD')
+
+        self.cmd.update_deps()
+
+        with open(deps_js) as f:
+            self.assertEqual(f.read(), googkit.lib.deps.DEPS_JS_HEADER + (
+                "goog.addDependency('../../../../development/js_dev/main.js', "
+                "['googkit_index'], ['sub.foo'], false);\n"
+                "goog.addDependency('../../../../development/js_dev/sub/foo.js', "
+                "['sub.foo'], ['goog.dom'], true);\n"))
+        self.assertTrue(os.path.exists(os.path.join(tmp_dir, 'deps.json')))
+
+        shutil.rmtree(tmp_dir)
 
-        with mock.patch('subprocess.Popen', new=MockPopen) as mock_popen:
+    def test_update_deps_js_not_changed(self):
+        tmp_dir = self._setup_project()
+        self.cmd.update_deps()
+
+        with mock.patch('googkit.lib.file.write_atomically') as mock_write:
             self.cmd.update_deps()
+        self.assertFalse(mock_write.called)
+
+        shutil.rmtree(tmp_dir)
+
+    def test_update_deps_js_with_parse_cache(self):
+        tmp_dir = self._setup_project()
+        self.cmd.parse_cache = ParseCache(os.path.join(tmp_dir, 'deps'), os.path.join(tmp_dir, 'deps.json'))
+        self.cmd.update_deps()
+
+        # Unchanged scripts should not be parsed again
+        with mock.patch('googkit.lib.deps.parse_content') as mock_parse:
+            self.cmd.update_deps()
+        self.assertFalse(mock_parse.called)
+
+        shutil.rmtree(tmp_dir)
+
+    def test_update_deps_js_per_page(self):
+        tmp_dir = self._setup_project()
+        self.cmd.config.deps_per_page.return_value = True
+        js_dev_dir = self.cmd.config.js_dev_dir()
+        devel_dir = self.cmd.config.development_dir()
+
+        with open(os.path.join(js_dev_dir, 'other.js'), 'w') as f:
+            f.write("goog.provide('googkit_other');\n")
+        for html in ('index.html', 'all_tests.html'):
+            with open(os.path.join(devel_dir, html), 'w') as f:
+                f.write('<!--@deps_js@-->\n')
+
+        # deps.js for removed pages should be removed
+        stale_path = self.cmd.config.page_deps_js('googkit_removed')
+        os.makedirs(os.path.dirname(stale_path))
+        with open(stale_path, 'w') as f:
+            f.write('STALE')
+
+        # Hand-written scripts that look like deps.js should be kept
+        config_js = os.path.join(js_dev_dir, 'deps.config.js')
+        with open(config_js, 'w') as f:
+            f.write("goog.provide('deps.config');\n")
+
+        self.cmd.update_deps()
+
+        # Only scripts that the page depends on should be listed
+        with open(self.cmd.config.page_deps_js('googkit_index')) as f:
+            self.assertEqual(f.read(), googkit.lib.deps.DEPS_JS_HEADER + (
+                "goog.addDependency('../../../../development/js_dev/main.js', "
+                "['googkit_index'], ['sub.foo'], false);\n"
+                "goog.addDependency('../../../../development/js_dev/sub/foo.js', "
+                "['sub.foo'], ['goog.dom'], true);\n"))
+
+        # The test runner is not a page
+        self.assertFalse(os.path.exists(self.cmd.config.page_deps_js('googkit_all_tests')))
+        self.assertFalse(os.path.exists(stale_path))
+        self.assertTrue(os.path.exists(config_js))
+
+        with open(self.cmd.config.deps_js()) as f:
+            self.assertIn("['deps.config']", f.read())
+
+        shutil.rmtree(tmp_dir)
+
+    def test_update_dev_bundles(self):
+        tmp_dir = self._setup_project()
+        devel_dir = self.cmd.config.development_dir()
+        base_js = self.cmd.config.base_js()
+        dom_js = os.path.join(os.path.dirname(base_js), 'dom', 'dom.js')
+        os.makedirs(os.path.dirname(dom_js))
+
+        with open(base_js, 'w') as f:
+            f.write('/** @provideGoog */\nvar goog = {};\n')
+        with open(dom_js, 'w') as f:
+            f.write("goog.provide('goog.dom');\n")
+        with open(os.path.join(devel_dir, 'index.html'), 'w') as f:
+            f.write('<!--@require_main@-->\n')
+
+        # Dev bundles for removed pages should be removed
+        stale_path = self.cmd.config.dev_bundle_js('googkit_removed')
+        os.makedirs(os.path.dirname(stale_path))
+        with open(stale_path, 'w') as f:
+            f.write('STALE')
+
+        self.cmd.bundler = DevBundler(os.path.join(tmp_dir, 'bundle.json'))
+        self.cmd.update_deps()
+
+        # Scripts should be concatenated in the order of dependencies
+        # without base.js
+        with open(self.cmd.config.dev_bundle_js('googkit_index')) as f:
+            self.assertEqual(f.read(), (
+                "goog.provide('goog.dom');\n"
+                "goog.loadModule(function(exports) {'use strict';\n"
+                "goog.module('sub.foo');\n"
+                "const dom = goog.require('goog.dom');\n"
+                "return exports;});\n"
+                "goog.provide('googkit_index');\n"
+                "goog.require('sub.foo');\n"
+                "//# sourceMappingURL=googkit_index.js.map\n"))
+        self.assertFalse(os.path.exists(stale_path))
+        self.assertTrue(os.path.exists(os.path.join(tmp_dir, 'bundle.json')))
 
-        arg_format_dict = {
-            'depswriter_path': StubConfig.DEPSWRITER,
-            'js_dev_path': StubConfig.JS_DEV_DIR,
-            'relpath_from_base_js_to_js_dev': os.path.relpath(StubConfig.JS_DEV_DIR, os.path.dirname(StubConfig.BASE_JS)),
-            'deps_js_path': StubConfig.DEPS_JS
-        }
+        shutil.rmtree(tmp_dir)
 
-        expected = ' '.join([
-            'python',
-            '{depswriter_path}',
-            '--root_with_prefix="{js_dev_path}',
-            '{relpath_from_base_js_to_js_dev}"',
-            '--output_file="{deps_js_path}"'
-        ]).format(**arg_format_dict)
+    def test_update_deps_js_failed(self):
+        self.cmd.config.deps_js = mock.MagicMock(return_value=os.path.join(os.sep, 'not_found', 'deps.js'))
 
-        mock_popen.assert_called_once_with(expected, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+        with mock.patch('googkit.lib.deps.deps_js_content', return_value=''):
+            with self.assertRaises(GoogkitError):
+                self.cmd.update_deps()
 
     def test_update_tests(self):
         self.assertEqual(
@@ -104,6 +243,8 @@ DUMMY
 
     def test_run_internal(self):
         dummy_project_root = os.path.normcase('/dir1/dir2')
+        self.env.argument = mock.MagicMock()
+        self.env.argument.option.return_value = None
         self.cmd.update_deps = mock.MagicMock()
         self.cmd.update_testrunner = mock.MagicMock()
 
@@ -24,6 +24,16 @@ class TestArgumentParser(unittest.TestCase):
         self.assertListEqual(arg.commands, [])
         self.assertEqual(arg.option('--opt1'), 'value')
 
+    def test_parse_with_hyphenated_option(self):
+        arg = ArgumentParser.parse(['googkit.py', '--opt-1', '--opt-2=value'])
+        self.assertListEqual(arg.commands, [])
+        self.assertTrue(arg.option('--opt-1'))
+        self.assertEqual(arg.option('--opt-2'), 'value')
+
+        # Options should not be truncated at the first hyphen
+        arg = ArgumentParser.parse(['googkit.py', 'build', '--no-cache'])
+        self.assertEqual(arg.options, {'--no-cache': True})
+
     def test_parse_with_options(self):
         arg = ArgumentParser.parse(['googkit.py', '-o', '--opt2'])
         self.assertListEqual(arg.commands, [])
@@ -0,0 +1,109 @@
+import doctest
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import googkit.lib.bundle
+from googkit.compat.unittest import mock
+from googkit.lib.bundle import DevBundler
+
+
+class TestDevBundler(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.bundle_path = os.path.join(self.tmp_dir, 'js_bundle', 'googkit_index.js')
+        self.foo_js = self._write('foo.js', "goog.module('foo');\nexports.x = 1;\n")
+        self.main_js = self._write('main.js', "goog.provide('main');\ngoog.require('foo');\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_write(self):
+        bundler = DevBundler(os.path.join(self.tmp_dir, 'bundle.json'))
+
+        self.assertTrue(bundler.write(self.bundle_path, [self.foo_js, self.main_js]))
+
+        with open(self.bundle_path) as f:
+            self.assertEqual(f.read(), (
+                "goog.loadModule(function(exports) {'use strict';\n"
+                "goog.module('foo');\n"
+                "exports.x = 1;\n"
+                "return exports;});\n"
+                "goog.provide('main');\n"
+                "goog.require('foo');\n"
+                "//# sourceMappingURL=googkit_index.js.map\n"))
+
+        with open(self.bundle_path + '.map') as f:
+            source_map = json.load(f)
+
+        self.assertEqual(source_map['file'], 'googkit_index.js')
+        self.assertEqual(source_map['sections'], [
+            {
+                'offset': {'line': 1, 'column': 0},
+                'map': {'version': 3, 'sources': ['../foo.js'], 'names': [], 'mappings': 'AAAA;AACA'},
+            },
+            {
+                'offset': {'line': 4, 'column': 0},
+                'map': {'version': 3, 'sources': ['../main.js'], 'names': [], 'mappings': 'AAAA;AACA'},
+            },
+        ])
+
+    def test_write_not_changed(self):
+        index_path = os.path.join(self.tmp_dir, 'bundle.json')
+        bundler = DevBundler(index_path)
+        bundler.write(self.bundle_path, [self.foo_js, self.main_js])
+        bundler.save()
+
+        bundler = DevBundler(index_path)
+        bundler.load()
+
+        with mock.patch('googkit.lib.bundle.read_chunk') as mock_read_chunk:
+            self.assertFalse(bundler.write(self.bundle_path, [self.foo_js, self.main_js]))
+        self.assertFalse(mock_read_chunk.called)
+
+    def test_write_incrementally(self):
+        bundler = DevBundler(os.path.join(self.tmp_dir, 'bundle.json'))
+        bundler.write(self.bundle_path, [self.foo_js, self.main_js])
+
+        self._write('main.js', "goog.provide('main');\ngoog.require('foo');\nmain();\n")
+
+        # Only changed scripts should be read
+        with mock.patch('googkit.lib.bundle.read_chunk', wraps=googkit.lib.bundle.read_chunk) as mock_read_chunk:
+            self.assertTrue(bundler.write(self.bundle_path, [self.foo_js, self.main_js]))
+        mock_read_chunk.assert_called_once_with(self.main_js)
+
+        with open(self.bundle_path) as f:
+            self.assertEqual(f.read(), (
+                "goog.loadModule(function(exports) {'use strict';\n"
+                "goog.module('foo');\n"
+                "exports.x = 1;\n"
+                "return exports;});\n"
+                "goog.provide('main');\n"
+                "goog.require('foo');\n"
+                "main();\n"
+                "//# sourceMappingURL=googkit_index.js.map\n"))
+
+    def test_remove(self):
+        bundler = DevBundler(os.path.join(self.tmp_dir, 'bundle.json'))
+        bundler.write(self.bundle_path, [self.main_js])
+
+        bundler.remove(self.bundle_path)
+
+        self.assertFalse(os.path.exists(self.bundle_path))
+        self.assertFalse(os.path.exists(self.bundle_path + '.map'))
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(googkit.lib.bundle))
+    return tests
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+import unittest
+import doctest
+import googkit.lib.cache
+from googkit.lib.cache import CompileCache, StatIndex
+
+
+class TestCompileCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.output_dir = tempfile.mkdtemp()
+        self.cache = CompileCache(self.cache_dir)
+        self.output = os.path.join(self.output_dir, 'index.min.js')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        shutil.rmtree(self.output_dir)
+
+    def test_restore_not_found(self):
+        self.assertIsNone(self.cache.restore('KEY', [self.output]))
+
+    def test_store_and_restore(self):
+        with open(self.output, 'w') as f:
+            f.write('COMPILED')
+
+        self.cache.store('KEY', [self.output, self.output + '.map'], u'WARNING')
+        os.remove(self.output)
+
+        log = self.cache.restore('KEY', [self.output, self.output + '.map'])
+
+        self.assertEqual(log, 'WARNING')
+        with open(self.output) as f:
+            self.assertEqual(f.read(), 'COMPILED')
+        self.assertFalse(os.path.exists(self.output + '.map'))
+
+    def test_stats(self):
+        with open(self.output, 'w') as f:
+            f.write('COMPILED')
+
+        self.cache.restore('KEY', [self.output])
+        self.cache.store('KEY', [self.output], u'')
+        self.cache.restore('KEY', [self.output])
+
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_store_existing_entry(self):
+        with open(self.output, 'w') as f:
+            f.write('FIRST')
+        self.cache.store('KEY', [self.output], u'FIRST')
+
+        # An entry stored by another process should be kept
+        with open(self.output, 'w') as f:
+            f.write('SECOND')
+        self.cache.store('KEY', [self.output], u'SECOND')
+
+        self.assertEqual(self.cache.restore('KEY', [self.output]), 'FIRST')
+        self.assertEqual(os.listdir(os.path.join(self.cache_dir, googkit.lib.cache.TMP_DIR)), [])
+
+    def test_evict(self):
+        with open(self.output, 'w') as f:
+            f.write('X' * 100)
+
+        for (i, key) in enumerate(['KEY1', 'KEY2', 'KEY3']):
+            self.cache.store(key, [self.output], u'')
+            log_path = os.path.join(self.cache_dir, key[:2], key, googkit.lib.cache.LOG_FILE)
+            os.utime(log_path, (1000 + i, 1000 + i))
+
+        # KEY1 is used recently
+        os.utime(os.path.join(self.cache_dir, 'KE', 'KEY1', googkit.lib.cache.LOG_FILE), (2000, 2000))
+
+        self.assertEqual(self.cache.evict(150), 2)
+        self.assertIsNotNone(self.cache.restore('KEY1', [self.output]))
+        self.assertIsNone(self.cache.restore('KEY2', [self.output]))
+        self.assertIsNone(self.cache.restore('KEY3', [self.output]))
+
+
+class TestStatIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.tmp_dir, 'cache', 'index.json')
+        self.path = os.path.join(self.tmp_dir, 'foo.js')
+
+        with open(self.path, 'w') as f:
+            f.write('FOO')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_contains(self):
+        index = StatIndex(self.index_path)
+        self.assertFalse(index.contains(self.path))
+
+        index.add(self.path)
+        self.assertTrue(index.contains(self.path))
+
+        with open(self.path, 'w') as f:
+            f.write('CHANGED')
+        self.assertFalse(index.contains(self.path))
+
+    def test_remove(self):
+        index = StatIndex(self.index_path)
+        index.add(self.path)
+        index.remove(self.path)
+
+        self.assertFalse(index.contains(self.path))
+
+    def test_save_and_load(self):
+        index = StatIndex(self.index_path, 'SIGNATURE')
+        index.add(self.path)
+        index.save()
+
+        index = StatIndex(self.index_path, 'SIGNATURE')
+        index.load()
+        self.assertTrue(index.contains(self.path))
+
+        # Entries should be ignored if the signature is changed
+        index = StatIndex(self.index_path, 'ANOTHER')
+        index.load()
+        self.assertFalse(index.contains(self.path))
+
+    def test_load_broken_index(self):
+        os.makedirs(os.path.dirname(self.index_path))
+        with open(self.index_path, 'w') as f:
+            f.write('BROKEN')
+
+        index = StatIndex(self.index_path)
+        index.load()
+        self.assertFalse(index.contains(self.path))
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(googkit.lib.cache))
+    return tests
+
+
+if __name__ == '__main__':
+    unittest.main()
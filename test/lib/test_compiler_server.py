@@ -0,0 +1,204 @@
+import io
+import json
+import threading
+import unittest
+from googkit.compat.unittest import mock
+from googkit.lib.compiler_server import CompilerServer
+from googkit.lib.error import GoogkitError
+
+
+def response(request_id, exit_code=0, output=''):
+    return json.dumps({'exitCode': exit_code, 'output': output, 'requestId': request_id}) + '\n'
+
+
+class StubStdin(io.BytesIO):
+    """Stdin of a stub worker that allows the worker to respond only after
+    each request is written.
+    """
+
+    def __init__(self):
+        io.BytesIO.__init__(self)
+        self.requests = threading.Semaphore(0)
+
+    def flush(self):
+        io.BytesIO.flush(self)
+        self.requests.release()
+
+
+class TestCompilerServer(unittest.TestCase):
+    def setUp(self):
+        self.server = CompilerServer('compiler.jar')
+        self.hang = threading.Event()
+
+    def tearDown(self):
+        # Let reader threads of hung workers finish
+        self.hang.set()
+
+    def stub_process(self, responses, stderr=''):
+        proc = mock.MagicMock()
+        proc.poll.return_value = None
+        proc.stdin = StubStdin()
+        responses = list(responses)
+        lines = []
+
+        def popen(cmd, **kwargs):
+            def readline():
+                if not lines:
+                    # The worker responds nothing until it is requested
+                    proc.stdin.requests.acquire()
+                    if not responses:
+                        return b''
+
+                    # The compiler writes messages to stderr before responding
+                    kwargs['stderr'].write(stderr.encode('utf-8'))
+                    lines.extend(responses.pop(0).encode('utf-8').splitlines(True))
+                return lines.pop(0)
+
+            proc.stdout.readline.side_effect = readline
+            return proc
+
+        return (proc, popen)
+
+    def test_compile(self):
+        (proc, popen) = self.stub_process([response(1), response(2, 0, 'WARNING')])
+
+        with mock.patch('googkit.lib.file.which', return_value='/usr/bin/java'), \
+                mock.patch('subprocess.Popen', side_effect=popen) as MockPopen:
+            result = self.server.compile(['--js=foo.js'])
+
+        self.assertEqual(result, (0, 'WARNING'))
+        self.assertEqual(
+            MockPopen.call_args[0][0],
+            ['java', '-jar', 'compiler.jar', '--persistent_worker'])
+
+        # Requests should be JSON objects followed by a newline, and the
+        # first one checks whether the worker protocol is supported
+        self.assertEqual(proc.stdin.getvalue(), (
+            b'{"arguments": ["--version"], "requestId": 1}\n'
+            b'{"arguments": ["--js=foo.js"], "requestId": 2}\n'))
+
+    def test_compile_with_multiline_response(self):
+        (proc, popen) = self.stub_process([response(1), '{"exitCode": 1,\n "output": "ERROR", "requestId": 2}\n'])
+
+        with mock.patch('googkit.lib.file.which', return_value='/usr/bin/java'), \
+                mock.patch('subprocess.Popen', side_effect=popen):
+            result = self.server.compile([])
+
+        self.assertEqual(result, (1, 'ERROR'))
+
+    def test_compile_with_stderr(self):
+        (proc, popen) = self.stub_process([response(1), response(2, 0, 'WARNING\n')], stderr='STDERR\n')
+
+        with mock.patch('googkit.lib.file.which', return_value='/usr/bin/java'), \
+                mock.patch('subprocess.Popen', side_effect=popen):
+            result = self.server.compile([])
+
+        # Only messages written while processing the request are returned
+        self.assertEqual(result, (0, 'WARNING\nSTDERR\n'))
+
+    def test_compile_without_exit_code(self):
+        (proc, popen) = self.stub_process([response(1), '{"output": "", "requestId": 2}\n'])
+
+        with mock.patch('googkit.lib.file.which', return_value='/usr/bin/java'), \
+                mock.patch('subprocess.Popen', side_effect=popen):
+            with self.assertRaises(GoogkitError):
+                self.server.compile([])
+
+        proc.wait.assert_called_once_with()
+
+    def test_compile_with_garbled_response(self):
+        (proc, popen) = self.stub_process([response(1), 'Exception in thread "main"\n', response(2)])
+
+        with mock.patch('googkit.lib.file.which', return_value='/usr/bin/java'), \
+                mock.patch('subprocess.Popen', side_effect=popen):
+            with self.assertRaises(GoogkitError):
+                self.server.compile([])
+
+        proc.wait.assert_called_once_with()
+
+    def test_compile_with_stopped_server(self):
+        (proc, popen) = self.stub_process([response(1)])
+
+        with mock.patch('googkit.lib.file.which', return_value='/usr/bin/java'), \
+                mock.patch('subprocess.Popen', side_effect=popen):
+            with self.assertRaises(GoogkitError):
+                self.server.compile([])
+
+    def test_compile_without_worker_protocol(self):
+        (worker_proc, popen) = self.stub_process(['ERROR: "--persistent_worker" is not a valid option\n'])
+
+        with mock.patch('googkit.lib.file.which', return_value='/usr/bin/java'), \
+                mock.patch('logging.warning'), \
+                mock.patch('subprocess.Popen', side_effect=popen), \
+                mock.patch('googkit.lib.process.run', return_value=(1, 'ERROR')) as mock_run:
+            result = self.server.compile(['--js=foo.js'], 'foo')
+
+        # The compiler should be started for the request instead, and its
+        # messages are streamed with the prefix
+        self.assertFalse(self.server.is_supported())
+        self.assertEqual(result, (1, 'ERROR'))
+        mock_run.assert_called_once_with(['java', '-jar', 'compiler.jar', '--js=foo.js'], 'foo')
+
+    def test_start_with_hung_worker(self):
+        proc = mock.MagicMock()
+        proc.poll.return_value = None
+        proc.stdout.readline.side_effect = lambda: self.hang.wait() or b''
+
+        with mock.patch('googkit.lib.file.which', return_value='/usr/bin/java'), \
+                mock.patch('logging.warning'), \
+                mock.patch('subprocess.Popen', return_value=proc), \
+                mock.patch.object(CompilerServer, 'PROBE_TIMEOUT', 0.01):
+            self.server.start()
+
+        # The worker should be killed, and not be used
+        self.assertFalse(self.server.is_supported())
+        proc.kill.assert_called_once_with()
+
+    def test_compile_with_hung_worker(self):
+        server = CompilerServer('compiler.jar', timeout=0.01)
+        proc = mock.MagicMock()
+        proc.poll.return_value = None
+        proc.stdin = StubStdin()
+        responded = []
+
+        def readline():
+            # The worker responds to the probe, and hangs after that
+            proc.stdin.requests.acquire()
+            if not responded:
+                responded.append(True)
+                return response(1).encode('utf-8')
+            self.hang.wait()
+            return b''
+
+        proc.stdout.readline.side_effect = readline
+
+        with mock.patch('googkit.lib.file.which', return_value='/usr/bin/java'), \
+                mock.patch('logging.warning'), \
+                mock.patch('subprocess.Popen', return_value=proc), \
+                mock.patch('googkit.lib.process.run', return_value=(0, 'WARNING')) as mock_run:
+            result = server.compile(['--js=foo.js'])
+
+        self.assertTrue(server.is_supported())
+        self.assertEqual(result, (0, 'WARNING'))
+        proc.kill.assert_called_once_with()
+        mock_run.assert_called_once_with(['java', '-jar', 'compiler.jar', '--js=foo.js'], None)
+
+    def test_workers_for_jobs(self):
+        server = CompilerServer('compiler.jar', jobs=2)
+        worker1 = server._acquire()
+        worker2 = server._acquire()
+
+        # Each job should have its own worker
+        self.assertIsNot(worker1, worker2)
+
+        server._release(worker1)
+        self.assertIs(server._acquire(), worker1)
+
+    def test_start_without_java(self):
+        with mock.patch('googkit.lib.file.which', return_value=None):
+            with self.assertRaises(GoogkitError):
+                self.server.start()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+import doctest
+import googkit.lib.compress
+
+
+class TestCompress(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.root, 'css'))
+        self.js_path = os.path.join(self.root, 'index.min.js')
+        self.css_path = os.path.join(self.root, 'css', 'style.css')
+        self.png_path = os.path.join(self.root, 'image.png')
+
+        for path in (self.js_path, self.css_path, self.png_path):
+            with open(path, 'w') as f:
+                f.write('content ' * 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_gzip_file(self):
+        result = googkit.lib.compress.gzip_file(self.js_path, 9)
+
+        self.assertFalse(result.skipped)
+        self.assertEqual(result.size, 800)
+        self.assertLess(result.ratio(), 1.0)
+
+        with gzip.open(self.js_path + '.gz', 'rb') as f:
+            self.assertEqual(f.read(), b'content ' * 100)
+
+    def test_gzip_file_up_to_date(self):
+        googkit.lib.compress.gzip_file(self.js_path)
+        self.assertTrue(googkit.lib.compress.gzip_file(self.js_path).skipped)
+
+        # Modified file should be compressed again
+        os.utime(self.js_path, (os.path.getmtime(self.js_path) + 10,) * 2)
+        self.assertFalse(googkit.lib.compress.gzip_file(self.js_path).skipped)
+
+    def test_gzip_all(self):
+        stale_path = os.path.join(self.root, 'removed.js.gz')
+        archive_path = os.path.join(self.root, 'archive.tar.gz')
+        for path in (stale_path, archive_path):
+            with open(path, 'w') as f:
+                f.write('')
+
+        results = googkit.lib.compress.gzip_all(self.root, ('.js', '.css'), 6, 2)
+
+        self.assertEqual(
+            sorted([result.path for result in results]),
+            sorted([self.js_path, self.css_path]))
+        self.assertTrue(os.path.exists(self.js_path + '.gz'))
+        self.assertTrue(os.path.exists(self.css_path + '.gz'))
+        self.assertFalse(os.path.exists(self.png_path + '.gz'))
+
+        # Compressed files without the original file should be removed
+        self.assertFalse(os.path.exists(stale_path))
+        self.assertTrue(os.path.exists(archive_path))
+
+    def test_remove_all(self):
+        googkit.lib.compress.gzip_all(self.root, ('.js', '.css'))
+        archive_path = os.path.join(self.root, 'archive.tar.gz')
+        with open(archive_path, 'w') as f:
+            f.write('')
+
+        removed = googkit.lib.compress.remove_all(self.root, ('.js', '.css'))
+
+        self.assertEqual(sorted(removed), sorted([self.js_path + '.gz', self.css_path + '.gz']))
+        self.assertFalse(os.path.exists(self.js_path + '.gz'))
+        self.assertFalse(os.path.exists(self.css_path + '.gz'))
+        self.assertTrue(os.path.exists(self.js_path))
+        self.assertTrue(os.path.exists(archive_path))
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(googkit.lib.compress))
+    return tests
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 import os
+import warnings
 
 import googkit.compat.configparser as configparser
 from googkit.lib.config import Config
@@ -46,6 +47,16 @@ class TestConfig(unittest.TestCase):
     def test_development_dir(self):
         self.assertEqual(self.cfg.development_dir(), 'development')
 
+    def test_depswriter(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            path = self.cfg.depswriter()
+
+        self.assertEqual(path, os.path.join('closure', 'library', 'closure', 'bin', 'build', 'depswriter.py'))
+
+        # The accessor is kept only for plugins
+        self.assertEqual(caught[0].category, DeprecationWarning)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,213 @@
+import os
+import shutil
+import tempfile
+import unittest
+import doctest
+import googkit.lib.deps
+from googkit.compat.unittest import mock
+from googkit.lib.deps import DepsGraph, ParseCache, Source
+from googkit.lib.error import GoogkitError
+
+
+class TestDepsGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = DepsGraph()
+        self.graph.add(Source('base.js', [], [], is_base=True))
+        self.graph.add(Source('a.js', ['a'], ['b', 'c']))
+        self.graph.add(Source('b.js', ['b'], ['c']))
+        self.graph.add(Source('c.js', ['c'], []))
+        self.graph.add(Source('d.js', ['d'], []))
+
+    def test_sources_for(self):
+        self.assertEqual(
+            self.graph.sources_for('a'),
+            ['base.js', 'c.js', 'b.js', 'a.js'])
+
+    def test_sources_for_multiple_namespaces(self):
+        self.assertEqual(
+            self.graph.sources_for('d', 'b'),
+            ['base.js', 'd.js', 'c.js', 'b.js'])
+
+    def test_sources_for_unknown_namespace(self):
+        with self.assertRaises(GoogkitError):
+            self.graph.sources_for('unknown')
+
+    def test_sources_for_circular_dependency(self):
+        self.graph.add(Source('e.js', ['e'], ['f']))
+        self.graph.add(Source('f.js', ['f'], ['g']))
+        self.graph.add(Source('g.js', ['g'], ['e']))
+
+        with self.assertRaises(GoogkitError) as cm:
+            self.graph.sources_for('e')
+
+        self.assertIn('e.js -> f.js -> g.js -> e.js', str(cm.exception))
+
+    def test_reachable(self):
+        paths = [source.path for source in self.graph.reachable('b', 'goog.dom')]
+        self.assertEqual(sorted(paths), ['b.js', 'c.js'])
+
+    def test_add_duplicated_namespace(self):
+        with self.assertRaises(GoogkitError):
+            self.graph.add(Source('a2.js', ['a'], []))
+
+    def test_add_duplicated_namespace_keeps_graph(self):
+        with self.assertRaises(GoogkitError):
+            self.graph.add(Source('e.js', ['e', 'a'], []))
+
+        with self.assertRaises(GoogkitError):
+            self.graph.sources_for('e')
+
+    def test_remove(self):
+        self.graph.remove('c.js')
+
+        with self.assertRaises(GoogkitError):
+            self.graph.sources_for('a')
+
+        self.graph.add(Source('c2.js', ['c'], []))
+        self.assertEqual(
+            self.graph.sources_for('b'),
+            ['base.js', 'c2.js', 'b.js'])
+
+    def test_update(self):
+        with mock.patch('os.path.exists', return_value=True), \
+                mock.patch('googkit.lib.deps.parse', return_value=Source('b.js', ['b'], [])):
+            self.graph.update('b.js')
+
+        self.assertEqual(
+            self.graph.sources_for('a'),
+            ['base.js', 'b.js', 'c.js', 'a.js'])
+
+        with mock.patch('os.path.exists', return_value=False):
+            self.graph.update('b.js')
+
+        with self.assertRaises(GoogkitError):
+            self.graph.sources_for('b')
+
+    def test_scan(self):
+        root = tempfile.mkdtemp()
+        try:
+            os.mkdir(os.path.join(root, 'sub'))
+            with open(os.path.join(root, 'main.js'), 'w') as f:
+                f.write("goog.provide('main');\ngoog.require('sub');\n")
+            with open(os.path.join(root, 'sub', 'sub.js'), 'w') as f:
+                f.write("  goog.provide('sub');\n")
+            with open(os.path.join(root, 'sub', 'readme.txt'), 'w') as f:
+                f.write("goog.provide('ignored');\n")
+
+            graph = DepsGraph()
+            graph.scan(root)
+
+            self.assertEqual(
+                graph.sources_for('main'),
+                [os.path.join(root, 'sub', 'sub.js'), os.path.join(root, 'main.js')])
+        finally:
+            shutil.rmtree(root)
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.script = os.path.join(self.root, 'foo.js')
+        self.cache_dir = os.path.join(self.root, 'cache', 'deps')
+        self.index_path = os.path.join(self.root, 'cache', 'deps.json')
+
+        with open(self.script, 'w') as f:
+            f.write("goog.module('foo');\nconst bar = goog.require('bar');\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_parse(self):
+        cache = ParseCache(self.cache_dir, self.index_path)
+        source = cache.parse(self.script)
+
+        self.assertEqual(source.provides, ['foo'])
+        self.assertEqual(source.requires, ['bar'])
+        self.assertTrue(source.is_module)
+
+    def test_parse_cached(self):
+        cache = ParseCache(self.cache_dir, self.index_path)
+        cache.parse(self.script)
+        cache.save()
+
+        cache = ParseCache(self.cache_dir, self.index_path)
+        cache.load()
+        with mock.patch('googkit.lib.deps.parse_content') as mock_parse:
+            source = cache.parse(self.script)
+
+        self.assertFalse(mock_parse.called)
+        self.assertEqual(source.provides, ['foo'])
+
+    def test_parse_touched(self):
+        cache = ParseCache(self.cache_dir, self.index_path)
+        cache.parse(self.script)
+
+        # Same content should not be parsed again
+        os.utime(self.script, (0, 0))
+        with mock.patch('googkit.lib.deps.parse_content') as mock_parse:
+            cache.parse(self.script)
+
+        self.assertFalse(mock_parse.called)
+
+    def test_parse_modified(self):
+        cache = ParseCache(self.cache_dir, self.index_path)
+        cache.parse(self.script)
+
+        with open(self.script, 'w') as f:
+            f.write("goog.provide('baz');\n")
+        os.utime(self.script, (0, 0))
+
+        self.assertEqual(cache.parse(self.script).provides, ['baz'])
+
+    def test_load_broken_cache(self):
+        os.mkdir(os.path.dirname(self.index_path))
+        with open(self.index_path, 'w') as f:
+            f.write('{broken')
+
+        cache = ParseCache(self.cache_dir, self.index_path)
+        cache.load()
+        self.assertEqual(cache.parse(self.script).provides, ['foo'])
+
+    def test_parse_shared(self):
+        cache = ParseCache(self.cache_dir, self.index_path)
+        cache.parse(self.script)
+
+        # Scripts that have the same content should share the entry even if
+        # they are in another checkout
+        other_root = tempfile.mkdtemp()
+        try:
+            other_script = os.path.join(other_root, 'foo.js')
+            shutil.copyfile(self.script, other_script)
+
+            cache = ParseCache(self.cache_dir, os.path.join(other_root, 'deps.json'))
+            with mock.patch('googkit.lib.deps.parse_content') as mock_parse:
+                source = cache.parse(other_script)
+        finally:
+            shutil.rmtree(other_root)
+
+        self.assertFalse(mock_parse.called)
+        self.assertEqual(source.provides, ['foo'])
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_parse_broken_entry(self):
+        cache = ParseCache(self.cache_dir, self.index_path)
+        cache.parse(self.script)
+        cache.save()
+
+        for (dirpath, dirnames, filenames) in os.walk(self.cache_dir):
+            for filename in filenames:
+                with open(os.path.join(dirpath, filename), 'w') as f:
+                    f.write('{broken')
+
+        cache = ParseCache(self.cache_dir, self.index_path)
+        cache.load()
+        self.assertEqual(cache.parse(self.script).provides, ['foo'])
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(googkit.lib.deps))
+    return tests
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -100,6 +100,246 @@ class TestFile(unittest.TestCase):
         shutil.rmtree(src_dir)
         shutil.rmtree(dst_dir)
 
+    def test_sync(self):
+        src_dir = tempfile.mkdtemp()
+        self._build_structure(src_dir, {
+            'sub': {
+                'subfile': 'SUB'
+            },
+            'file': 'FILE',
+            'ignored': 'IGNORED'
+        })
+
+        dst_dir = tempfile.mkdtemp()
+        self._build_structure(dst_dir, {
+            'orphan_dir': {
+                'orphan_file': True
+            },
+            'orphan': True,
+            'output.min.js': True
+        })
+
+        def ignore(target_dir, files):
+            return ['ignored'] if target_dir == src_dir else []
+
+        def keep(path):
+            return path.endswith('.min.js')
+
+        result = googkit.lib.file.sync(src_dir, dst_dir, ignore=ignore, keep=keep)
+
+        self.assertEqual((result.copied, result.skipped, result.deleted), (2, 0, 2))
+        self.assertEqual(
+            sorted(os.listdir(dst_dir)),
+            ['file', 'output.min.js', 'sub'])
+
+        # Nothing should be copied if no files are changed
+        result = googkit.lib.file.sync(src_dir, dst_dir, ignore=ignore, keep=keep)
+        self.assertEqual((result.copied, result.skipped, result.deleted), (0, 2, 0))
+
+        # Changed files should be copied
+        with open(os.path.join(src_dir, 'file'), 'w') as f:
+            f.write('CHANGED')
+        result = googkit.lib.file.sync(src_dir, dst_dir, ignore=ignore, keep=keep)
+        self.assertEqual((result.copied, result.skipped, result.deleted), (1, 1, 0))
+        with open(os.path.join(dst_dir, 'file')) as f:
+            self.assertEqual(f.read(), 'CHANGED')
+
+        shutil.rmtree(src_dir)
+        shutil.rmtree(dst_dir)
+
+    def test_stage(self):
+        src_dir = tempfile.mkdtemp()
+        self._build_structure(src_dir, {
+            'src': 'SRC'
+        })
+        src = os.path.join(src_dir, 'src')
+
+        for mode in googkit.lib.file.STAGING_MODES:
+            dst = os.path.join(src_dir, mode)
+            googkit.lib.file.stage(src, dst, mode)
+
+            with open(dst) as f:
+                self.assertEqual(f.read(), 'SRC')
+
+        self.assertTrue(os.path.samefile(src, os.path.join(src_dir, 'hardlink')))
+        self.assertTrue(os.path.islink(os.path.join(src_dir, 'symlink')))
+        self.assertFalse(os.path.samefile(src, os.path.join(src_dir, 'copy')))
+
+        # Staging again should replace the link, not write through it
+        dst = os.path.join(src_dir, 'hardlink')
+        googkit.lib.file.stage(src, dst, 'copy')
+        with open(dst, 'w') as f:
+            f.write('CHANGED')
+        with open(src) as f:
+            self.assertEqual(f.read(), 'SRC')
+
+        shutil.rmtree(src_dir)
+
+    def test_stage_with_unsupported_reflink(self):
+        src_dir = tempfile.mkdtemp()
+        self._build_structure(src_dir, {
+            'src': 'SRC'
+        })
+        src = os.path.join(src_dir, 'src')
+        dst = os.path.join(src_dir, 'dst')
+
+        with mock.patch('googkit.lib.file.reflink', side_effect=OSError()):
+            googkit.lib.file.stage(src, dst, 'reflink')
+
+        with open(dst) as f:
+            self.assertEqual(f.read(), 'SRC')
+
+        shutil.rmtree(src_dir)
+
+    def test_sync_with_needs_copy(self):
+        src_dir = tempfile.mkdtemp()
+        self._build_structure(src_dir, {
+            'index.html': 'HTML',
+            'image.png': 'PNG'
+        })
+        dst_dir = tempfile.mkdtemp()
+
+        googkit.lib.file.sync(
+            src_dir, dst_dir,
+            mode='hardlink',
+            needs_copy=lambda path: path.endswith('.html'))
+
+        self.assertTrue(os.path.samefile(
+            os.path.join(src_dir, 'image.png'),
+            os.path.join(dst_dir, 'image.png')))
+        self.assertFalse(os.path.samefile(
+            os.path.join(src_dir, 'index.html'),
+            os.path.join(dst_dir, 'index.html')))
+
+        shutil.rmtree(src_dir)
+        shutil.rmtree(dst_dir)
+
+    def test_is_up_to_date(self):
+        src_dir = tempfile.mkdtemp()
+        self._build_structure(src_dir, {
+            'src': 'SAME',
+            'same': 'SAME',
+            'different': 'DIFF'
+        })
+        src = os.path.join(src_dir, 'src')
+        same = os.path.join(src_dir, 'same')
+        different = os.path.join(src_dir, 'different')
+
+        os.utime(src, (1000000000, 1000000000))
+        os.utime(same, (2000000000, 2000000000))
+        os.utime(different, (2000000000, 2000000000))
+
+        self.assertTrue(googkit.lib.file.is_up_to_date(src, same))
+        self.assertFalse(googkit.lib.file.is_up_to_date(src, different))
+        self.assertFalse(googkit.lib.file.is_up_to_date(src, os.path.join(src_dir, 'none')))
+
+        # Modification time should be updated if the content is same
+        self.assertEqual(int(os.stat(same).st_mtime), 1000000000)
+
+        shutil.rmtree(src_dir)
+
+    def test_replace(self):
+        tmp_dir = tempfile.mkdtemp()
+        self._build_structure(tmp_dir, {
+            'src': 'NEW',
+            'dst': 'OLD'
+        })
+        src = os.path.join(tmp_dir, 'src')
+        dst = os.path.join(tmp_dir, 'dst')
+
+        googkit.lib.file.replace(src, dst)
+
+        self.assertFalse(os.path.exists(src))
+        with open(dst) as f:
+            self.assertEqual(f.read(), 'NEW')
+
+        shutil.rmtree(tmp_dir)
+
+    def test_write_atomically(self):
+        tmp_dir = tempfile.mkdtemp()
+        self._build_structure(tmp_dir, {'dst': 'OLD'})
+        dst = os.path.join(tmp_dir, 'dst')
+        os.chmod(dst, 0o640)
+
+        googkit.lib.file.write_atomically(dst, 'NEW')
+
+        with open(dst) as f:
+            self.assertEqual(f.read(), 'NEW')
+        self.assertEqual(os.stat(dst).st_mode & 0o777, 0o640)
+        # Temporary files should not be left
+        self.assertEqual(os.listdir(tmp_dir), ['dst'])
+
+        shutil.rmtree(tmp_dir)
+
+    def _test_swap_dir(self):
+        tmp_dir = tempfile.mkdtemp()
+        self._build_structure(tmp_dir, {
+            'src': {'index.html': 'NEW'},
+            'dst': {'index.html': 'OLD'}
+        })
+        src = os.path.join(tmp_dir, 'src')
+        dst = os.path.join(tmp_dir, 'dst')
+
+        googkit.lib.file.swap_dir(src, dst)
+
+        with open(os.path.join(dst, 'index.html')) as f:
+            self.assertEqual(f.read(), 'NEW')
+        with open(os.path.join(src, 'index.html')) as f:
+            self.assertEqual(f.read(), 'OLD')
+
+        shutil.rmtree(tmp_dir)
+
+    def test_swap_dir(self):
+        self._test_swap_dir()
+
+    def test_swap_dir_without_exchange(self):
+        with mock.patch('googkit.lib.file.exchange', side_effect=OSError()):
+            self._test_swap_dir()
+
+    def test_swap_dir_to_new_dir(self):
+        tmp_dir = tempfile.mkdtemp()
+        self._build_structure(tmp_dir, {'src': {'index.html': 'NEW'}})
+        src = os.path.join(tmp_dir, 'src')
+        dst = os.path.join(tmp_dir, 'dst')
+
+        googkit.lib.file.swap_dir(src, dst)
+
+        self.assertFalse(os.path.exists(src))
+        self.assertTrue(os.path.exists(os.path.join(dst, 'index.html')))
+
+        shutil.rmtree(tmp_dir)
+
+    def test_rmtree_in_background(self):
+        tmp_dir = tempfile.mkdtemp()
+        self._build_structure(tmp_dir, {'old': {'foo': {'bar.html': 'OLD'}}})
+        old_dir = os.path.join(tmp_dir, 'old')
+
+        googkit.lib.file.rmtree_in_background(old_dir).join()
+
+        self.assertFalse(os.path.exists(old_dir))
+
+        shutil.rmtree(tmp_dir)
+
+    def test_remove_empty_dirs(self):
+        tmp_dir = tempfile.mkdtemp()
+        self._build_structure(tmp_dir, {'foo': {'bar': {'baz': {}}, 'qux.html': 'QUX'}})
+        baz_dir = os.path.join(tmp_dir, 'foo', 'bar', 'baz')
+
+        removed = googkit.lib.file.remove_empty_dirs(baz_dir, tmp_dir)
+
+        # Parents should be removed until a non-empty directory
+        self.assertEqual(removed, [baz_dir, os.path.dirname(baz_dir)])
+        self.assertTrue(os.path.exists(os.path.join(tmp_dir, 'foo')))
+
+        os.remove(os.path.join(tmp_dir, 'foo', 'qux.html'))
+        googkit.lib.file.remove_empty_dirs(os.path.join(tmp_dir, 'foo'), tmp_dir)
+
+        # The root should never be removed
+        self.assertFalse(os.path.exists(os.path.join(tmp_dir, 'foo')))
+        self.assertTrue(os.path.exists(tmp_dir))
+
+        shutil.rmtree(tmp_dir)
+
     def test_executable(self):
         with mock.patch('os.path.isfile', return_value=True), \
                 mock.patch('os.access', return_value=True):
@@ -0,0 +1,123 @@
+import doctest
+import os
+import shutil
+import tempfile
+import unittest
+import googkit.lib.marker
+from googkit.compat.unittest import mock
+from googkit.lib.marker import Rewriter
+
+
+class TestRewriter(unittest.TestCase):
+    def test_rewrite_lines(self):
+        rewriter = Rewriter()
+        rewriter.add('base.js', '<!--@base_js@-->', lambda line, path: 'BASE_JS')
+        rewriter.add('provide_main', '/*@provide_main@*/', lambda line, path: 'PROVIDE')
+
+        lines = rewriter.rewrite_lines([
+            'DUMMY\n',
+            '  <!--@base_js@-->\n',
+            '/*@provide_main@*/\n',
+            '<!--@dummy_marker@-->\n',
+        ], 'index.html')
+
+        self.assertEqual(lines, [
+            'DUMMY\n',
+            '  BASE_JS<!--@base_js@-->\n',
+            'PROVIDE/*@provide_main@*/\n',
+            '<!--@dummy_marker@-->\n',
+        ])
+
+    def test_rewrite_lines_without_markers(self):
+        rewriter = Rewriter(keep_markers=False)
+        rewriter.add('base.js', '<!--@base_js@-->', lambda line, path: None)
+        rewriter.add('require_main', '<!--@require_main@-->', lambda line, path: 'A\nB')
+
+        lines = rewriter.rewrite_lines([
+            '  <!--@base_js@-->\n',
+            '  <!--@require_main@-->\n',
+        ], 'index.html')
+
+        self.assertEqual(''.join(lines), '  A\n  B\n')
+
+    def test_rewrite_lines_with_markers_on_one_line(self):
+        rewriter = Rewriter()
+        rewriter.add('base.js', '<!--@base_js@-->', lambda line, path: 'BASE_JS')
+        rewriter.add('deps.js', '<!--@deps_js@-->', lambda line, path: 'DEPS_JS')
+
+        (lines, names) = rewriter.rewrite(['  <!--@base_js@--><!--@deps_js@-->\n'], 'index.html')
+
+        # Every marker should be replaced, and the line can be rewritten again
+        self.assertEqual(lines, ['  BASE_JS<!--@base_js@-->DEPS_JS<!--@deps_js@-->\n'])
+        self.assertEqual(names, ['base.js', 'deps.js'])
+        self.assertEqual(rewriter.rewrite_lines(lines, 'index.html'), lines)
+
+        rewriter.keep_markers = False
+        self.assertEqual(
+            rewriter.rewrite_lines(['  <!--@base_js@--><!--@deps_js@-->\n'], 'index.html'),
+            ['  BASE_JSDEPS_JS\n'])
+
+    def test_update_is_called_with_line_and_path(self):
+        update = mock.MagicMock(return_value='UPDATED')
+        rewriter = Rewriter()
+        rewriter.add('foo', '<!--@foo@-->', update)
+
+        rewriter.rewrite_lines(['<!--@foo@-->\n'], 'index.html')
+
+        update.assert_called_once_with('<!--@foo@-->\n', 'index.html')
+
+    def test_relative_url(self):
+        rewriter = Rewriter()
+        target = os.path.join('closure', 'goog', 'base.js')
+        path = os.path.join('development', 'index.html')
+
+        with mock.patch('os.path.relpath', wraps=os.path.relpath) as mock_relpath:
+            url1 = rewriter.relative_url(target, path)
+            url2 = rewriter.relative_url(target, os.path.join('development', 'all_tests.html'))
+
+        self.assertEqual(url1, '../closure/goog/base.js')
+        self.assertEqual(url2, url1)
+        # URLs should be memoized for each directory
+        self.assertEqual(mock_relpath.call_count, 1)
+
+    def test_prefixes(self):
+        rewriter = Rewriter()
+        rewriter.add('base.js', '<!--@base_js@-->', None)
+        rewriter.add('deps.js', '<!--@deps_js@-->', None)
+        rewriter.add('provide_main', '/*@provide_main@*/', None)
+
+        self.assertEqual(rewriter.prefixes(), [b'/*@', b'<!--@'])
+
+    def test_may_match(self):
+        rewriter = Rewriter()
+        rewriter.add('provide_main', '/*@provide_main@*/', None)
+        tmp_dir = tempfile.mkdtemp()
+
+        def may_match(content):
+            path = os.path.join(tmp_dir, 'main.js')
+            with open(path, 'wb') as f:
+                f.write(content)
+            return rewriter.may_match(path)
+
+        try:
+            self.assertTrue(may_match(b'goog.provide("foo");\n/*@provide_main@*/\n'))
+            self.assertFalse(may_match(b'/* @license */\nvar a = 1;\n' * 1000))
+            self.assertFalse(may_match(b''))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_register(self):
+        update = mock.MagicMock()
+
+        with mock.patch('googkit.lib.marker._registry', []):
+            googkit.lib.marker.register('foo', '<!--@foo@-->', update)
+            self.assertEqual(googkit.lib.marker.registered(), [('foo', '<!--@foo@-->', update)])
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(googkit.lib.marker))
+    return tests
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import doctest
+import googkit.lib.parallel
+from googkit.compat.unittest import mock
+from googkit.lib.error import GoogkitError
+
+
+class TestParallel(unittest.TestCase):
+    def test_jobs(self):
+        self.assertEqual(googkit.lib.parallel.jobs('3'), 3)
+
+        with mock.patch('multiprocessing.cpu_count', return_value=8):
+            self.assertEqual(googkit.lib.parallel.jobs(None), 8)
+            self.assertEqual(googkit.lib.parallel.jobs(True), 8)
+
+    def test_jobs_with_invalid_value(self):
+        with self.assertRaises(GoogkitError):
+            googkit.lib.parallel.jobs('0')
+
+        with self.assertRaises(GoogkitError):
+            googkit.lib.parallel.jobs('many')
+
+    def test_imap(self):
+        items = list(range(20))
+        result = googkit.lib.parallel.imap(lambda x: x * x, items, 4)
+
+        # Results should be in the order of the items
+        self.assertEqual(list(result), [x * x for x in items])
+
+    def test_imap_with_single_job(self):
+        result = googkit.lib.parallel.imap(lambda x: x + 1, [1, 2], 1)
+        self.assertEqual(list(result), [2, 3])
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(googkit.lib.parallel))
+    return tests
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -163,6 +163,14 @@ class TestPath(unittest.TestCase):
                     googkit.lib.path.template(),
                     '/dummy/usr/local/googkit/googkit_data/template')
 
+    def test_staging_dir(self):
+        self.assertEqual(
+            googkit.lib.path.staging_dir(os.path.join('project', 'production')),
+            os.path.join('project', '.production.staging'))
+        self.assertEqual(
+            googkit.lib.path.staging_dir(os.path.join('project', 'debug', '')),
+            os.path.join('project', '.debug.staging'))
+
     def test_replace_base(self):
         self.assertEqual(
             googkit.lib.path.replace_base(
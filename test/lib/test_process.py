@@ -0,0 +1,58 @@
+import logging
+import sys
+import unittest
+import googkit.lib.process
+from googkit.compat.unittest import mock
+
+
+SCRIPT = '''\
+import sys
+for i in range(5):
+    sys.stderr.write('WARNING %d\\n' % i)
+sys.exit(3)
+'''
+
+
+class TestProcess(unittest.TestCase):
+    def test_run(self):
+        with mock.patch('logging.log') as mock_log:
+            (exit_code, output) = googkit.lib.process.run(
+                [sys.executable, '-c', SCRIPT], 'index')
+
+        self.assertEqual(exit_code, 3)
+        self.assertEqual(output, '\n'.join(['WARNING %d' % i for i in range(5)]))
+        self.assertEqual(mock_log.call_count, 5)
+        mock_log.assert_any_call(logging.DEBUG, '[index] WARNING 0')
+
+    def test_run_with_max_lines(self):
+        with mock.patch('logging.log') as mock_log:
+            (exit_code, output) = googkit.lib.process.run(
+                [sys.executable, '-c', SCRIPT], max_lines=2)
+
+        self.assertEqual(output, 'WARNING 3\nWARNING 4')
+        self.assertEqual(mock_log.call_count, 5)
+
+    def test_log_lines(self):
+        with mock.patch('logging.log') as mock_log:
+            googkit.lib.process.log_lines('foo\nbar', 'index', logging.INFO)
+
+        self.assertEqual(mock_log.call_args_list, [
+            mock.call(logging.INFO, '[index] foo'),
+            mock.call(logging.INFO, '[index] bar'),
+        ])
+
+    def test_progress(self):
+        progress = googkit.lib.process.Progress(2)
+
+        with mock.patch('logging.info') as mock_info:
+            progress.step('Built: a.html')
+            progress.step('Built: b.html')
+
+        self.assertEqual(progress.done, 2)
+        messages = [c[0][0] for c in mock_info.call_args_list]
+        self.assertTrue(messages[0].startswith('[1/2] Built: a.html ('))
+        self.assertTrue(messages[1].startswith('[2/2] Built: b.html ('))
+
+
+if __name__ == '__main__':
+    unittest.main()
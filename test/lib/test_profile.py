@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import doctest
+import googkit.lib.profile
+from googkit.compat.unittest import mock
+from googkit.lib.profile import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def test_phase(self):
+        profiler = Profiler()
+
+        with mock.patch('time.time', side_effect=[10.0, 12.5]):
+            with profiler.phase('compile', 'index.html'):
+                pass
+
+        records = profiler.records()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['phase'], 'compile')
+        self.assertEqual(records[0]['target'], 'index.html')
+        self.assertEqual(records[0]['elapsed'], 2.5)
+
+    def test_phase_with_error(self):
+        profiler = Profiler()
+
+        with self.assertRaises(ValueError):
+            with profiler.phase('compile'):
+                raise ValueError()
+
+        # Failed phases should also be recorded
+        self.assertEqual(len(profiler.records()), 1)
+
+    def test_summary(self):
+        profiler = Profiler()
+        profiler._records = [
+            {'phase': 'stage', 'target': None, 'elapsed': 1.0},
+            {'phase': 'compile', 'target': 'a.html', 'elapsed': 2.0},
+            {'phase': 'compile', 'target': 'b.html', 'elapsed': 3.0},
+        ]
+
+        self.assertEqual(profiler.summary(), [
+            ('stage', 1, 1.0, 1.0, None),
+            ('compile', 2, 5.0, 3.0, 'b.html')])
+
+    def test_measure_without_profiler(self):
+        with googkit.lib.profile.measure(None, 'compile'):
+            pass
+
+    def test_write_report(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'report', 'profile.json')
+            profiler = Profiler()
+            with profiler.phase('compile', 'index.html'):
+                pass
+
+            googkit.lib.profile.write_report(profiler, path, 'build')
+
+            with open(path) as f:
+                report = json.load(f)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        self.assertEqual(report['command'], 'build')
+        self.assertEqual(report['phases'][0]['target'], 'index.html')
+        self.assertEqual(report['summary'][0]['phase'], 'compile')
+        self.assertEqual(report['summary'][0]['count'], 1)
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(googkit.lib.profile))
+    return tests
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import doctest
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import googkit.lib.server
+from googkit.compat.unittest import mock
+from googkit.lib.server import Resource, Server
+
+try:
+    # 3.0 and later
+    from http.client import HTTPConnection
+except ImportError:
+    from httplib import HTTPConnection
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.resources = {}
+        self.server = Server(('127.0.0.1', 0), lambda url_path: self.resources.get(url_path))
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,))
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.tmp_dir)
+
+    def _request(self, path, headers={}, method='GET'):
+        conn = HTTPConnection(*self.server.server_address[:2])
+        try:
+            conn.request(method, path, headers=headers)
+            response = conn.getresponse()
+            return (response.status, dict(response.getheaders()), response.read())
+        finally:
+            conn.close()
+
+    def test_content(self):
+        self.resources['/index.html'] = Resource.from_content(b'<html></html>', 'index.html')
+
+        with mock.patch('logging.debug'):
+            (status, headers, body) = self._request('/index.html')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b'<html></html>')
+        self.assertEqual(headers['Content-Type'], 'text/html')
+        self.assertEqual(headers['Cache-Control'], 'no-cache')
+
+    def test_file(self):
+        path = os.path.join(self.tmp_dir, 'foo.js')
+        with open(path, 'wb') as f:
+            f.write(b'var foo;\n')
+        self.resources['/foo.js'] = Resource.from_file(path)
+
+        with mock.patch('logging.debug'):
+            (status, headers, body) = self._request('/foo.js')
+            (head_status, head_headers, head_body) = self._request('/foo.js', method='HEAD')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b'var foo;\n')
+        self.assertEqual(headers['Content-Length'], '9')
+        self.assertEqual(head_status, 200)
+        self.assertEqual(head_body, b'')
+
+    def test_not_modified(self):
+        resource = Resource.from_content(b'<html></html>', 'index.html')
+        self.resources['/index.html'] = resource
+
+        with mock.patch('logging.debug'):
+            (status, headers, body) = self._request('/index.html', {'If-None-Match': resource.etag})
+
+        self.assertEqual(status, 304)
+        self.assertEqual(headers['ETag'], resource.etag)
+        self.assertEqual(body, b'')
+
+    def test_large_file(self):
+        path = os.path.join(self.tmp_dir, 'large.js')
+        content = b'var foo;\n' * googkit.lib.server.SENDFILE_MIN_SIZE
+        with open(path, 'wb') as f:
+            f.write(content)
+        self.resources['/large.js'] = Resource.from_file(path)
+
+        logged = threading.Event()
+        with mock.patch('logging.log', side_effect=lambda *args: logged.set()) as mock_log:
+            (status, headers, body) = self._request('/large.js')
+
+            # The request is logged after the response is sent
+            logged.wait(5)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, content)
+
+        # The request should be logged with the bytes sent
+        message = mock_log.call_args[0][1]
+        self.assertTrue(message.startswith('GET /large.js 200 {size} bytes '.format(size=len(content))))
+
+    def test_gzip_variant(self):
+        path = os.path.join(self.tmp_dir, 'foo.js')
+        with open(path, 'wb') as f:
+            f.write(b'var foo;\n')
+        with open(path + '.gz', 'wb') as f:
+            f.write(b'GZIPPED')
+
+        resource = Resource.from_file(path)
+        resource.gzip_path = path + '.gz'
+        resource.cache_control = googkit.lib.server.IMMUTABLE
+        self.resources['/foo.js'] = resource
+
+        with mock.patch('logging.debug'):
+            (status, headers, body) = self._request('/foo.js', {'Accept-Encoding': 'gzip, deflate'})
+            (plain_status, plain_headers, plain_body) = self._request('/foo.js')
+
+        self.assertEqual(body, b'GZIPPED')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Content-Type'], resource.content_type)
+        self.assertEqual(headers['Cache-Control'], googkit.lib.server.IMMUTABLE)
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+
+        self.assertEqual(plain_body, b'var foo;\n')
+        self.assertNotIn('Content-Encoding', plain_headers)
+        self.assertEqual(plain_headers['Vary'], 'Accept-Encoding')
+
+    def test_not_found(self):
+        with mock.patch('logging.debug'):
+            (status, headers, body) = self._request('/not_found.html')
+
+        self.assertEqual(status, 404)
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(googkit.lib.server))
+    return tests
+
+
+if __name__ == '__main__':
+    unittest.main()
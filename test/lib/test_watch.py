@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+import googkit.lib.watch
+from googkit.compat.unittest import mock
+from googkit.lib.watch import InotifyWatcher, PollingWatcher, Watcher
+
+
+class DummyWatcher(Watcher):
+    def poll(self, timeout):
+        return set()
+
+
+class TestWatcher(unittest.TestCase):
+    def test_wait_merges_changes(self):
+        watcher = DummyWatcher('dummy')
+        watcher.poll = mock.MagicMock(side_effect=[
+            set(), set(['a.js']), set(['b.js']), set()])
+
+        self.assertEqual(watcher.wait(), set(['a.js', 'b.js']))
+        self.assertEqual(watcher.poll.call_count, 4)
+
+    def test_poll_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Watcher('dummy')
+
+
+class TestPollingWatcher(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.root, 'ignored'))
+        self.write('foo.js', 'foo')
+        self.write(os.path.join('ignored', 'bar.js'), 'bar')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, relpath, content):
+        with open(os.path.join(self.root, relpath), 'w') as f:
+            f.write(content)
+
+    def test_poll(self):
+        ignored_dir = os.path.join(self.root, 'ignored')
+        watcher = PollingWatcher(self.root, ignore=lambda path: path == ignored_dir)
+
+        self.assertEqual(watcher.poll(0), set())
+
+        self.write('foo.js', 'modified')
+        self.write('new.js', 'new')
+        self.write(os.path.join('ignored', 'bar.js'), 'modified')
+
+        self.assertEqual(watcher.poll(0), set([
+            os.path.join(self.root, 'foo.js'),
+            os.path.join(self.root, 'new.js')]))
+
+        os.remove(os.path.join(self.root, 'foo.js'))
+        self.assertEqual(watcher.poll(0), set([os.path.join(self.root, 'foo.js')]))
+
+    def test_poll_removed_dir(self):
+        os.mkdir(os.path.join(self.root, 'sub'))
+        self.write(os.path.join('sub', 'baz.js'), 'baz')
+        watcher = PollingWatcher(self.root)
+
+        shutil.rmtree(os.path.join(self.root, 'sub'))
+
+        # Files in the removed directory should be reported
+        self.assertEqual(watcher.poll(0), set([os.path.join(self.root, 'sub', 'baz.js')]))
+
+
+class TestInotifyWatcher(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.sub_dir = os.path.join(self.root, 'sub')
+        os.makedirs(os.path.join(self.sub_dir, 'nested'))
+        self.paths = set()
+        for relpath in ('foo.js', os.path.join('nested', 'bar.js')):
+            path = os.path.join(self.sub_dir, relpath)
+            with open(path, 'w') as f:
+                f.write('DUMMY')
+            self.paths.add(path)
+
+        try:
+            self.watcher = InotifyWatcher(self.root)
+        except (AttributeError, OSError):
+            shutil.rmtree(self.root)
+            self.skipTest('inotify is not available')
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.root)
+
+    def test_poll_removed_dir(self):
+        shutil.rmtree(self.sub_dir)
+
+        self.assertEqual(self.watcher.poll(1), self.paths)
+
+    def test_poll_moved_out_dir(self):
+        outside_dir = tempfile.mkdtemp()
+        try:
+            os.rename(self.sub_dir, os.path.join(outside_dir, 'sub'))
+
+            # Files in the moved directory should be reported as removed
+            self.assertEqual(self.watcher.poll(1), self.paths)
+
+            # The moved directory should not be watched anymore
+            with open(os.path.join(outside_dir, 'sub', 'foo.js'), 'w') as f:
+                f.write('MODIFIED')
+            self.assertEqual(self.watcher.poll(0), set())
+        finally:
+            shutil.rmtree(outside_dir)
+
+
+class TestWatch(unittest.TestCase):
+    def test_watcher_falls_back_to_polling(self):
+        with mock.patch('googkit.lib.watch.InotifyWatcher', side_effect=OSError()), \
+                mock.patch('googkit.lib.watch.PollingWatcher') as MockWatcher:
+            watcher = googkit.lib.watch.watcher('dummy')
+
+        self.assertEqual(watcher, MockWatcher.return_value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -44,6 +44,15 @@ class StubConfig(object):
     def compiled_js_ext(self):
         return StubConfig.COMPILED_JS_EXT
 
+    def hash_compiled_js(self):
+        return StubConfig.HASH_COMPILED_JS
+
+    def deps_per_page(self):
+        return StubConfig.DEPS_PER_PAGE
+
+    def staging(self):
+        return StubConfig.STAGING
+
     def test_file_pattern(self):
         return StubConfig.TEST_FILE_PATTERN
 
@@ -71,6 +80,18 @@ class StubConfig(object):
     def deps_js(self):
         return StubConfig.DEPS_JS
 
+    def page_deps_dir(self):
+        return StubConfig.PAGE_DEPS_DIR
+
+    def page_deps_js(self, namespace):
+        return os.path.join(StubConfig.PAGE_DEPS_DIR, namespace + '.js')
+
+    def dev_bundle_dir(self):
+        return StubConfig.DEV_BUNDLE_DIR
+
+    def dev_bundle_js(self, namespace):
+        return os.path.join(StubConfig.DEV_BUNDLE_DIR, namespace + '.js')
+
     def testrunner(self):
         return StubConfig.TESTRUNNER
 
@@ -92,6 +113,18 @@ class StubConfig(object):
     def compiler_flagfile_for_debug(self):
         return StubConfig.COMPILER_FLAGFILE_FOR_DEBUG
 
+    def gzip(self):
+        return StubConfig.GZIP
+
+    def gzip_level(self):
+        return StubConfig.GZIP_LEVEL
+
+    def cache_dir(self):
+        return StubConfig.CACHE_DIR
+
+    def cache_max_size(self):
+        return StubConfig.CACHE_MAX_SIZE
+
     def linter_flagfile(self):
         return StubConfig.LINTER_FLAGFILE
 
@@ -116,6 +149,12 @@ StubConfig.PRODUCTION_DIR = os.path.join(
 StubConfig.JS_DEV_DIR = os.path.join(
     StubConfig.DEVELOPMENT_DIR, 'JS_DEV')
 
+StubConfig.DEV_BUNDLE_DIR = os.path.join(
+    StubConfig.DEVELOPMENT_DIR, 'JS_BUNDLE')
+
+StubConfig.PAGE_DEPS_DIR = os.path.join(
+    StubConfig.DEVELOPMENT_DIR, 'JS_DEPS')
+
 StubConfig.TESTRUNNER = os.path.join(
     StubConfig.DEVELOPMENT_DIR, 'ALL_TESTS.HTML')
 
@@ -139,12 +178,19 @@ StubConfig.COMPILER = os.path.join(
 
 StubConfig.TEST_FILE_PATTERN = '_TEST\.(HTML|XHTML)$'
 StubConfig.COMPILED_JS_EXT = '%s.JS'
+StubConfig.STAGING = 'copy'
+StubConfig.HASH_COMPILED_JS = False
+StubConfig.DEPS_PER_PAGE = False
 StubConfig.COMPILATION_LEVEL = 'COMPILATION_LEVEL'
 StubConfig.LIBRARY_GIT_REPOS = 'LIBRARY_GIT_REPOS'
 StubConfig.COMPILER_LATEST_ZIP = 'COMPILER_LATEST_ZIP'
 StubConfig.COMPILER_FLAGFILE = 'COMPILER_FLAGFILE'
 StubConfig.COMPILER_FLAGFILE_FOR_DEBUG = 'COMPILER_FLAGFILE_FOR_DEBUG'
 StubConfig.LINTER_FLAGFILE = 'LINTER_FLAGFILE'
+StubConfig.GZIP = False
+StubConfig.GZIP_LEVEL = 9
+StubConfig.CACHE_DIR = '.googkit-cache'
+StubConfig.CACHE_MAX_SIZE = 0
 
 
 # This stub is useful when test target includes "os.walk()".
@@ -197,6 +243,15 @@ class StubConfigOnStubProject(object):
     def compiled_js_ext(self):
         return StubConfigOnStubProject.COMPILED_JS_EXT
 
+    def hash_compiled_js(self):
+        return StubConfigOnStubProject.HASH_COMPILED_JS
+
+    def deps_per_page(self):
+        return StubConfigOnStubProject.DEPS_PER_PAGE
+
+    def staging(self):
+        return StubConfigOnStubProject.STAGING
+
     def test_file_pattern(self):
         return StubConfigOnStubProject.TEST_FILE_PATTERN
 
@@ -224,6 +279,18 @@ class StubConfigOnStubProject(object):
     def deps_js(self):
         return StubConfigOnStubProject.DEPS_JS
 
+    def page_deps_dir(self):
+        return StubConfigOnStubProject.PAGE_DEPS_DIR
+
+    def page_deps_js(self, namespace):
+        return os.path.join(StubConfigOnStubProject.PAGE_DEPS_DIR, namespace + '.js')
+
+    def dev_bundle_dir(self):
+        return StubConfigOnStubProject.DEV_BUNDLE_DIR
+
+    def dev_bundle_js(self, namespace):
+        return os.path.join(StubConfigOnStubProject.DEV_BUNDLE_DIR, namespace + '.js')
+
     def testrunner(self):
         return StubConfigOnStubProject.TESTRUNNER
 
@@ -245,6 +312,18 @@ class StubConfigOnStubProject(object):
     def compiler_flagfile_for_debug(self):
         return StubConfigOnStubProject.COMPILER_FLAGFILE_FOR_DEBUG
 
+    def gzip(self):
+        return StubConfigOnStubProject.GZIP
+
+    def gzip_level(self):
+        return StubConfigOnStubProject.GZIP_LEVEL
+
+    def cache_dir(self):
+        return StubConfigOnStubProject.CACHE_DIR
+
+    def cache_max_size(self):
+        return StubConfigOnStubProject.CACHE_MAX_SIZE
+
     def linter_flagfile(self):
         return StubConfigOnStubProject.LINTER_FLAGFILE
 
@@ -270,6 +349,12 @@ StubConfigOnStubProject.PRODUCTION_DIR = os.path.join(
 StubConfigOnStubProject.JS_DEV_DIR = os.path.join(
     StubConfigOnStubProject.DEVELOPMENT_DIR, 'js_dev')
 
+StubConfigOnStubProject.DEV_BUNDLE_DIR = os.path.join(
+    StubConfigOnStubProject.DEVELOPMENT_DIR, 'js_bundle')
+
+StubConfigOnStubProject.PAGE_DEPS_DIR = os.path.join(
+    StubConfigOnStubProject.DEVELOPMENT_DIR, 'js_deps')
+
 StubConfigOnStubProject.TESTRUNNER = os.path.join(
     StubConfigOnStubProject.DEVELOPMENT_DIR, 'all_tests.html')
 
@@ -292,6 +377,9 @@ StubConfigOnStubProject.COMPILER = os.path.join(
     StubConfigOnStubProject.COMPILER_ROOT, 'compiler.jar')
 
 StubConfigOnStubProject.COMPILED_JS_EXT = '%s.min.js'
+StubConfigOnStubProject.STAGING = 'copy'
+StubConfigOnStubProject.HASH_COMPILED_JS = False
+StubConfigOnStubProject.DEPS_PER_PAGE = False
 StubConfigOnStubProject.TEST_FILE_PATTERN = '_test\.(html|xhtml)$'
 StubConfigOnStubProject.COMPILATION_LEVEL = 'COMPILATION_LEVEL'
 StubConfigOnStubProject.LIBRARY_GIT_REPOS = 'LIBRARY_GIT_REPOS'
@@ -299,3 +387,7 @@ StubConfigOnStubProject.COMPILER_LATEST_ZIP = 'COMPILER_LATEST_ZIP'
 StubConfigOnStubProject.COMPILER_FLAGFILE = 'COMPILER_FLAGFILE'
 StubConfigOnStubProject.COMPILER_FLAGFILE_FOR_DEBUG = 'COMPILER_FLAGFILE_FOR_DEBUG'
 StubConfigOnStubProject.LINTER_FLAGFILE = 'LINTER_FLAGFILE'
+StubConfigOnStubProject.GZIP = False
+StubConfigOnStubProject.GZIP_LEVEL = 9
+StubConfigOnStubProject.CACHE_DIR = '.googkit-cache'
+StubConfigOnStubProject.CACHE_MAX_SIZE = 0